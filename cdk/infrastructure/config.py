@@ -236,6 +236,7 @@ config: Dict[str, Any] = {
                 'use_postgres_named': 'Postgres',
                 'read_from_opensearch_named': 'Opensearch27',
                 'write_to_opensearch_named': 'Opensearch27',
+                'metadata_jobs_bucket_name': 'pankbase-metadata-jobs-staging',
             },
             'invalidation_service': {
                 'cpu': 256,
@@ -302,6 +303,7 @@ config: Dict[str, Any] = {
                 'use_postgres_named': 'Postgres',
                 'read_from_opensearch_named': 'Opensearch27',
                 'write_to_opensearch_named': 'Opensearch27',
+                'metadata_jobs_bucket_name': 'pankbase-metadata-jobs-sandbox',
             },
             'invalidation_service': {
                 'cpu': 256,
@@ -368,6 +370,7 @@ config: Dict[str, Any] = {
                 'use_postgres_named': 'Postgres',
                 'read_from_opensearch_named': 'Opensearch27',
                 'write_to_opensearch_named': 'Opensearch27',
+                'metadata_jobs_bucket_name': 'pankbase-metadata-jobs',
             },
             'invalidation_service': {
                 'cpu': 256,
@@ -23,6 +23,9 @@ from aws_cdk.aws_secretsmanager import SecretStringGenerator
 
 from aws_cdk.aws_logs import LogGroup
 
+from aws_cdk.aws_s3 import Bucket
+from aws_cdk.aws_s3 import IBucket
+
 from infrastructure.config import Config
 
 from infrastructure.constructs.alarms.backend import BackendAlarmsProps
@@ -54,6 +57,8 @@ from infrastructure.multiplexer import Multiplexer
 
 from typing import Any
 from typing import cast
+from typing import Dict
+from typing import Optional
 
 from dataclasses import dataclass
 
@@ -81,6 +86,9 @@ class BackendProps:
     use_postgres_named: str
     read_from_opensearch_named: str
     write_to_opensearch_named: str
+    # Bucket of the metadata.jobs_bucket setting in the ini,
+    # None where the ini leaves metadata jobs disabled.
+    metadata_jobs_bucket_name: Optional[str] = None
 
 
 class Backend(Construct):
@@ -94,6 +102,7 @@ class Backend(Construct):
     domain_name: str
     nginx_image: ContainerImage
     fargate_service: ApplicationLoadBalancedFargateService
+    metadata_jobs_bucket: Optional[IBucket]
     batch_upgrade: BatchUpgrade
 
     def __init__(
@@ -112,6 +121,7 @@ class Backend(Construct):
         self._generate_session_secret()
         self._define_docker_assets()
         self._define_domain_name()
+        self._define_metadata_jobs_bucket()
         self._define_fargate_service()
         self._define_log_driver_for_application_container()
         self._add_application_container_to_task()
@@ -130,6 +140,7 @@ class Backend(Construct):
         self._allow_task_to_upload_to_restricted_files_buckets()
         self._allow_task_to_read_upload_restricted_files_user_access_keys_secret()
         self._allow_task_to_read_feature_flags()
+        self._allow_task_to_read_and_write_metadata_jobs_bucket()
         self._configure_health_check()
         self._add_tags_to_fargate_service()
         self._enable_exec_command()
@@ -241,34 +252,40 @@ class Backend(Construct):
             mode=AwsLogDriverMode.NON_BLOCKING,
         )
 
+    def get_application_environment(self) -> Dict[str, str]:
+        return {
+            'DB_HOST': self.postgres.database.instance_endpoint.hostname,
+            'DB_NAME': self.postgres.database_name,
+            'INI_NAME': self.props.ini_name,
+            'DEFAULT_EVENT_BUS': self.props.existing_resources.bus.default.event_bus_arn,
+            'EVENT_SOURCE': get_event_source_from_config(self.props.config),
+            'OPENSEARCH_URL': self.opensearch_for_reading.url,
+            'OPENSEARCH_FOR_WRITING_URL': self.opensearch_for_writing.url,
+            'TRANSACTION_QUEUE_URL': self.props.transaction_queue.queue.queue_url,
+            'INVALIDATION_QUEUE_URL': self.props.invalidation_queue.queue.queue_url,
+            'TRANSACTION_DEAD_LETTER_QUEUE_URL': self.props.transaction_queue.dead_letter_queue.queue_url,
+            'INVALIDATION_DEAD_LETTER_QUEUE_URL': self.props.invalidation_queue.dead_letter_queue.queue_url,
+            'UPLOAD_USER_ACCESS_KEYS_SECRET_ARN': self.props.existing_resources.upload_igvf_files_user_access_keys.secret.secret_arn,
+            'RESTRICTED_UPLOAD_USER_ACCESS_KEYS_SECRET_ARN': self.props.existing_resources.upload_igvf_restricted_files_user_access_keys.secret.secret_arn,
+            'APPCONFIG_APPLICATION': self.props.feature_flag_service.application.name,
+            'APPCONFIG_ENVIRONMENT': self.props.feature_flag_service.environment.name,
+            'APPCONFIG_PROFILE': self.props.feature_flag_service.configuration_profile.name,
+        }
+
+    def get_application_secrets(self) -> Dict[str, Secret]:
+        return {
+            'DB_PASSWORD': self._get_database_secret(),
+            'SESSION_SECRET': self._get_session_secret(),
+        }
+
     def _add_application_container_to_task(self) -> None:
         container_name = 'pyramid'
         self.fargate_service.task_definition.add_container(
             'ApplicationContainer',
             container_name=container_name,
             image=self.application_image,
-            environment={
-                'DB_HOST': self.postgres.database.instance_endpoint.hostname,
-                'DB_NAME': self.postgres.database_name,
-                'INI_NAME': self.props.ini_name,
-                'DEFAULT_EVENT_BUS': self.props.existing_resources.bus.default.event_bus_arn,
-                'EVENT_SOURCE': get_event_source_from_config(self.props.config),
-                'OPENSEARCH_URL': self.opensearch_for_reading.url,
-                'OPENSEARCH_FOR_WRITING_URL': self.opensearch_for_writing.url,
-                'TRANSACTION_QUEUE_URL': self.props.transaction_queue.queue.queue_url,
-                'INVALIDATION_QUEUE_URL': self.props.invalidation_queue.queue.queue_url,
-                'TRANSACTION_DEAD_LETTER_QUEUE_URL': self.props.transaction_queue.dead_letter_queue.queue_url,
-                'INVALIDATION_DEAD_LETTER_QUEUE_URL': self.props.invalidation_queue.dead_letter_queue.queue_url,
-                'UPLOAD_USER_ACCESS_KEYS_SECRET_ARN': self.props.existing_resources.upload_igvf_files_user_access_keys.secret.secret_arn,
-                'RESTRICTED_UPLOAD_USER_ACCESS_KEYS_SECRET_ARN': self.props.existing_resources.upload_igvf_restricted_files_user_access_keys.secret.secret_arn,
-                'APPCONFIG_APPLICATION': self.props.feature_flag_service.application.name,
-                'APPCONFIG_ENVIRONMENT': self.props.feature_flag_service.environment.name,
-                'APPCONFIG_PROFILE': self.props.feature_flag_service.configuration_profile.name,
-            },
-            secrets={
-                'DB_PASSWORD': self._get_database_secret(),
-                'SESSION_SECRET': self._get_session_secret(),
-            },
+            environment=self.get_application_environment(),
+            secrets=self.get_application_secrets(),
             logging=self.application_log_driver,
         )
 
@@ -359,6 +376,22 @@ class Backend(Construct):
             )
         )
 
+    def _define_metadata_jobs_bucket(self) -> None:
+        self.metadata_jobs_bucket = None
+        if self.props.metadata_jobs_bucket_name is not None:
+            self.metadata_jobs_bucket = Bucket.from_bucket_name(
+                self,
+                'MetadataJobsBucket',
+                self.props.metadata_jobs_bucket_name,
+            )
+
+    def _allow_task_to_read_and_write_metadata_jobs_bucket(self) -> None:
+        # Enqueues export jobs and serves their status and results.
+        if self.metadata_jobs_bucket is not None:
+            self.metadata_jobs_bucket.grant_read_write(
+                self.fargate_service.task_definition.task_role
+            )
+
     def _configure_health_check(self) -> None:
         self.fargate_service.target_group.configure_health_check(
             interval=cdk.Duration.seconds(60),
@@ -0,0 +1,130 @@
+import aws_cdk as cdk
+
+from constructs import Construct
+
+from aws_cdk.aws_ec2 import Port
+
+from aws_cdk.aws_ecs import AwsLogDriverMode
+from aws_cdk.aws_ecs import FargateService
+from aws_cdk.aws_ecs import FargateTaskDefinition
+from aws_cdk.aws_ecs import LogDriver
+
+from aws_cdk.aws_iam import PolicyStatement
+
+from infrastructure.config import Config
+
+from infrastructure.constructs.backend import Backend
+
+from typing import Any
+
+from dataclasses import dataclass
+
+
+@dataclass
+class MetadataJobsWorkerProps:
+    config: Config
+    backend: Backend
+    cpu: int = 1024
+    memory_limit_mib: int = 4096
+
+
+class MetadataJobsWorker(Construct):
+
+    props: MetadataJobsWorkerProps
+    task_definition: FargateTaskDefinition
+    fargate_service: FargateService
+
+    def __init__(
+            self,
+            scope: Construct,
+            construct_id: str,
+            *,
+            props: MetadataJobsWorkerProps,
+            **kwargs: Any
+    ) -> None:
+        super().__init__(scope, construct_id, **kwargs)
+        self.props = props
+        self._define_task_definition()
+        self._add_worker_container_to_task()
+        self._define_fargate_service()
+        self._allow_connections_to_database()
+        self._allow_connections_to_opensearch_for_reading()
+        self._allow_task_to_read_feature_flags()
+        self._allow_task_to_read_and_write_metadata_jobs_bucket()
+        self._add_tags_to_fargate_service()
+
+    def _define_task_definition(self) -> None:
+        self.task_definition = FargateTaskDefinition(
+            self,
+            'TaskDef',
+            cpu=self.props.cpu,
+            memory_limit_mib=self.props.memory_limit_mib,
+        )
+
+    def _add_worker_container_to_task(self) -> None:
+        self.task_definition.add_container(
+            'WorkerContainer',
+            container_name='metadata-jobs',
+            image=self.props.backend.application_image,
+            environment=self.props.backend.get_application_environment(),
+            secrets=self.props.backend.get_application_secrets(),
+            command=['/scripts/pyramid/run-metadata-jobs.sh'],
+            logging=LogDriver.aws_logs(
+                stream_prefix='metadata-jobs',
+                mode=AwsLogDriverMode.NON_BLOCKING,
+            ),
+        )
+
+    def _define_fargate_service(self) -> None:
+        # Queued jobs are taken by a single worker, which is stopped
+        # before its replacement starts so no job runs twice.
+        self.fargate_service = FargateService(
+            self,
+            'Fargate',
+            service_name='MetadataJobsWorker',
+            cluster=self.props.backend.fargate_service.cluster,
+            task_definition=self.task_definition,
+            desired_count=1,
+            min_healthy_percent=0,
+            max_healthy_percent=100,
+            assign_public_ip=True,
+            enable_execute_command=True,
+        )
+
+    def _allow_connections_to_database(self) -> None:
+        self.fargate_service.connections.allow_to(
+            self.props.backend.postgres.database,
+            Port.tcp(5432),
+            description='Allow connection to Postgres instance',
+        )
+
+    def _allow_connections_to_opensearch_for_reading(self) -> None:
+        self.fargate_service.connections.allow_to(
+            self.props.backend.opensearch_for_reading.domain,
+            Port.tcp(443),
+            description='Allow connection to Opensearch',
+        )
+
+    def _allow_task_to_read_feature_flags(self) -> None:
+        self.task_definition.add_to_task_role_policy(
+            PolicyStatement(
+                actions=[
+                    'appconfig:StartConfigurationSession',
+                    'appconfig:GetLatestConfiguration',
+                ],
+                resources=['*']
+            )
+        )
+
+    def _allow_task_to_read_and_write_metadata_jobs_bucket(self) -> None:
+        # Takes queued jobs and uploads their status and results.
+        if self.props.backend.metadata_jobs_bucket is not None:
+            self.props.backend.metadata_jobs_bucket.grant_read_write(
+                self.task_definition.task_role
+            )
+
+    def _add_tags_to_fargate_service(self) -> None:
+        cdk.Tags.of(self.fargate_service).add(
+            'branch',
+            self.props.config.branch
+        )
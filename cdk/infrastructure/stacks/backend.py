@@ -12,6 +12,9 @@ from infrastructure.constructs.indexer import IndexingServiceProps
 from infrastructure.constructs.indexer import IndexerProps
 from infrastructure.constructs.indexer import Indexer
 
+from infrastructure.constructs.metadata_jobs import MetadataJobsWorker
+from infrastructure.constructs.metadata_jobs import MetadataJobsWorkerProps
+
 from infrastructure.constructs.queue import QueueProps
 from infrastructure.constructs.queue import TransactionQueue
 from infrastructure.constructs.queue import InvalidationQueue
@@ -26,6 +29,7 @@ from infrastructure.constructs.existing.types import ExistingResourcesClass
 from infrastructure.multiplexer import Multiplexer
 
 from typing import Any
+from typing import Optional
 
 
 class BackendStack(cdk.Stack):
@@ -82,6 +86,17 @@ class BackendStack(cdk.Stack):
                 feature_flag_service=self.feature_flag_service,
             )
         )
+        # Metadata jobs are disabled by inis without a jobs bucket.
+        self.metadata_jobs_worker: Optional[MetadataJobsWorker] = None
+        if self.backend.metadata_jobs_bucket is not None:
+            self.metadata_jobs_worker = MetadataJobsWorker(
+                self,
+                'MetadataJobsWorker',
+                props=MetadataJobsWorkerProps(
+                    config=config,
+                    backend=self.backend,
+                )
+            )
         self.indexer = Indexer(
             self,
             'Indexer',
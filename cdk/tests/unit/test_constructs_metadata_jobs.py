@@ -0,0 +1,288 @@
+import pytest
+
+from aws_cdk.assertions import Match
+from aws_cdk.assertions import Template
+
+
+def test_constructs_metadata_jobs_initialize_metadata_jobs_worker(
+        stack,
+        instance_type,
+        postgres_engine_version,
+        existing_resources,
+        config,
+        opensearch_multiplexer,
+        transaction_queue,
+        invalidation_queue,
+        feature_flag_service,
+):
+    from infrastructure.constructs.backend import Backend
+    from infrastructure.constructs.backend import BackendProps
+    from infrastructure.constructs.metadata_jobs import MetadataJobsWorker
+    from infrastructure.constructs.metadata_jobs import MetadataJobsWorkerProps
+    from infrastructure.constructs.postgres import Postgres
+    from infrastructure.constructs.postgres import PostgresProps
+    from infrastructure.multiplexer import Multiplexer
+    from infrastructure.multiplexer import MultiplexerConfig
+    # Given
+    postgres_multiplexer = Multiplexer(
+        stack,
+        configs=[
+            MultiplexerConfig(
+                construct_id='Postgres',
+                on=True,
+                construct_class=Postgres,
+                kwargs={
+                    'props': PostgresProps(
+                        config=config,
+                        existing_resources=existing_resources,
+                        allocated_storage=10,
+                        max_allocated_storage=20,
+                        instance_type=instance_type,
+                        engine_version=postgres_engine_version,
+                    )
+                }
+            ),
+        ]
+    )
+    backend = Backend(
+        stack,
+        'TestBackend',
+        props=BackendProps(
+            config=config,
+            existing_resources=existing_resources,
+            postgres_multiplexer=postgres_multiplexer,
+            opensearch_multiplexer=opensearch_multiplexer,
+            transaction_queue=transaction_queue,
+            invalidation_queue=invalidation_queue,
+            feature_flag_service=feature_flag_service,
+            cpu=2048,
+            memory_limit_mib=4096,
+            desired_count=4,
+            max_capacity=7,
+            ini_name='demo.ini',
+            use_postgres_named='Postgres',
+            read_from_opensearch_named='Opensearch',
+            write_to_opensearch_named='Opensearch',
+            metadata_jobs_bucket_name='some-metadata-jobs-bucket',
+        )
+    )
+    # When
+    worker = MetadataJobsWorker(
+        stack,
+        'TestMetadataJobsWorker',
+        props=MetadataJobsWorkerProps(
+            config=config,
+            backend=backend,
+        )
+    )
+    template = Template.from_stack(stack)
+    # Then
+    assert isinstance(worker, MetadataJobsWorker)
+    template.resource_count_is(
+        'AWS::ECS::Service',
+        2
+    )
+    template.has_resource_properties(
+        'AWS::ECS::Service',
+        {
+            'DeploymentConfiguration': {
+                'MaximumPercent': 100,
+                'MinimumHealthyPercent': 0
+            },
+            'DesiredCount': 1,
+            'EnableExecuteCommand': True,
+            'LaunchType': 'FARGATE',
+            'ServiceName': 'MetadataJobsWorker',
+            'Tags': [
+                {
+                    'Key': 'branch',
+                    'Value': 'some-branch'
+                }
+            ],
+        }
+    )
+    template.has_resource_properties(
+        'AWS::ECS::TaskDefinition',
+        {
+            'ContainerDefinitions': [
+                Match.object_like(
+                    {
+                        'Command': [
+                            '/scripts/pyramid/run-metadata-jobs.sh'
+                        ],
+                        'Environment': Match.array_with(
+                            [
+                                {
+                                    'Name': 'INI_NAME',
+                                    'Value': 'demo.ini'
+                                },
+                            ]
+                        ),
+                        'Essential': True,
+                        'Name': 'metadata-jobs',
+                    }
+                )
+            ],
+            'Cpu': '1024',
+            'Memory': '4096',
+        }
+    )
+    template.has_resource_properties(
+        'AWS::EC2::SecurityGroupIngress',
+        {
+            'IpProtocol': 'tcp',
+            'Description': 'Allow connection to Postgres instance',
+            'FromPort': 5432,
+            'GroupId': {
+                'Fn::GetAtt': [
+                    'PostgresSecurityGroupA2E13118',
+                    'GroupId'
+                ]
+            },
+            'SourceSecurityGroupId': {
+                'Fn::GetAtt': [
+                    'TestMetadataJobsWorkerFargateSecurityGroupCF89CB98',
+                    'GroupId'
+                ]
+            },
+            'ToPort': 5432
+        }
+    )
+    template.has_resource_properties(
+        'AWS::IAM::Policy',
+        {
+            'PolicyDocument': {
+                'Statement': Match.array_with(
+                    [
+                        Match.object_like(
+                            {
+                                'Action': Match.array_with(
+                                    [
+                                        's3:GetObject*',
+                                        's3:List*',
+                                        's3:DeleteObject*',
+                                        's3:PutObject',
+                                    ]
+                                ),
+                                'Effect': 'Allow',
+                                'Resource': Match.array_with(
+                                    [
+                                        {
+                                            'Fn::Join': [
+                                                '',
+                                                [
+                                                    'arn:',
+                                                    {
+                                                        'Ref': 'AWS::Partition'
+                                                    },
+                                                    ':s3:::some-metadata-jobs-bucket'
+                                                ]
+                                            ]
+                                        },
+                                    ]
+                                ),
+                            }
+                        ),
+                    ]
+                ),
+            },
+            'Roles': [
+                {
+                    'Ref': 'TestMetadataJobsWorkerTaskDefTaskRole78DF847D'
+                }
+            ],
+        }
+    )
+    template.has_resource_properties(
+        'AWS::IAM::Policy',
+        {
+            'PolicyDocument': {
+                'Statement': Match.array_with(
+                    [
+                        Match.object_like(
+                            {
+                                'Action': Match.array_with(
+                                    [
+                                        's3:GetObject*',
+                                        's3:List*',
+                                        's3:DeleteObject*',
+                                        's3:PutObject',
+                                    ]
+                                ),
+                                'Effect': 'Allow',
+                            }
+                        ),
+                    ]
+                ),
+            },
+            'Roles': [
+                {
+                    'Ref': 'TestBackendFargateTaskDefTaskRoleD1640BC4'
+                }
+            ],
+        }
+    )
+
+
+def test_constructs_metadata_jobs_backend_without_metadata_jobs_bucket(
+        stack,
+        instance_type,
+        postgres_engine_version,
+        existing_resources,
+        config,
+        opensearch_multiplexer,
+        transaction_queue,
+        invalidation_queue,
+        feature_flag_service,
+):
+    from infrastructure.constructs.backend import Backend
+    from infrastructure.constructs.backend import BackendProps
+    from infrastructure.constructs.postgres import Postgres
+    from infrastructure.constructs.postgres import PostgresProps
+    from infrastructure.multiplexer import Multiplexer
+    from infrastructure.multiplexer import MultiplexerConfig
+    # Given
+    postgres_multiplexer = Multiplexer(
+        stack,
+        configs=[
+            MultiplexerConfig(
+                construct_id='Postgres',
+                on=True,
+                construct_class=Postgres,
+                kwargs={
+                    'props': PostgresProps(
+                        config=config,
+                        existing_resources=existing_resources,
+                        allocated_storage=10,
+                        max_allocated_storage=20,
+                        instance_type=instance_type,
+                        engine_version=postgres_engine_version,
+                    )
+                }
+            ),
+        ]
+    )
+    # When
+    backend = Backend(
+        stack,
+        'TestBackend',
+        props=BackendProps(
+            config=config,
+            existing_resources=existing_resources,
+            postgres_multiplexer=postgres_multiplexer,
+            opensearch_multiplexer=opensearch_multiplexer,
+            transaction_queue=transaction_queue,
+            invalidation_queue=invalidation_queue,
+            feature_flag_service=feature_flag_service,
+            cpu=2048,
+            memory_limit_mib=4096,
+            desired_count=4,
+            max_capacity=7,
+            ini_name='demo.ini',
+            use_postgres_named='Postgres',
+            read_from_opensearch_named='Opensearch',
+            write_to_opensearch_named='Opensearch',
+        )
+    )
+    # Then
+    assert backend.metadata_jobs_bucket is None
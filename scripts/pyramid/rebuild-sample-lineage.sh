@@ -0,0 +1,3 @@
+#!/bin/bash
+export SQLALCHEMY_URL=postgresql://postgres:${DB_PASSWORD}@${DB_HOST}/${DB_NAME}
+rebuild-sample-lineage config/pyramid/ini/${INI_NAME} --app-name app
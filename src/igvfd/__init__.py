@@ -2,6 +2,7 @@ __version__ = '41.0.0'
 
 
 import igvfd.schema_formats  # needed to import before snovault to add FormatCheckers
+import igvfd.lineage  # needed to import before create_all to add the sample_lineage table
 import base64
 import codecs
 import copy
@@ -244,6 +245,9 @@ def main(global_config, **local_config):
     config.include('.renderers')
     config.include('.authentication')
     config.include('.server_defaults')
+    config.include('.embed')
+    config.include('.memoize')
+    config.include('.lineage')
     config.include('.types')
     config.include('.searches.configs')
     config.include('.root')
@@ -252,6 +256,7 @@ def main(global_config, **local_config):
     config.include('.report')
     config.include('.metadata.metadata')
     config.include('.metadata.batch_download')
+    config.include('.metadata.jobs')
     config.include('.verify_email')
 
     if 'elasticsearch.server' in config.registry.settings:
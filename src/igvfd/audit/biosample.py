@@ -8,6 +8,8 @@ from .formatter import (
     get_audit_description,
     space_in_words
 )
+from igvfd.lineage import get_donor_paths
+from igvfd.lineage import get_samples_lineage
 
 
 @audit_checker('Biosample', frame='object')
@@ -26,12 +28,21 @@ def audit_biosample_taxa_check(value, system):
     if 'donors' in value:
         sample_id = value['@id']
         donor_ids = value.get('donors')
+        request = system.get('request')
+        lineage = get_samples_lineage(request, [sample_id]).get(sample_id)
+        if lineage is not None:
+            donor_taxa = dict(zip(
+                get_donor_paths(request, [donor['donor'] for donor in lineage]),
+                [donor['taxa'] for donor in lineage]
+            ))
         taxa_dict = {}
         for d in donor_ids:
-            donor_object = system.get('request').embed(d + '@@object?skip_calculated=true')
+            if lineage is not None:
+                taxa = donor_taxa.get(d)
+            else:
+                taxa = request.embed(d + '@@object?skip_calculated=true').get('taxa')
             d_link = audit_link(path_to_text(d), d)
-            if donor_object.get('taxa'):
-                taxa = donor_object.get('taxa')
+            if taxa:
                 if taxa not in taxa_dict:
                     taxa_dict[taxa] = []
 
@@ -0,0 +1,366 @@
+'''
+End-to-end benchmark for the export endpoints.
+
+Loads synthetic MeasurementSets and SequenceFiles shaped like the test
+inserts into the local stack (Postgres, OpenSearch and the indexing
+services from docker-compose, with the test inserts already loaded), then
+calls /metadata, /batch-download, /report.tsv and /multireport.tsv in
+process and records rows/sec, peak RSS and time to first byte for each
+scale in a JSON results file.
+
+    python -m igvfd.benchmarks.exports --files 1k --files 10k --output export-benchmarks.json
+
+Synthetic items are tagged with a submitter comment and reused by later
+runs, so each scale only loads the files missing from the previous one.
+'''
+import argparse
+import datetime
+import hashlib
+import json
+import logging
+import os
+import platform
+import string
+import threading
+import time
+import uuid
+
+import psutil
+
+from humanfriendly import parse_size
+from pathlib import Path
+from pkg_resources import resource_filename
+from pyramid.paster import get_app
+from urllib.parse import urlencode
+from webob import Request
+from webtest import TestApp
+
+
+logging.basicConfig()
+log = logging.getLogger('igvfd.benchmarks.exports')
+log.setLevel(logging.INFO)
+
+
+MARKER = 'igvfd export benchmark'
+
+UUID_NAMESPACE = uuid.UUID('dd060eae-22ed-451e-824a-748abe64d8bc')
+
+ENVIRON = {
+    'HTTP_ACCEPT': 'application/json',
+    'REMOTE_USER': 'TEST',
+}
+
+FILE_SET_TYPE = 'measurement_set'
+FILE_TYPE = 'sequence_file'
+
+# Keys of the insert templates that must be unique or
+# that link to items the synthetic sets should not share.
+EXCLUDED_TEMPLATE_KEYS = [
+    'uuid',
+    'accession',
+    'aliases',
+    'md5sum',
+    'auxiliary_sets',
+    'control_file_sets',
+]
+
+# Name, path, query, and number of lines before the first row.
+EXPORTS = [
+    ('metadata', '/metadata/', {'type': 'MeasurementSet', 'submitter_comment': MARKER}, 1),
+    ('batch-download', '/batch-download/', {'type': 'MeasurementSet', 'submitter_comment': MARKER}, 1),
+    ('report.tsv', '/report.tsv', {'type': 'SequenceFile', 'submitter_comment': MARKER}, 2),
+    ('multireport.tsv', '/multireport.tsv', {'type': 'SequenceFile', 'submitter_comment': MARKER}, 2),
+]
+
+DEFAULT_FILES_PER_FILE_SET = 100
+
+RSS_SAMPLE_INTERVAL_SECONDS = 0.01
+
+INDEXING_POLL_INTERVAL_SECONDS = 10
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        description='Benchmark export endpoints on synthetic file sets',
+    )
+    parser.add_argument(
+        '--app-name',
+        default='app',
+        help='Pyramid app name in config file',
+    )
+    parser.add_argument(
+        '--config_uri',
+        default=f'{Path().absolute()}/config/pyramid/ini/development.ini',
+        help='Path to config file',
+    )
+    parser.add_argument(
+        '--files',
+        action='append',
+        type=parse_size,
+        help='Number of synthetic files to benchmark, e.g. 1k or 1M (repeatable)',
+    )
+    parser.add_argument(
+        '--files-per-file-set',
+        type=int,
+        default=DEFAULT_FILES_PER_FILE_SET,
+    )
+    parser.add_argument(
+        '--exports',
+        nargs='+',
+        choices=[name for name, _, _, _ in EXPORTS],
+        default=[name for name, _, _, _ in EXPORTS],
+    )
+    parser.add_argument(
+        '--output',
+        default='export-benchmarks.json',
+        help='Path of JSON results file',
+    )
+    return parser
+
+
+def make_uuid(item_type, i):
+    return str(uuid.uuid5(UUID_NAMESPACE, f'{item_type}-{i}'))
+
+
+def make_accession(prefix, i):
+    # PKB + type + four digits + four letters.
+    digits = i % 10000
+    letters = ''
+    remainder = i // 10000
+    for _ in range(4):
+        remainder, index = divmod(remainder, 26)
+        letters = string.ascii_uppercase[index] + letters
+    return f'PKB{prefix}{digits:04d}{letters}'
+
+
+def load_insert_template(item_type):
+    path = os.path.join(
+        resource_filename('igvfd', 'tests/data/inserts/'),
+        f'{item_type}.json'
+    )
+    with open(path) as insert_file:
+        template = json.load(insert_file)[0]
+    return {
+        k: v
+        for k, v in template.items()
+        if k not in EXCLUDED_TEMPLATE_KEYS
+    }
+
+
+def make_file_set(template, i):
+    file_set = dict(template)
+    file_set.update(
+        {
+            'uuid': make_uuid(FILE_SET_TYPE, i),
+            'accession': make_accession('DS', i),
+            'submitter_comment': MARKER,
+        }
+    )
+    return file_set
+
+
+def make_file(template, i, files_per_file_set):
+    accession = make_accession('FI', i)
+    file_ = dict(template)
+    file_.update(
+        {
+            'uuid': make_uuid(FILE_TYPE, i),
+            'accession': accession,
+            'md5sum': hashlib.md5(f'{MARKER} {i}'.encode('utf-8')).hexdigest(),
+            'submitted_file_name': f'/benchmark/{accession}.bam',
+            'file_set': make_uuid(FILE_SET_TYPE, i // files_per_file_set),
+            'submitter_comment': MARKER,
+        }
+    )
+    return file_
+
+
+def post_item(testapp, item_type, item):
+    # Items left over from an interrupted run already exist.
+    testapp.post_json(f'/{item_type}', item, status=[201, 409])
+
+
+def count_synthetic_items(testapp, search_type):
+    query = urlencode(
+        {
+            'type': search_type,
+            'submitter_comment': MARKER,
+            'limit': 0,
+        }
+    )
+    return testapp.get(f'/search/?{query}', status='*').json.get('total', 0)
+
+
+def count_embedded_files(testapp, file_set_index):
+    query = urlencode(
+        {
+            'type': 'MeasurementSet',
+            'uuid': make_uuid(FILE_SET_TYPE, file_set_index),
+            'field': 'files.@id',
+        }
+    )
+    graph = testapp.get(f'/search/?{query}', status='*').json.get('@graph', [])
+    if not graph:
+        return 0
+    return len(graph[0].get('files', []))
+
+
+def load_synthetic_items(testapp, start, end, files_per_file_set):
+    file_set_template = load_insert_template(FILE_SET_TYPE)
+    file_template = load_insert_template(FILE_TYPE)
+    first_file_set = start // files_per_file_set
+    last_file_set = (end - 1) // files_per_file_set
+    for i in range(first_file_set, last_file_set + 1):
+        post_item(testapp, FILE_SET_TYPE, make_file_set(file_set_template, i))
+    for i in range(start, end):
+        post_item(testapp, FILE_TYPE, make_file(file_template, i, files_per_file_set))
+        if (i + 1) % 1000 == 0:
+            log.info('Loaded %s of %s files', i + 1, end)
+
+
+def wait_for_indexing(testapp, files, files_per_file_set):
+    # The last file set is the last to get its files embedded.
+    file_sets = -(-files // files_per_file_set)
+    expected_embedded_files = files - (file_sets - 1) * files_per_file_set
+    while True:
+        indexed_files = count_synthetic_items(testapp, 'SequenceFile')
+        indexed_file_sets = count_synthetic_items(testapp, 'MeasurementSet')
+        embedded_files = count_embedded_files(testapp, file_sets - 1)
+        log.info(
+            'Waiting for indexing: %s of %s files, %s of %s file sets',
+            indexed_files,
+            files,
+            indexed_file_sets,
+            file_sets,
+        )
+        if (
+                indexed_files >= files and
+                indexed_file_sets >= file_sets and
+                embedded_files >= expected_embedded_files
+        ):
+            return
+        time.sleep(INDEXING_POLL_INTERVAL_SECONDS)
+
+
+class PeakRSSSampler:
+    '''
+    Samples the resident set size of this process on a background
+    thread and keeps the highest value seen while in the context.
+    '''
+
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL_SECONDS):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.peak_rss = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        self.peak_rss = max(self.peak_rss, self.process.memory_info().rss)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def measure_export(app, url, header_lines):
+    '''
+    Calls the WSGI app directly so the time to the first
+    chunk of the body can be measured while it streams.
+    '''
+    request = Request.blank(url, environ=dict(ENVIRON))
+    time_to_first_byte = None
+    number_of_bytes = 0
+    number_of_lines = 0
+    with PeakRSSSampler() as sampler:
+        start = time.perf_counter()
+        status, headers, app_iter = request.call_application(app)
+        try:
+            for chunk in app_iter:
+                if not chunk:
+                    continue
+                if time_to_first_byte is None:
+                    time_to_first_byte = time.perf_counter() - start
+                number_of_bytes += len(chunk)
+                number_of_lines += chunk.count(b'\n')
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+        seconds = time.perf_counter() - start
+    rows = max(number_of_lines - header_lines, 0)
+    return {
+        'url': url,
+        'status': status,
+        'rows': rows,
+        'bytes': number_of_bytes,
+        'seconds': seconds,
+        'rows_per_second': rows / seconds if seconds else None,
+        'time_to_first_byte_seconds': time_to_first_byte,
+        'peak_rss_bytes': sampler.peak_rss,
+    }
+
+
+def write_results(path, args, results):
+    with open(path, 'w') as results_file:
+        json.dump(
+            {
+                'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                'config_uri': args.config_uri,
+                'python_version': platform.python_version(),
+                'files_per_file_set': args.files_per_file_set,
+                'results': results,
+            },
+            results_file,
+            indent=4,
+        )
+
+
+def main():
+    args = get_parser().parse_args()
+    app = get_app(
+        args.config_uri,
+        args.app_name,
+    )
+    testapp = TestApp(app, ENVIRON)
+    results = []
+    for files in sorted(set(args.files or [1000])):
+        loaded = count_synthetic_items(testapp, 'SequenceFile')
+        if loaded > files:
+            log.warning('Skipping %s files, %s synthetic files already loaded', files, loaded)
+            continue
+        load_synthetic_items(testapp, loaded, files, args.files_per_file_set)
+        wait_for_indexing(testapp, files, args.files_per_file_set)
+        for name, path, query, header_lines in EXPORTS:
+            if name not in args.exports:
+                continue
+            result = {
+                'export': name,
+                'files': files,
+                'file_sets': -(-files // args.files_per_file_set),
+            }
+            result.update(measure_export(app, f'{path}?{urlencode(query)}', header_lines))
+            log.info(
+                '%s: %s files, %.0f rows/sec, %.3fs to first byte, %s peak RSS',
+                name,
+                files,
+                result['rows_per_second'] or 0,
+                result['time_to_first_byte_seconds'] or 0,
+                result['peak_rss_bytes'],
+            )
+            results.append(result)
+            # Keep results of finished exports if a larger scale fails.
+            write_results(args.output, args, results)
+
+
+if __name__ == '__main__':
+    main()
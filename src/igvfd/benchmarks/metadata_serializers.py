@@ -0,0 +1,191 @@
+'''
+Microbenchmark for metadata cell serialization.
+
+Compares rows/sec of the per-call simple_path_ids cell makers against the
+compiled column accessors on a synthetic FileSet search result.
+
+    python -m igvfd.benchmarks.metadata_serializers --files 100000
+'''
+import argparse
+import logging
+import time
+
+from igvfd.metadata.constants import BATCH_DOWNLOAD_COLUMN_TO_FIELDS_MAPPING
+from igvfd.metadata.constants import METADATA_COLUMN_TO_FIELDS_MAPPING
+from igvfd.metadata.serializers import compile_column_to_fields_mapping
+from igvfd.metadata.serializers import compile_experiment_cell
+from igvfd.metadata.serializers import compile_file_cell
+from snovault.util import simple_path_ids
+
+
+logging.basicConfig()
+log = logging.getLogger('igvfd.benchmarks.metadata_serializers')
+log.setLevel(logging.INFO)
+
+
+FILES_PREFIX = 'files.'
+
+
+def legacy_make_experiment_cell(paths, experiment):
+    last = []
+    for path in paths:
+        cell_value = []
+        for value in simple_path_ids(experiment, path):
+            if str(value) not in cell_value:
+                cell_value.append(str(value))
+        if last and cell_value:
+            last = [
+                v + ' ' + cell_value[0]
+                for v in last
+            ]
+        else:
+            last = cell_value
+    return ', '.join(set(last))
+
+
+def legacy_make_file_cell(paths, file_):
+    if len(paths) == 1 and '.' not in paths[0]:
+        value = file_.get(paths[0], '')
+        if isinstance(value, list):
+            return ', '.join([str(v) for v in value])
+        return value
+    last = []
+    for path in paths:
+        cell_value = []
+        for value in simple_path_ids(file_, path):
+            cell_value.append(str(value))
+        if last and cell_value:
+            last = [
+                v + ' ' + cell_value[0]
+                for v in last
+            ]
+        else:
+            last = cell_value
+    return ', '.join(sorted(set(last)))
+
+
+def make_synthetic_file(i):
+    return {
+        '@id': f'/sequence-files/IGVFFI{i:07d}/',
+        'accession': f'IGVFFI{i:07d}',
+        'file_format': 'fastq',
+        'content_type': 'reads',
+        'file_size': 1000000 + i,
+        'href': f'/sequence-files/IGVFFI{i:07d}/@@download/IGVFFI{i:07d}.fastq.gz',
+        'status': 'released',
+        'sequencing_platform': {
+            'term_name': 'Illumina NovaSeq 6000',
+        },
+        'lab': {
+            'title': 'J. Michael Cherry, Stanford',
+        },
+    }
+
+
+def make_synthetic_file_set(number_of_files):
+    return {
+        '@id': '/measurement-sets/IGVFDS0000AAAA/',
+        'accession': 'IGVFDS0000AAAA',
+        'creation_timestamp': '2024-01-01T00:00:00.000000+00:00',
+        'assay_term': {
+            'term_name': 'single-cell RNA sequencing assay',
+        },
+        'donors': [
+            {'accession': f'IGVFDO{i:04d}AAAA'}
+            for i in range(5)
+        ],
+        'samples': [
+            {'accession': f'IGVFSM{i:04d}AAAA'}
+            for i in range(20)
+        ],
+        'lab': {
+            'title': 'J. Michael Cherry, Stanford',
+        },
+        'files': [
+            make_synthetic_file(i)
+            for i in range(number_of_files)
+        ],
+    }
+
+
+def split_mapping(column_to_fields_mapping):
+    experiment_mapping = {}
+    file_mapping = {}
+    for column, fields in column_to_fields_mapping.items():
+        if fields[0].startswith(FILES_PREFIX):
+            file_mapping[column] = [
+                field.replace(FILES_PREFIX, '')
+                for field in fields
+            ]
+        else:
+            experiment_mapping[column] = fields
+    return experiment_mapping, file_mapping
+
+
+def run_legacy(file_set, experiment_mapping, file_mapping):
+    rows = 0
+    experiment_data = {
+        column: legacy_make_experiment_cell(fields, file_set)
+        for column, fields in experiment_mapping.items()
+    }
+    for file_ in file_set['files']:
+        file_data = {
+            column: legacy_make_file_cell(fields, file_)
+            for column, fields in file_mapping.items()
+        }
+        file_data.update(experiment_data)
+        rows += 1
+    return rows
+
+
+def run_compiled(file_set, experiment_mapping, file_mapping):
+    rows = 0
+    experiment_cells = compile_column_to_fields_mapping(experiment_mapping, compile_experiment_cell)
+    file_cells = compile_column_to_fields_mapping(file_mapping, compile_file_cell)
+    experiment_data = {
+        column: make_cell(file_set)
+        for column, make_cell in experiment_cells.items()
+    }
+    for file_ in file_set['files']:
+        file_data = {
+            column: make_cell(file_)
+            for column, make_cell in file_cells.items()
+        }
+        file_data.update(experiment_data)
+        rows += 1
+    return rows
+
+
+def time_rows_per_second(func, *args):
+    start = time.perf_counter()
+    rows = func(*args)
+    elapsed = time.perf_counter() - start
+    return rows / elapsed if elapsed else float('inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark metadata cell serialization'
+    )
+    parser.add_argument('--files', type=int, default=100000)
+    args = parser.parse_args()
+    file_set = make_synthetic_file_set(args.files)
+    for name, mapping in [
+            ('metadata', METADATA_COLUMN_TO_FIELDS_MAPPING),
+            ('batch-download', BATCH_DOWNLOAD_COLUMN_TO_FIELDS_MAPPING),
+    ]:
+        experiment_mapping, file_mapping = split_mapping(mapping)
+        before = time_rows_per_second(run_legacy, file_set, experiment_mapping, file_mapping)
+        after = time_rows_per_second(run_compiled, file_set, experiment_mapping, file_mapping)
+        log.info(
+            '%s: %s files, before %s rows/sec, after %s rows/sec, speedup %.2fx',
+            name,
+            args.files,
+            f'{before:,.0f}',
+            f'{after:,.0f}',
+            after / before,
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+import datetime
+import pyarrow
+import pyarrow.ipc
+import pyarrow.parquet
+
+
+PARQUET = 'parquet'
+
+ARROW = 'arrow'
+
+COLUMNAR_FORMATS = {
+    PARQUET: {
+        'content_type': 'application/vnd.apache.parquet',
+        'extension': 'parquet',
+    },
+    ARROW: {
+        'content_type': 'application/vnd.apache.arrow.stream',
+        'extension': 'arrows',
+    },
+}
+
+# Rows are buffered and written as one Parquet row group
+# (or one Arrow record batch) per this many rows.
+COLUMNAR_BATCH_SIZE = 10000
+
+STRING = 'string'
+INT64 = 'int64'
+FLOAT64 = 'float64'
+BOOLEAN = 'boolean'
+TIMESTAMP = 'timestamp'
+
+ARROW_TYPES = {
+    STRING: pyarrow.string(),
+    INT64: pyarrow.int64(),
+    FLOAT64: pyarrow.float64(),
+    BOOLEAN: pyarrow.bool_(),
+    TIMESTAMP: pyarrow.timestamp('us', tz='UTC'),
+}
+
+SCHEMA_TYPE_TO_COLUMN_TYPE = {
+    'integer': INT64,
+    'number': FLOAT64,
+    'boolean': BOOLEAN,
+}
+
+
+def _is_empty(value):
+    return value is None or value == ''
+
+
+def to_string(value):
+    if value is None:
+        return None
+    return str(value)
+
+
+def to_int64(value):
+    if _is_empty(value):
+        return None
+    return int(value)
+
+
+def to_float64(value):
+    if _is_empty(value):
+        return None
+    return float(value)
+
+
+def to_boolean(value):
+    if _is_empty(value):
+        return None
+    if isinstance(value, str):
+        return value.lower() == 'true'
+    return bool(value)
+
+
+def to_timestamp(value):
+    if _is_empty(value):
+        return None
+    return datetime.datetime.fromisoformat(value)
+
+
+CONVERTERS = {
+    STRING: to_string,
+    INT64: to_int64,
+    FLOAT64: to_float64,
+    BOOLEAN: to_boolean,
+    TIMESTAMP: to_timestamp,
+}
+
+
+def get_columnar_format(request):
+    columnar_format = request.params.get('format')
+    if columnar_format in COLUMNAR_FORMATS:
+        return columnar_format
+    return None
+
+
+def get_content_type(columnar_format):
+    return COLUMNAR_FORMATS[columnar_format]['content_type']
+
+
+def get_content_disposition(columnar_format, filename):
+    extension = COLUMNAR_FORMATS[columnar_format]['extension']
+    return f'attachment; filename="{filename}.{extension}"'
+
+
+class ChunkedSink:
+    '''
+    Write-only file-like object that buffers what the
+    writers emit until it is drained into the response.
+    '''
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def readable(self):
+        return False
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def make_schema(header, column_types):
+    return pyarrow.schema(
+        [
+            (column, ARROW_TYPES[column_types.get(column, STRING)])
+            for column in header
+        ]
+    )
+
+
+def make_writer(columnar_format, sink, schema):
+    if columnar_format == PARQUET:
+        return pyarrow.parquet.ParquetWriter(sink, schema)
+    return pyarrow.ipc.new_stream(sink, schema)
+
+
+def make_table(schema, converters, rows):
+    columns = [[] for _ in converters]
+    for row in rows:
+        for values, convert, value in zip(columns, converters, row):
+            values.append(convert(value))
+    return pyarrow.Table.from_arrays(
+        [
+            pyarrow.array(values, type=field.type)
+            for values, field in zip(columns, schema)
+        ],
+        schema=schema,
+    )
+
+
+def batched(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def generate_columnar_chunks(columnar_format, header, column_types, rows, batch_size=COLUMNAR_BATCH_SIZE):
+    '''
+    Converts rows of cell values into typed columns and writes
+    them one batch at a time, yielding the encoded bytes of
+    each batch as soon as it is written.
+    '''
+    schema = make_schema(header, column_types)
+    converters = [
+        CONVERTERS[column_types.get(column, STRING)]
+        for column in header
+    ]
+    sink = ChunkedSink()
+    writer = make_writer(columnar_format, sink, schema)
+    for batch in batched(rows, batch_size):
+        writer.write_table(make_table(schema, converters, batch))
+        data = sink.drain()
+        if data:
+            yield data
+    writer.close()
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def get_column_types_from_schema(schema, fields):
+    column_types = {}
+    properties = schema.get('properties', {})
+    for field in fields:
+        schema_type = properties.get(field, {}).get('type')
+        if schema_type in SCHEMA_TYPE_TO_COLUMN_TYPE:
+            column_types[field] = SCHEMA_TYPE_TO_COLUMN_TYPE[schema_type]
+    return column_types
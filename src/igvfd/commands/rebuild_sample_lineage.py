@@ -0,0 +1,70 @@
+import argparse
+import logging
+import transaction
+
+from pyramid.paster import get_app
+from snovault import CONNECTION
+from snovault import DBSESSION
+from snovault.interfaces import TYPES
+from snovault.storage import Resource
+
+from igvfd.lineage import SAMPLE_TYPE
+from igvfd.lineage import SampleLineage
+from igvfd.lineage import create_lineage_table
+from igvfd.lineage import set_sample_lineage
+
+logging.basicConfig()
+logger = logging.getLogger('igvfd')
+logger.setLevel(logging.INFO)
+
+
+def rebuild_sample_lineage(registry):
+    session = registry[DBSESSION]()
+    create_lineage_table(session.connection())
+    connection = registry[CONNECTION]
+    item_types = [
+        registry[TYPES][name].item_type
+        for name in registry[TYPES][SAMPLE_TYPE].subtypes
+    ]
+    sample_uuids = [
+        rid
+        for rid, in session.query(Resource.rid).filter(Resource.item_type.in_(item_types))
+    ]
+    session.query(SampleLineage).delete(synchronize_session=False)
+    for sample_uuid in sample_uuids:
+        set_sample_lineage(session, connection, connection.get_by_uuid(sample_uuid))
+    logger.info('Rebuilt lineage of %s samples', len(sample_uuids))
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        description='Create the sample lineage table if missing and rebuild it from the stored samples and donors',
+    )
+    parser.add_argument(
+        '--app-name',
+        default='app',
+        help='Pyramid app name in config file',
+    )
+    parser.add_argument(
+        'config_uri',
+        help='path to configfile'
+    )
+    return parser
+
+
+def get_args():
+    return get_parser().parse_args()
+
+
+def main():
+    args = get_args()
+    app = get_app(
+        args.config_uri,
+        args.app_name,
+    )
+    with transaction.manager:
+        rebuild_sample_lineage(app.registry)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import logging
+import time
+
+from pyramid.paster import get_app
+
+from igvfd.metadata.constants import METADATA_JOB_STORE
+from igvfd.metadata.jobs import run_queued_jobs
+
+logging.basicConfig()
+logger = logging.getLogger('igvfd')
+logger.setLevel(logging.INFO)
+
+
+def run_metadata_jobs(app, poll_seconds):
+    store = app.registry[METADATA_JOB_STORE]
+    if store is None:
+        logger.info('Metadata export jobs are not enabled')
+    while True:
+        if store is not None:
+            run_queued_jobs(app, store)
+        time.sleep(poll_seconds)
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        description='Run queued metadata export jobs',
+    )
+    parser.add_argument(
+        '--app-name',
+        default='app',
+        help='Pyramid app name in config file',
+    )
+    parser.add_argument(
+        '--poll-seconds',
+        type=float,
+        default=5,
+        help='Seconds to wait between checks for queued jobs',
+    )
+    parser.add_argument(
+        'config_uri',
+        help='path to configfile'
+    )
+    return parser
+
+
+def get_args():
+    return get_parser().parse_args()
+
+
+def main():
+    args = get_args()
+    app = get_app(
+        args.config_uri,
+        args.app_name,
+    )
+    run_metadata_jobs(app, args.poll_seconds)
+
+
+if __name__ == '__main__':
+    main()
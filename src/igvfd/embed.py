@@ -0,0 +1,145 @@
+import uuid
+
+from collections import defaultdict
+from snovault import CONNECTION
+from snovault import DBSESSION
+from snovault.storage import CurrentPropertySheet
+from snovault.storage import Key
+from snovault.storage import Resource
+from sqlalchemy import orm
+
+
+DATABASE = 'database'
+
+# Paths prefetched and embedded at a time. The connection's item cache
+# keeps 1000 items, so half leaves room for the items each embed loads
+# before the prefetched ones would be evicted unused.
+PREFETCH_CHUNK_SIZE = 500
+
+
+def includeme(config):
+    config.add_request_method(embed_many, 'embed_many')
+
+
+def _as_uuid(value):
+    try:
+        return str(uuid.UUID(value))
+    except ValueError:
+        return None
+
+
+def group_paths(request, paths):
+    '''
+    Splits paths into item uuids and unique keys of collections,
+    e.g. /sequence-files/PKBFI0000AAAA/ into ('accession', 'PKBFI0000AAAA').
+    '''
+    uuids = set()
+    unique_keys = defaultdict(set)
+    for path in paths:
+        parts = [part for part in path.split('/') if part]
+        if not parts:
+            continue
+        rid = _as_uuid(parts[-1])
+        if rid is not None:
+            uuids.add(rid)
+            continue
+        if len(parts) != 2:
+            continue
+        try:
+            collection = request.root[parts[0]]
+        except KeyError:
+            continue
+        unique_key = getattr(collection, 'unique_key', None)
+        if unique_key is not None:
+            unique_keys[unique_key].add(parts[1])
+    return uuids, unique_keys
+
+
+def _load_resources(session, uuids):
+    return (
+        session.query(Resource)
+        .options(
+            orm.joinedload(Resource.data).joinedload(CurrentPropertySheet.propsheet)
+        )
+        .filter(Resource.rid.in_(sorted(uuids)))
+        .all()
+    )
+
+
+def _load_keys(session, name, values):
+    return (
+        session.query(Key)
+        .options(
+            orm.joinedload(Key.resource).joinedload(Resource.data).joinedload(CurrentPropertySheet.propsheet)
+        )
+        .filter(Key.name == name, Key.value.in_(sorted(values)))
+        .all()
+    )
+
+
+def cache_item(connection, model):
+    '''
+    Builds the item for model the way Connection.get_by_uuid does and
+    keeps it in the item cache. The session identity map only holds
+    weak references, so without this the loaded rows could be
+    collected and queried again one at a time.
+    '''
+    uuid = str(model.uuid)
+    if connection.item_cache.get(uuid) is not None:
+        return
+    factory_type = connection.types.by_item_type.get(model.item_type)
+    if factory_type is None:
+        # Connection.get_by_uuid raises for these.
+        return
+    item = factory_type.factory(connection.registry, model)
+    model.used_for(item)
+    connection.item_cache[uuid] = item
+
+
+def prefetch_items(request, paths):
+    '''
+    Loads the items behind paths with one query per kind of key
+    instead of one per path, caching them on the connection so
+    lookups by uuid or unique key don't query again.
+    '''
+    if getattr(request, 'datastore', DATABASE) != DATABASE:
+        return
+    connection = request.registry[CONNECTION]
+    uuids, unique_keys = group_paths(request, paths)
+    session = request.registry[DBSESSION]()
+    uuids = {
+        rid for rid in uuids
+        if connection.item_cache.get(rid) is None
+    }
+    if uuids:
+        for model in _load_resources(session, uuids):
+            cache_item(connection, model)
+    for name, values in unique_keys.items():
+        values = {
+            value for value in values
+            if connection.unique_key_cache.get((name, value)) is None
+        }
+        if not values:
+            continue
+        for key in _load_keys(session, name, values):
+            connection.unique_key_cache[(key.name, key.value)] = str(key.rid)
+            cache_item(connection, key.resource)
+
+
+def embed_many(request, paths, frame=None):
+    '''
+    Like [request.embed(path, frame) for path in paths] but fetches
+    the items from the database up front, PREFETCH_CHUNK_SIZE at a
+    time.
+    '''
+    paths = list(paths)
+    embedded = []
+    for start in range(0, len(paths), PREFETCH_CHUNK_SIZE):
+        chunk = paths[start:start + PREFETCH_CHUNK_SIZE]
+        if len(chunk) > 1:
+            prefetch_items(request, chunk)
+        if frame is None:
+            embedded.extend(request.embed(path) for path in chunk)
+        else:
+            embedded.extend(request.embed(path, frame) for path in chunk)
+    return embedded
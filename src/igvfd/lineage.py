@@ -0,0 +1,165 @@
+from pyramid.events import subscriber
+from snovault import AfterModified
+from snovault import CONNECTION
+from snovault import Created
+from snovault import DBSESSION
+from snovault.storage import Base
+from snovault.storage import Key
+from snovault.storage import UUID
+from sqlalchemy import Column
+from sqlalchemy import ForeignKey
+from sqlalchemy import or_
+from sqlalchemy import types
+from igvfd.embed import group_paths
+from igvfd.embed import prefetch_items
+
+
+SAMPLE_TYPE = 'Biosample'
+
+DONOR_TYPE = 'Donor'
+
+
+class SampleLineage(Base):
+    '''
+    The donors of each biosample with the taxa and sex of the donor,
+    kept up to date on writes so the lineage is one indexed read.
+    '''
+    __tablename__ = 'sample_lineage'
+    sample_rid = Column(
+        'sample', UUID, ForeignKey('resources.rid'), primary_key=True)
+    donor_rid = Column(
+        'donor', UUID, ForeignKey('resources.rid'), primary_key=True,
+        index=True)  # Single column index for updates on donor writes
+    taxa = Column(types.String)
+    sex = Column(types.String)
+
+
+def includeme(config):
+    config.scan(__name__)
+
+
+def create_lineage_table(bind):
+    '''
+    For databases created before the table existed, new ones get it
+    from create_tables with the other snovault tables.
+    '''
+    SampleLineage.__table__.create(bind=bind, checkfirst=True)
+
+
+def make_lineage_rows(connection, sample):
+    rows = []
+    for donor_uuid in sample.properties.get('donors', []):
+        donor = connection.get_by_uuid(donor_uuid)
+        if donor is None:
+            continue
+        rows.append(
+            SampleLineage(
+                sample_rid=sample.uuid,
+                donor_rid=donor.uuid,
+                taxa=donor.properties.get('taxa'),
+                sex=donor.properties.get('gender'),
+            )
+        )
+    return rows
+
+
+def set_sample_lineage(session, connection, sample):
+    session.query(SampleLineage).filter(
+        SampleLineage.sample_rid == sample.uuid
+    ).delete(synchronize_session=False)
+    session.add_all(make_lineage_rows(connection, sample))
+
+
+def set_donor_lineage(session, donor):
+    session.query(SampleLineage).filter(
+        SampleLineage.donor_rid == donor.uuid
+    ).update(
+        {
+            'taxa': donor.properties.get('taxa'),
+            'sex': donor.properties.get('gender'),
+        },
+        synchronize_session=False
+    )
+
+
+@subscriber(Created)
+@subscriber(AfterModified)
+def update_lineage(event):
+    item = event.object
+    registry = event.request.registry
+    if SAMPLE_TYPE in item.base_types:
+        set_sample_lineage(registry[DBSESSION](), registry[CONNECTION], item)
+    elif DONOR_TYPE in item.base_types:
+        set_donor_lineage(registry[DBSESSION](), item)
+
+
+def _query_lineage(session, uuids, accessions):
+    conditions = []
+    if uuids:
+        conditions.append(SampleLineage.sample_rid.in_(sorted(uuids)))
+    if accessions:
+        conditions.append(Key.value.in_(sorted(accessions)))
+    return (
+        session.query(SampleLineage, Key.value)
+        .outerjoin(
+            Key,
+            (Key.rid == SampleLineage.sample_rid) & (Key.name == 'accession')
+        )
+        .filter(or_(*conditions))
+        .all()
+    )
+
+
+def get_samples_lineage(request, samples):
+    '''
+    Maps each sample path or uuid to a list of its donors as
+    {'donor': uuid, 'taxa': ..., 'sex': ...}. Samples without rows,
+    i.e. samples other than biosamples and biosamples written before
+    the table existed, are left out so callers can fall back to
+    embedding them.
+
+    The samples and donors are recorded as embedded so the indexer
+    still invalidates the caller when one of them changes.
+    '''
+    uuids, unique_keys = group_paths(request, samples)
+    accessions = unique_keys.get('accession', set())
+    if not uuids and not accessions:
+        return {}
+    session = request.registry[DBSESSION]()
+    by_uuid = {}
+    by_accession = {}
+    for row, accession in _query_lineage(session, uuids, accessions):
+        lineage = {
+            'donor': str(row.donor_rid),
+            'taxa': row.taxa,
+            'sex': row.sex,
+        }
+        sample_uuid = str(row.sample_rid)
+        by_uuid.setdefault(sample_uuid, []).append(lineage)
+        if accession is not None:
+            by_accession.setdefault(accession, sample_uuid)
+    samples_lineage = {}
+    for sample in samples:
+        parts = [part for part in sample.split('/') if part]
+        if not parts:
+            continue
+        sample_uuid = by_accession.get(parts[-1], parts[-1])
+        if sample_uuid not in by_uuid:
+            continue
+        samples_lineage[sample] = by_uuid[sample_uuid]
+        request._embedded_uuids.add(sample_uuid)
+        request._embedded_uuids.update(
+            lineage['donor'] for lineage in by_uuid[sample_uuid]
+        )
+    return samples_lineage
+
+
+def get_donor_paths(request, donor_uuids):
+    donor_uuids = list(donor_uuids)
+    if len(donor_uuids) > 1:
+        prefetch_items(request, donor_uuids)
+    connection = request.registry[CONNECTION]
+    return [
+        request.resource_path(connection.get_by_uuid(donor_uuid))
+        for donor_uuid in donor_uuids
+    ]
@@ -0,0 +1,159 @@
+import copy
+
+from functools import update_wrapper
+from types import MethodType
+
+from snovault import DBSESSION
+from snovault.storage import CurrentPropertySheet
+from sqlalchemy import func
+from igvfd.embed import DATABASE
+from igvfd.lru import LRUCache
+
+
+# Kept in memory per process rather than in the database: a shared
+# store would write on every miss from GET renders and @@index-data
+# requests, and would need its own eviction. Entries are only reused
+# after their sids are checked against the database, so losing them
+# on restart or not sharing them between workers costs recalculation,
+# never a stale value.
+CALCULATED_PROPERTY_CACHE = 'calculated_property_cache'
+
+# Entries kept per process, 0 disables memoization.
+CALCULATED_PROPERTY_CACHE_SIZE_SETTING = 'calculated_property_cache.size'
+
+DEFAULT_CALCULATED_PROPERTY_CACHE_SIZE = 0
+
+
+def includeme(config):
+    config.registry[CALCULATED_PROPERTY_CACHE] = make_calculated_property_cache(
+        config.registry.settings
+    )
+
+
+def make_calculated_property_cache(settings):
+    size = int(
+        settings.get(
+            CALCULATED_PROPERTY_CACHE_SIZE_SETTING,
+            DEFAULT_CALCULATED_PROPERTY_CACHE_SIZE,
+        )
+    )
+    if size <= 0:
+        return None
+    return LRUCache(size)
+
+
+def _query_sids(session, uuids):
+    return (
+        session.query(CurrentPropertySheet.rid, func.max(CurrentPropertySheet.sid))
+        .filter(CurrentPropertySheet.rid.in_(sorted(uuids)))
+        .group_by(CurrentPropertySheet.rid)
+        .all()
+    )
+
+
+def get_sids(request, uuids):
+    '''
+    Current sid of each item, None if it no longer exists, with one
+    query. The sid of a property sheet changes with every update.
+    '''
+    sids = {uuid: None for uuid in uuids}
+    if uuids:
+        session = request.registry[DBSESSION]()
+        for rid, sid in _query_sids(session, uuids):
+            sids[str(rid)] = sid
+    return sids
+
+
+def calculate_tracking_dependencies(request, calculate):
+    '''
+    Returns the value of calculate with the uuids it embedded and
+    linked to, recorded the same way snovault records them for the
+    indexer's invalidation.
+    '''
+    embedded_uuids = set(request._embedded_uuids)
+    linked_uuids = set(request._linked_uuids)
+    request._embedded_uuids.clear()
+    request._linked_uuids.clear()
+    try:
+        value = calculate()
+        calculated_embedded_uuids = set(request._embedded_uuids)
+        calculated_linked_uuids = set(request._linked_uuids)
+    finally:
+        request._embedded_uuids.update(embedded_uuids)
+        request._linked_uuids.update(linked_uuids)
+    return value, calculated_embedded_uuids, calculated_linked_uuids
+
+
+def get_memoized_calculation(item, request, name, arguments, calculate):
+    '''
+    Reuses the last value of the calculated property name of item
+    while its arguments are the same and neither the item nor anything
+    read to calculate it has changed since. Arguments are compared
+    rather than tracked because snovault resolves them, including
+    other calculated properties, before the calculation runs.
+    '''
+    cache = request.registry.get(CALCULATED_PROPERTY_CACHE)
+    if cache is None or getattr(request, 'datastore', DATABASE) != DATABASE:
+        return calculate()
+    key = (str(item.uuid), name)
+    entry = cache.get(key)
+    if (entry is not None and
+            entry['arguments'] == arguments and
+            get_sids(request, entry['sids']) == entry['sids']):
+        # Keep the dependencies recorded so the indexer still
+        # invalidates the item when one of them changes.
+        request._embedded_uuids.update(entry['embedded_uuids'])
+        request._linked_uuids.update(entry['linked_uuids'])
+        return copy.deepcopy(entry['value'])
+    value, embedded_uuids, linked_uuids = calculate_tracking_dependencies(request, calculate)
+    request._embedded_uuids.update(embedded_uuids)
+    request._linked_uuids.update(linked_uuids)
+    sids = get_sids(request, embedded_uuids | linked_uuids | {key[0]})
+    if None not in sids.values():
+        cache.set(
+            key,
+            {
+                'value': copy.deepcopy(value),
+                'arguments': copy.deepcopy(arguments),
+                'sids': sids,
+                'embedded_uuids': frozenset(embedded_uuids),
+                'linked_uuids': frozenset(linked_uuids),
+            }
+        )
+    return value
+
+
+class MemoizedCalculation:
+    '''
+    Wraps a calculated property method with get_memoized_calculation.
+    The wrapped method's __code__ is kept because snovault reads the
+    argument names from it to pass the item's properties.
+    '''
+
+    def __init__(self, fn):
+        update_wrapper(self, fn)
+        self.fn = fn
+        self.__code__ = fn.__code__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return MethodType(self, instance)
+
+    def __call__(self, item, request, *args, **kwargs):
+        return get_memoized_calculation(
+            item,
+            request,
+            self.__name__,
+            (args, kwargs),
+            lambda: self.fn(item, request, *args, **kwargs),
+        )
+
+
+def memoize_calculation(fn):
+    '''
+    Only for calculations that don't read rev links of the items they
+    embed, e.g. through @@object of an item with calculated properties:
+    a new rev link changes no sid, so the memoized value would go stale.
+    '''
+    return MemoizedCalculation(fn)
@@ -23,6 +23,7 @@ class BatchDownloadMixin:
     ]
     CONTENT_TYPE = 'text/plain'
     CONTENT_DISPOSITION = 'attachment; filename="files.txt"'
+    COLUMNAR_FILENAME = 'files'
 
     def _build_header(self):
         for column in self._get_column_to_fields_mapping():
@@ -31,6 +32,9 @@ class BatchDownloadMixin:
     def _get_column_to_fields_mapping(self):
         return BATCH_DOWNLOAD_COLUMN_TO_FIELDS_MAPPING
 
+    def _get_column_to_column_type(self):
+        return {}
+
     def _should_add_json_elements_to_metadata_link(self):
         conditions = [
             self._get_json_elements_or_empty_list(),
@@ -64,16 +68,18 @@ class BatchDownloadMixin:
 
 class BatchDownload(BatchDownloadMixin, MetadataReport):
 
-    def _generate_rows(self):
-        yield self._get_encoded_metadata_link_with_newline()
+    def _generate_row_values(self):
         for experiment in self._get_search_results_generator():
             for file_ in experiment.get('files', []):
                 if self._should_not_report_file(file_):
                     continue
                 file_data = self._get_file_data(file_)
-                yield self.csv.writerow(
-                    self._output_sorted_row({}, file_data)
-                )
+                yield self._output_sorted_row({}, file_data)
+
+    def _generate_rows(self):
+        yield self._get_encoded_metadata_link_with_newline()
+        for row in self._generate_row_values():
+            yield self.csv.writerow(row)
 
 
 def _get_batch_download(context, request):
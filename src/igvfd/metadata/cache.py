@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import humanfriendly
+
+from igvfd.searches.generation import get_index_generation
+
+
+CACHE_FILE_SUFFIX = '.cache'
+
+TEMPORARY_FILE_SUFFIX = '.tmp'
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class ExportCache:
+    '''
+    Disk-backed LRU of generated export bodies shared by all
+    workers on a host. Recency is tracked with file mtimes,
+    entries are published with an atomic rename and the oldest
+    entries are evicted once the directory exceeds max_bytes.
+    '''
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _get_path(self, key):
+        return os.path.join(self.directory, key + CACHE_FILE_SUFFIX)
+
+    def open(self, key):
+        path = self._get_path(key)
+        try:
+            cached_file = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return cached_file
+
+    def iter_file(self, cached_file, chunk_size=READ_CHUNK_SIZE):
+        with cached_file:
+            while True:
+                chunk = cached_file.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def tee(self, key, chunks):
+        '''
+        Yields chunks unchanged while writing them to a temporary
+        file that is only published if the stream completes and
+        fits in the cache.
+        '''
+        fd, temporary_path = tempfile.mkstemp(
+            dir=self.directory,
+            suffix=TEMPORARY_FILE_SUFFIX,
+        )
+        written = 0
+        completed = False
+        try:
+            with os.fdopen(fd, 'wb') as temporary_file:
+                for chunk in chunks:
+                    if written <= self.max_bytes:
+                        temporary_file.write(chunk)
+                        written += len(chunk)
+                    yield chunk
+            completed = written <= self.max_bytes
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+            if completed:
+                os.replace(temporary_path, self._get_path(key))
+                self.evict()
+            else:
+                os.remove(temporary_path)
+
+    def _list_entries(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(CACHE_FILE_SUFFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self):
+        entries = sorted(self._list_entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def make_export_cache(settings, directory_setting, max_bytes_setting, default_max_bytes):
+    directory = settings.get(directory_setting)
+    if not directory:
+        return None
+    max_bytes = humanfriendly.parse_size(
+        settings.get(max_bytes_setting, default_max_bytes)
+    )
+    return ExportCache(directory, max_bytes)
+
+
+def make_export_cache_key(request, json_elements, content_encoding):
+    key = json.dumps(
+        [
+            request.host_url,
+            request.path_info,
+            sorted(request.GET.items()),
+            json_elements,
+            sorted(request.effective_principals),
+            get_index_generation(request),
+            content_encoding,
+        ]
+    )
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
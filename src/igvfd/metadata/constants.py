@@ -1,4 +1,6 @@
 from collections import OrderedDict
+from igvfd.columnar import INT64
+from igvfd.columnar import TIMESTAMP
 
 
 METADATA_ALLOWED_TYPES = [
@@ -30,6 +32,13 @@ METADATA_COLUMN_TO_FIELDS_MAPPING = OrderedDict(
 )
 
 
+# Columns written with a non-string type in Parquet/Arrow exports.
+METADATA_COLUMN_TO_COLUMN_TYPE = {
+    'Creation timestamp': TIMESTAMP,
+    'Size': INT64,
+}
+
+
 METADATA_AUDIT_TO_AUDIT_COLUMN_MAPPING = [
     ('WARNING', 'Audit WARNING'),
     ('NOT_COMPLIANT', 'Audit NOT_COMPLIANT'),
@@ -59,3 +68,34 @@ BOOLEAN_MAP = {
     'true': True,
     'false': False
 }
+
+
+# Number of batches fetched concurrently by BatchedSearchGenerator
+# and the cap on results buffered across in-flight batches.
+# Depth of 0 or 1 fetches batches serially.
+METADATA_PREFETCH_DEPTH_SETTING = 'metadata.batch_prefetch_depth'
+METADATA_PREFETCH_MAX_RESULTS_SETTING = 'metadata.batch_prefetch_max_results'
+DEFAULT_METADATA_PREFETCH_DEPTH = 0
+DEFAULT_METADATA_PREFETCH_MAX_RESULTS = 20000
+
+
+# Page size for walking search results with a search_after cursor
+# instead of loading each batch with limit=all. 0 disables paging.
+METADATA_CURSOR_PAGE_SIZE_SETTING = 'metadata.cursor_page_size'
+DEFAULT_METADATA_CURSOR_PAGE_SIZE = 0
+
+
+# Directory and size of the on-disk cache of generated exports.
+# Caching is disabled if no directory is set.
+METADATA_EXPORT_CACHE = 'metadata_export_cache'
+METADATA_CACHE_DIR_SETTING = 'metadata.cache_dir'
+METADATA_CACHE_MAX_BYTES_SETTING = 'metadata.cache_max_bytes'
+DEFAULT_METADATA_CACHE_MAX_BYTES = '1GB'
+
+
+# Storage and queue for asynchronous export jobs, either a local
+# directory or an S3 bucket. Jobs are disabled if neither is set.
+# They are run by the run-metadata-jobs worker process.
+METADATA_JOB_STORE = 'metadata_job_store'
+METADATA_JOBS_DIR_SETTING = 'metadata.jobs_dir'
+METADATA_JOBS_BUCKET_SETTING = 'metadata.jobs_bucket'
@@ -0,0 +1,401 @@
+import datetime
+import json
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+
+from igvfd.columnar import COLUMNAR_FORMATS
+from igvfd.columnar import get_columnar_format
+from igvfd.metadata.constants import METADATA_ALLOWED_TYPES
+from igvfd.metadata.constants import METADATA_JOB_STORE
+from igvfd.metadata.constants import METADATA_JOBS_BUCKET_SETTING
+from igvfd.metadata.constants import METADATA_JOBS_DIR_SETTING
+from igvfd.metadata.decorators import allowed_types
+from igvfd.upload_credentials import get_s3_client
+from pyramid.httpexceptions import HTTPForbidden
+from pyramid.httpexceptions import HTTPNotFound
+from pyramid.httpexceptions import HTTPTemporaryRedirect
+from pyramid.request import Request
+from pyramid.response import FileIter
+from pyramid.response import Response
+from pyramid.view import view_config
+
+
+log = logging.getLogger(__name__)
+
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+TSV = 'tsv'
+
+METADATA_PATH = '/metadata/'
+
+# Job state is written at most once per this many output bytes.
+PROGRESS_INTERVAL_BYTES = 8 * 1024 * 1024
+
+PRESIGNED_URL_EXPIRATION_SECONDS = 60 * 60
+
+S3_QUEUE_PREFIX = 'metadata-jobs/queue/'
+
+REMOTE_USER_PREFIX = 'remoteuser.'
+
+USERID_PRINCIPAL_PREFIX = 'userid.'
+
+INTERNAL_JOB_FIELDS = ['userid', 'remote_user', 'host_url', 'body']
+
+
+def includeme(config):
+    config.add_route('metadata-jobs', '/metadata/jobs{slash:/?}')
+    config.add_route('metadata-job', '/metadata/jobs/{job_id}{slash:/?}')
+    config.add_route('metadata-job-download', '/metadata/jobs/{job_id}/@@download')
+    config.registry[METADATA_JOB_STORE] = make_job_store(config.registry.settings)
+    config.scan(__name__)
+
+
+def now():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+class LocalJobStore:
+    '''
+    Keeps job state and output in a local directory. Queued jobs
+    are marked by empty files in the queue subdirectory.
+    '''
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.queue_directory = os.path.join(directory, 'queue')
+        os.makedirs(self.queue_directory, exist_ok=True)
+
+    def _get_state_path(self, job_id):
+        return os.path.join(self.directory, f'{job_id}.json')
+
+    def _get_queue_path(self, job_id):
+        return os.path.join(self.queue_directory, job_id)
+
+    def _get_output_path(self, job_id, extension):
+        return os.path.join(self.directory, f'{job_id}.{extension}')
+
+    def save(self, job):
+        fd, temporary_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'w') as temporary_file:
+            json.dump(job, temporary_file)
+        os.replace(temporary_path, self._get_state_path(job['job_id']))
+
+    def load(self, job_id):
+        try:
+            with open(self._get_state_path(job_id)) as state_file:
+                return json.load(state_file)
+        except FileNotFoundError:
+            return None
+
+    def enqueue(self, job):
+        self.save(job)
+        open(self._get_queue_path(job['job_id']), 'w').close()
+
+    def dequeue(self, job_id):
+        try:
+            os.remove(self._get_queue_path(job_id))
+        except FileNotFoundError:
+            pass
+
+    def get_queued_job_ids(self):
+        return sorted(
+            os.listdir(self.queue_directory),
+            key=lambda job_id: os.path.getmtime(self._get_queue_path(job_id)),
+        )
+
+    def store_output(self, job_id, extension, output_file):
+        with open(self._get_output_path(job_id, extension), 'wb') as stored_file:
+            shutil.copyfileobj(output_file, stored_file)
+
+    def get_download_response(self, request, job):
+        path = self._get_output_path(job['job_id'], job['extension'])
+        response = Response(
+            content_type=job['content_type'],
+            content_disposition=f'attachment; filename="{job["filename"]}"',
+        )
+        response.app_iter = FileIter(open(path, 'rb'))
+        return response
+
+
+class S3JobStore:
+    '''
+    Keeps job state and output in an S3 bucket. Queued jobs are
+    marked by empty objects under the queue prefix.
+    '''
+
+    def __init__(self, bucket, client):
+        self.bucket = bucket
+        self.client = client
+
+    def _get_state_key(self, job_id):
+        return f'metadata-jobs/{job_id}.json'
+
+    def _get_output_key(self, job_id, extension):
+        return f'metadata-jobs/{job_id}.{extension}'
+
+    def _get_queue_key(self, job_id):
+        return f'{S3_QUEUE_PREFIX}{job_id}'
+
+    def save(self, job):
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self._get_state_key(job['job_id']),
+            Body=json.dumps(job).encode('utf-8'),
+            ContentType='application/json',
+        )
+
+    def load(self, job_id):
+        try:
+            result = self.client.get_object(
+                Bucket=self.bucket,
+                Key=self._get_state_key(job_id),
+            )
+        except self.client.exceptions.NoSuchKey:
+            return None
+        return json.loads(result['Body'].read())
+
+    def enqueue(self, job):
+        self.save(job)
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self._get_queue_key(job['job_id']),
+            Body=b'',
+        )
+
+    def dequeue(self, job_id):
+        self.client.delete_object(
+            Bucket=self.bucket,
+            Key=self._get_queue_key(job_id),
+        )
+
+    def get_queued_job_ids(self):
+        queued = []
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=S3_QUEUE_PREFIX):
+            queued.extend(page.get('Contents', []))
+        return [
+            item['Key'][len(S3_QUEUE_PREFIX):]
+            for item in sorted(queued, key=lambda item: item['LastModified'])
+        ]
+
+    def store_output(self, job_id, extension, output_file):
+        self.client.upload_fileobj(
+            output_file,
+            self.bucket,
+            self._get_output_key(job_id, extension),
+        )
+
+    def get_download_response(self, request, job):
+        url = self.client.generate_presigned_url(
+            'get_object',
+            Params={
+                'Bucket': self.bucket,
+                'Key': self._get_output_key(job['job_id'], job['extension']),
+                'ResponseContentDisposition': f'attachment; filename="{job["filename"]}"',
+            },
+            ExpiresIn=PRESIGNED_URL_EXPIRATION_SECONDS,
+        )
+        return HTTPTemporaryRedirect(location=url)
+
+
+def make_job_store(settings):
+    directory = settings.get(METADATA_JOBS_DIR_SETTING)
+    if directory:
+        return LocalJobStore(directory)
+    bucket = settings.get(METADATA_JOBS_BUCKET_SETTING)
+    if bucket:
+        return S3JobStore(
+            bucket,
+            get_s3_client(
+                localstack_endpoint_url=os.environ.get(
+                    'LOCALSTACK_ENDPOINT_URL'
+                )
+            )
+        )
+    return None
+
+
+def get_output_format(request):
+    columnar_format = get_columnar_format(request)
+    if columnar_format is not None:
+        return (
+            COLUMNAR_FORMATS[columnar_format]['extension'],
+            COLUMNAR_FORMATS[columnar_format]['content_type'],
+        )
+    return TSV, 'text/tsv'
+
+
+def get_remote_user(request):
+    '''
+    Name the worker authenticates the export as through the remoteuser
+    policy, None for anonymous requests.
+    '''
+    userid = request.authenticated_userid
+    if userid is not None and userid.startswith(REMOTE_USER_PREFIX):
+        return userid[len(REMOTE_USER_PREFIX):]
+    for principal in request.effective_principals:
+        if principal.startswith(USERID_PRINCIPAL_PREFIX):
+            return principal[len(USERID_PRINCIPAL_PREFIX):]
+    return None
+
+
+def make_job(request):
+    job_id = str(uuid.uuid4())
+    extension, content_type = get_output_format(request)
+    timestamp = now()
+    return {
+        '@id': f'/metadata/jobs/{job_id}/',
+        'job_id': job_id,
+        'status': QUEUED,
+        'created': timestamp,
+        'updated': timestamp,
+        'query_string': request.query_string,
+        'extension': extension,
+        'content_type': content_type,
+        'filename': f'metadata.{extension}',
+        'bytes_written': 0,
+        'rows_written': 0,
+        'userid': request.authenticated_userid,
+        'remote_user': get_remote_user(request),
+        'host_url': request.host_url,
+        'body': request.text if request.body else None,
+    }
+
+
+def make_export_request(job):
+    '''
+    Request the worker sends to /metadata, with the query string, JSON
+    body and user of the job request, so the output is the same as a
+    synchronous export.
+    '''
+    environ = {
+        'QUERY_STRING': job['query_string'],
+    }
+    if job['remote_user'] is not None:
+        environ['REMOTE_USER'] = job['remote_user']
+    request = Request.blank(
+        METADATA_PATH,
+        environ=environ,
+        base_url=job['host_url'],
+    )
+    if job['body'] is not None:
+        request.method = 'POST'
+        request.content_type = 'application/json'
+        request.body = job['body'].encode('utf-8')
+    return request
+
+
+def update_job(store, job, **fields):
+    job.update(fields)
+    job['updated'] = now()
+    store.save(job)
+
+
+def write_export_to_file(job, store, chunks, output_file):
+    last_saved = 0
+    for chunk in chunks:
+        output_file.write(chunk)
+        job['bytes_written'] += len(chunk)
+        if job['extension'] == TSV:
+            job['rows_written'] += chunk.count(b'\n')
+        if job['bytes_written'] - last_saved >= PROGRESS_INTERVAL_BYTES:
+            update_job(store, job)
+            last_saved = job['bytes_written']
+    if job['extension'] == TSV and job['rows_written']:
+        # Don't count the header.
+        job['rows_written'] -= 1
+
+
+def run_export_job(job, store, app):
+    try:
+        update_job(store, job, status=RUNNING, bytes_written=0, rows_written=0)
+        response = make_export_request(job).get_response(app)
+        if response.status_code != 200:
+            raise ValueError(f'Export request returned {response.status}')
+        with tempfile.TemporaryFile() as output_file:
+            try:
+                write_export_to_file(job, store, response.app_iter, output_file)
+            finally:
+                if hasattr(response.app_iter, 'close'):
+                    response.app_iter.close()
+            output_file.seek(0)
+            store.store_output(job['job_id'], job['extension'], output_file)
+        update_job(
+            store,
+            job,
+            status=COMPLETED,
+            href=f'{job["@id"]}@@download',
+        )
+    except Exception as e:
+        log.exception('Metadata export job %s failed', job['job_id'])
+        update_job(store, job, status=FAILED, error=str(e))
+
+
+def run_queued_jobs(app, store):
+    '''
+    Runs the queued jobs in the order they were created. A job stays
+    queued until it has finished, so one interrupted by a restart of
+    the worker runs again.
+    '''
+    for job_id in store.get_queued_job_ids():
+        job = store.load(job_id)
+        if job is not None and job['status'] in (QUEUED, RUNNING):
+            run_export_job(job, store, app)
+        store.dequeue(job_id)
+
+
+def get_job_store_or_raise(request):
+    store = request.registry.get(METADATA_JOB_STORE)
+    if store is None:
+        raise HTTPNotFound(explanation='Metadata export jobs are not enabled.')
+    return store
+
+
+def get_job_or_raise(request, store):
+    job = store.load(request.matchdict['job_id'])
+    if job is None:
+        raise HTTPNotFound(explanation='Metadata export job not found.')
+    if job.get('userid') != request.authenticated_userid:
+        raise HTTPForbidden(explanation='Metadata export job belongs to another user.')
+    return job
+
+
+def format_job(job):
+    return {
+        k: v
+        for k, v in job.items()
+        if k not in INTERNAL_JOB_FIELDS
+    }
+
+
+@view_config(route_name='metadata-jobs', request_method='POST')
+@allowed_types(METADATA_ALLOWED_TYPES)
+def create_metadata_job(context, request):
+    store = get_job_store_or_raise(request)
+    job = make_job(request)
+    store.enqueue(job)
+    request.response.status_code = 202
+    request.response.location = request.host_url + job['@id']
+    return format_job(job)
+
+
+@view_config(route_name='metadata-job', request_method='GET')
+def get_metadata_job(context, request):
+    store = get_job_store_or_raise(request)
+    return format_job(get_job_or_raise(request, store))
+
+
+@view_config(route_name='metadata-job-download', request_method='GET')
+def download_metadata_job(context, request):
+    store = get_job_store_or_raise(request)
+    job = get_job_or_raise(request, store)
+    if job['status'] != COMPLETED:
+        raise HTTPNotFound(explanation=f'Metadata export job is {job["status"]}.')
+    return store.get_download_response(request, job)
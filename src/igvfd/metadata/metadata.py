@@ -1,49 +1,57 @@
 from collections import defaultdict
 from collections import OrderedDict
+from igvfd.columnar import generate_columnar_chunks
+from igvfd.columnar import get_columnar_format
+from igvfd.columnar import get_content_disposition
+from igvfd.columnar import get_content_type
+from igvfd.metadata.cache import make_export_cache
+from igvfd.metadata.cache import make_export_cache_key
+from igvfd.metadata.constants import DEFAULT_METADATA_CACHE_MAX_BYTES
+from igvfd.metadata.constants import DEFAULT_METADATA_CURSOR_PAGE_SIZE
+from igvfd.metadata.constants import DEFAULT_METADATA_PREFETCH_DEPTH
+from igvfd.metadata.constants import DEFAULT_METADATA_PREFETCH_MAX_RESULTS
 from igvfd.metadata.constants import METADATA_ALLOWED_TYPES
+from igvfd.metadata.constants import METADATA_COLUMN_TO_COLUMN_TYPE
 from igvfd.metadata.constants import METADATA_COLUMN_TO_FIELDS_MAPPING
 from igvfd.metadata.constants import METADATA_AUDIT_TO_AUDIT_COLUMN_MAPPING
+from igvfd.metadata.constants import METADATA_CACHE_DIR_SETTING
+from igvfd.metadata.constants import METADATA_CACHE_MAX_BYTES_SETTING
+from igvfd.metadata.constants import METADATA_CURSOR_PAGE_SIZE_SETTING
+from igvfd.metadata.constants import METADATA_EXPORT_CACHE
+from igvfd.metadata.constants import METADATA_PREFETCH_DEPTH_SETTING
+from igvfd.metadata.constants import METADATA_PREFETCH_MAX_RESULTS_SETTING
 from igvfd.metadata.csv import CSVGenerator
 from igvfd.metadata.decorators import allowed_types
 from igvfd.metadata.inequalities import map_param_values_to_inequalities
 from igvfd.metadata.inequalities import try_to_evaluate_inequality
 from igvfd.metadata.search import BatchedSearchGenerator
-from igvfd.metadata.serializers import make_experiment_cell
-from igvfd.metadata.serializers import make_file_cell
+from igvfd.metadata.serializers import compile_column_to_fields_mapping
+from igvfd.metadata.serializers import compile_experiment_cell
+from igvfd.metadata.serializers import compile_file_cell
+from igvfd.metadata.serializers import compile_path
 from igvfd.metadata.serializers import map_strings_to_booleans_and_ints
+from igvfd.streaming import set_streaming_app_iter
 from pyramid.httpexceptions import HTTPBadRequest
+from pyramid.httpexceptions import HTTPNotModified
 from pyramid.response import Response
 from pyramid.view import view_config
 from snosearch.interfaces import EXISTS
 from snosearch.interfaces import MUST
 from snosearch.interfaces import RANGES
 from snosearch.parsers import QueryString
-from snovault.util import simple_path_ids
 
 
 def includeme(config):
     config.add_route('metadata', '/metadata{slash:/?}')
+    config.registry[METADATA_EXPORT_CACHE] = make_export_cache(
+        config.registry.settings,
+        METADATA_CACHE_DIR_SETTING,
+        METADATA_CACHE_MAX_BYTES_SETTING,
+        DEFAULT_METADATA_CACHE_MAX_BYTES,
+    )
     config.scan(__name__)
 
 
-def file_matches_file_params(file_, positive_file_param_set):
-    # Expects file_param_set where FILES_PREFIX (e.g. 'files.') has been
-    # stripped off of key (files.file_type -> file_type)
-    # and params with field negation (i.e. file_type!=bigWig)
-    # have been filtered out. Param values should be
-    # coerced to ints ('2' -> 2) or booleans ('true' -> True)
-    # and put into a set for comparison with file values.
-    for field, set_of_param_values in positive_file_param_set.items():
-        file_value = list(simple_path_ids(file_, field))
-        if not file_value:
-            return False
-        if '*' in set_of_param_values:
-            continue
-        if not set_of_param_values.intersection(file_value):
-            return False
-    return True
-
-
 def some_value_satisfies_inequalities(values, inequalities):
     return all(
         any(
@@ -54,14 +62,41 @@ def some_value_satisfies_inequalities(values, inequalities):
     )
 
 
-def file_satisfies_inequality_constraints(file_, positive_file_inequalities):
-    for field, inequalities in positive_file_inequalities.items():
-        file_value = list(simple_path_ids(file_, field))
-        if not file_value:
-            return False
-        if not some_value_satisfies_inequalities(file_value, inequalities):
-            return False
-    return True
+def compile_file_filter(positive_file_param_set, positive_file_inequalities):
+    '''
+    Expects positive_file_param_set and positive_file_inequalities
+    where FILES_PREFIX (e.g. 'files.') has been stripped off of keys
+    and params with field negation have been filtered out. Param
+    values should be coerced to ints ('2' -> 2) or booleans
+    ('true' -> True). Field paths are split once per report instead
+    of once per file.
+    '''
+    param_checks = [
+        (compile_path(field), set_of_param_values, '*' in set_of_param_values)
+        for field, set_of_param_values in positive_file_param_set.items()
+    ]
+    inequality_checks = [
+        (compile_path(field), inequalities)
+        for field, inequalities in positive_file_inequalities.items()
+    ]
+
+    def file_matches(file_):
+        for get_values, set_of_param_values, matches_any_value in param_checks:
+            file_value = get_values(file_)
+            if not file_value:
+                return False
+            if matches_any_value:
+                continue
+            if not set_of_param_values.intersection(file_value):
+                return False
+        for get_values, inequalities in inequality_checks:
+            file_value = get_values(file_)
+            if not file_value:
+                return False
+            if not some_value_satisfies_inequalities(file_value, inequalities):
+                return False
+        return True
+    return file_matches
 
 
 def group_audits_by_files_and_type(audits):
@@ -93,7 +128,14 @@ class MetadataReport:
     ]
     CONTENT_TYPE = 'text/tsv'
     CONTENT_DISPOSITION = 'attachment; filename="metadata.tsv"'
+    COLUMNAR_FILENAME = 'metadata'
     FILES_PREFIX = 'files.'
+    # Files are indexed as objects rather than nested documents, so
+    # OpenSearch can only drop results where no file matches. That
+    # still skips fetching results without any downloadable file.
+    FILE_FILTER_PARAMS = [
+        ('files.href', '*'),
+    ]
 
     def __init__(self, request):
         self.request = request
@@ -102,15 +144,21 @@ class MetadataReport:
         self.split_file_filters = {}
         self.positive_file_param_set = {}
         self.positive_file_inequalities = {}
+        self.file_matches_filters = None
         self.header = []
         self.experiment_column_to_fields_mapping = OrderedDict()
         self.file_column_to_fields_mapping = OrderedDict()
+        self.experiment_column_to_cell = OrderedDict()
+        self.file_column_to_cell = OrderedDict()
         self.raw_only = self.query_string.is_param('option', 'raw')
         self.csv = CSVGenerator()
 
     def _get_column_to_fields_mapping(self):
         return METADATA_COLUMN_TO_FIELDS_MAPPING
 
+    def _get_column_to_column_type(self):
+        return METADATA_COLUMN_TO_COLUMN_TYPE
+
     def _build_header(self):
         for column in self._get_column_to_fields_mapping():
             if column not in self.EXCLUDED_COLUMNS:
@@ -128,6 +176,16 @@ class MetadataReport:
             else:
                 self.experiment_column_to_fields_mapping[column] = fields
 
+    def _compile_column_to_cell_mappings(self):
+        self.experiment_column_to_cell = compile_column_to_fields_mapping(
+            self.experiment_column_to_fields_mapping,
+            compile_experiment_cell,
+        )
+        self.file_column_to_cell = compile_column_to_fields_mapping(
+            self.file_column_to_fields_mapping,
+            compile_file_cell,
+        )
+
     def _set_split_file_filters(self):
         file_params = self.query_string.get_filters_by_condition(
             key_and_value_condition=lambda k, _: k.startswith(self.FILES_PREFIX)
@@ -154,6 +212,12 @@ class MetadataReport:
             for k, v in grouped_positive_file_inequalities.items()
         }
 
+    def _compile_file_filter(self):
+        self.file_matches_filters = compile_file_filter(
+            self.positive_file_param_set,
+            self.positive_file_inequalities,
+        )
+
     def _add_positive_file_filters_as_fields_to_param_list(self):
         self.param_list['field'] = self.param_list.get('field', [])
         self.param_list['field'].extend(
@@ -199,11 +263,20 @@ class MetadataReport:
     def _get_default_params(self):
         return self.DEFAULT_PARAMS
 
+    def _get_file_filter_params(self):
+        return [
+            (k, v)
+            for k, v in self.FILE_FILTER_PARAMS
+            if k not in self.param_list
+        ]
+
     def _build_query_string(self):
         self.query_string.drop('limit')
         self.query_string.drop('option')
+        self.query_string.drop('format')
         self.query_string.extend(
-            self._get_default_params()
+            self._get_file_filter_params()
+            + self._get_default_params()
             + self._get_field_params()
             + self._get_at_id_params()
         )
@@ -217,30 +290,49 @@ class MetadataReport:
         request.path_info = self._get_search_path()
         return request
 
+    def _get_search_settings(self):
+        settings = self.request.registry.settings
+        return {
+            'cursor_page_size': int(
+                settings.get(
+                    METADATA_CURSOR_PAGE_SIZE_SETTING,
+                    DEFAULT_METADATA_CURSOR_PAGE_SIZE
+                )
+            ),
+            'prefetch_depth': int(
+                settings.get(
+                    METADATA_PREFETCH_DEPTH_SETTING,
+                    DEFAULT_METADATA_PREFETCH_DEPTH
+                )
+            ),
+            'max_prefetched_results': int(
+                settings.get(
+                    METADATA_PREFETCH_MAX_RESULTS_SETTING,
+                    DEFAULT_METADATA_PREFETCH_MAX_RESULTS
+                )
+            ),
+        }
+
     def _get_search_results_generator(self):
         return BatchedSearchGenerator(
-            self._build_new_request()
+            self._build_new_request(),
+            **self._get_search_settings()
         ).results()
 
     def _should_not_report_file(self, file_):
-        conditions = [
-            not file_matches_file_params(file_, self.positive_file_param_set),
-            not file_satisfies_inequality_constraints(file_, self.positive_file_inequalities),
-            'href' not in file_,
-        ]
-        return any(conditions)
+        return 'href' not in file_ or not self.file_matches_filters(file_)
 
     def _get_experiment_data(self, experiment):
         return {
-            column: make_experiment_cell(fields, experiment)
-            for column, fields in self.experiment_column_to_fields_mapping.items()
+            column: make_cell(experiment)
+            for column, make_cell in self.experiment_column_to_cell.items()
         }
 
     def _get_file_data(self, file_):
         file_['href'] = self.request.host_url + file_['href']
         return {
-            column: make_file_cell(fields, file_)
-            for column, fields in self.file_column_to_fields_mapping.items()
+            column: make_cell(file_)
+            for column, make_cell in self.file_column_to_cell.items()
         }
 
     def _get_audit_data(self, grouped_audits_for_file, grouped_other_audits):
@@ -264,8 +356,7 @@ class MetadataReport:
             )
         return row
 
-    def _generate_rows(self):
-        yield self.csv.writerow(self.header)
+    def _generate_row_values(self):
         for experiment in self._get_search_results_generator():
             if not experiment.get('files', []):
                 continue
@@ -282,30 +373,86 @@ class MetadataReport:
                     grouped_other_audits
                 )
                 file_data.update(audit_data)
-                yield self.csv.writerow(
-                    self._output_sorted_row(experiment_data, file_data)
-                )
+                yield self._output_sorted_row(experiment_data, file_data)
+
+    def _generate_rows(self):
+        yield self.csv.writerow(self.header)
+        for row in self._generate_row_values():
+            yield self.csv.writerow(row)
 
     def _initialize_report(self):
         self._build_header()
         self._split_column_and_fields_by_experiment_and_file()
+        self._compile_column_to_cell_mappings()
         self._set_split_file_filters()
         self._set_positive_file_param_set()
         self._set_positive_file_inequalities()
+        self._compile_file_filter()
 
     def _build_params(self):
         self._add_fields_to_param_list()
         self._initialize_at_id_param()
         self._maybe_add_json_elements_to_param_list()
 
-    def generate(self):
-        self._initialize_report()
-        self._build_params()
+    def _generate_columnar_response(self, columnar_format):
         return Response(
+            content_type=get_content_type(columnar_format),
+            app_iter=generate_columnar_chunks(
+                columnar_format,
+                self.header,
+                self._get_column_to_column_type(),
+                self._generate_row_values(),
+            ),
+            content_disposition=get_content_disposition(
+                columnar_format,
+                self.COLUMNAR_FILENAME,
+            ),
+        )
+
+    def _generate_response(self):
+        columnar_format = get_columnar_format(self.request)
+        if columnar_format is not None:
+            return self._generate_columnar_response(columnar_format)
+        response = Response(
             content_type=self.CONTENT_TYPE,
-            app_iter=self._generate_rows(),
             content_disposition=self.CONTENT_DISPOSITION,
         )
+        return set_streaming_app_iter(
+            self.request,
+            response,
+            self._generate_rows(),
+        )
+
+    def _get_export_cache(self):
+        return self.request.registry.get(METADATA_EXPORT_CACHE)
+
+    def _maybe_use_export_cache(self, response):
+        # Rows are generated lazily, so returning a 304 or a cached
+        # body here means the search is never run.
+        export_cache = self._get_export_cache()
+        if export_cache is None:
+            return response
+        key = make_export_cache_key(
+            self.request,
+            self._get_json_elements_or_empty_list(),
+            response.content_encoding,
+        )
+        if key in self.request.if_none_match:
+            return HTTPNotModified(etag=key)
+        response.etag = key
+        cached_file = export_cache.open(key)
+        if cached_file is not None:
+            response.app_iter = export_cache.iter_file(cached_file)
+        else:
+            response.app_iter = export_cache.tee(key, response.app_iter)
+        return response
+
+    def generate(self):
+        self._initialize_report()
+        self._build_params()
+        return self._maybe_use_export_cache(
+            self._generate_response()
+        )
 
 
 def _get_metadata(context, request):
@@ -1,7 +1,14 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from igvfd.search_views import search_generator
+from igvfd.searches.generator import cursor_search_generator
 from snosearch.parsers import QueryString
 
 
+def materialize_results(results):
+    return list(results)
+
+
 class BatchedSearchGenerator:
 
     SEARCH_PATH = '/search/'
@@ -9,10 +16,21 @@ class BatchedSearchGenerator:
         ('limit', 'all')
     ]
 
-    def __init__(self, request, batch_field='@id', batch_size=5000):
+    def __init__(
+            self,
+            request,
+            batch_field='@id',
+            batch_size=5000,
+            prefetch_depth=0,
+            max_prefetched_results=None,
+            cursor_page_size=0,
+    ):
         self.request = request
         self.batch_field = batch_field
         self.batch_size = batch_size
+        self.prefetch_depth = prefetch_depth
+        self.max_prefetched_results = max_prefetched_results
+        self.cursor_page_size = cursor_page_size
         self.query_string = QueryString(request)
         self.param_list = self.query_string.group_values_by_key()
         self.batch_param_values = self.param_list.get(batch_field, []).copy()
@@ -39,10 +57,65 @@ class BatchedSearchGenerator:
         request.registry = self.request.registry
         return request
 
+    def _search(self, request):
+        if self.cursor_page_size:
+            return cursor_search_generator(
+                request,
+                page_size=self.cursor_page_size
+            )['@graph']
+        return search_generator(request)['@graph']
+
+    def _get_batched_results(self, batched_values):
+        batched_params = self._make_batched_params_from_batched_values(batched_values)
+        request = self._build_new_request(batched_params)
+        return self._search(request)
+
+    def _get_number_of_batches(self):
+        return -(-len(self.batch_param_values) // self.batch_size)
+
+    def _get_effective_prefetch_depth(self):
+        # Each batch in flight can hold up to batch_size results in memory,
+        # so cap the depth to keep buffered results under the limit.
+        depth = min(self.prefetch_depth, self._get_number_of_batches())
+        if self.max_prefetched_results is not None:
+            depth = min(depth, self.max_prefetched_results // self.batch_size)
+        return max(depth, 0)
+
+    def _should_prefetch(self):
+        return self._get_effective_prefetch_depth() > 1
+
+    def _serial_results(self):
+        for batched_values in self._make_batched_values_from_batch_param_values():
+            yield from self._get_batched_results(batched_values)
+
+    def _prefetched_results(self):
+        # Searches are built on the calling thread (query string and
+        # principals come from the request) and only fetching of hits
+        # is handed to the pool. Futures are consumed in submission order
+        # so rows are yielded in the same order as the serial path.
+        depth = self._get_effective_prefetch_depth()
+        batches = self._make_batched_values_from_batch_param_values()
+        in_flight = deque()
+        executor = ThreadPoolExecutor(max_workers=depth)
+        try:
+            for batched_values in batches:
+                in_flight.append(
+                    executor.submit(
+                        materialize_results,
+                        self._get_batched_results(batched_values)
+                    )
+                )
+                if len(in_flight) >= depth:
+                    yield from in_flight.popleft().result()
+            while in_flight:
+                yield from in_flight.popleft().result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
     def results(self):
         if not self.batch_param_values:
-            yield from search_generator(self._build_new_request([]))['@graph']
-        for batched_values in self._make_batched_values_from_batch_param_values():
-            batched_params = self._make_batched_params_from_batched_values(batched_values)
-            request = self._build_new_request(batched_params)
-            yield from search_generator(request)['@graph']
+            yield from self._search(self._build_new_request([]))
+        elif self._should_prefetch():
+            yield from self._prefetched_results()
+        else:
+            yield from self._serial_results()
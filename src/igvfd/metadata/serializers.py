@@ -1,14 +1,41 @@
-from snovault.util import simple_path_ids
+from collections import OrderedDict
+from functools import lru_cache
 from igvfd.metadata.constants import BOOLEAN_MAP
 
 
-def make_experiment_cell(paths, experiment):
+def compile_path(path):
+    '''
+    Returns a function that yields the same values as
+    simple_path_ids(obj, path) but with the dotted path split once.
+    '''
+    names = tuple(path.split('.'))
+
+    def get_values(obj):
+        nodes = [obj]
+        for name in names:
+            next_nodes = []
+            for node in nodes:
+                value = node.get(name)
+                if value is None:
+                    continue
+                if isinstance(value, list):
+                    next_nodes.extend(value)
+                else:
+                    next_nodes.append(value)
+            nodes = next_nodes
+            if not nodes:
+                break
+        return nodes
+    return get_values
+
+
+def _join_path_values(getters, obj, dedupe):
     last = []
-    for path in paths:
-        cell_value = []
-        for value in simple_path_ids(experiment, path):
-            if str(value) not in cell_value:
-                cell_value.append(str(value))
+    for getter in getters:
+        if dedupe:
+            cell_value = list(dict.fromkeys(str(value) for value in getter(obj)))
+        else:
+            cell_value = [str(value) for value in getter(obj)]
         if last and cell_value:
             last = [
                 v + ' ' + cell_value[0]
@@ -16,30 +43,57 @@ def make_experiment_cell(paths, experiment):
             ]
         else:
             last = cell_value
-    return ', '.join(set(last))
+    return last
 
 
-def make_file_cell(paths, file_):
+@lru_cache(maxsize=None)
+def compile_experiment_cell(paths):
+    getters = tuple(compile_path(path) for path in paths)
+    if len(getters) == 1:
+        getter = getters[0]
+
+        def experiment_cell(experiment):
+            return ', '.join(set(str(value) for value in getter(experiment)))
+        return experiment_cell
+
+    def experiment_cell(experiment):
+        return ', '.join(set(_join_path_values(getters, experiment, dedupe=True)))
+    return experiment_cell
+
+
+@lru_cache(maxsize=None)
+def compile_file_cell(paths):
     # Quick return if one level deep.
     if len(paths) == 1 and '.' not in paths[0]:
-        value = file_.get(paths[0], '')
-        if isinstance(value, list):
-            return ', '.join([str(v) for v in value])
-        return value
+        field = paths[0]
+
+        def file_cell(file_):
+            value = file_.get(field, '')
+            if isinstance(value, list):
+                return ', '.join([str(v) for v in value])
+            return value
+        return file_cell
     # Else crawl nested objects.
-    last = []
-    for path in paths:
-        cell_value = []
-        for value in simple_path_ids(file_, path):
-            cell_value.append(str(value))
-        if last and cell_value:
-            last = [
-                v + ' ' + cell_value[0]
-                for v in last
-            ]
-        else:
-            last = cell_value
-    return ', '.join(sorted(set(last)))
+    getters = tuple(compile_path(path) for path in paths)
+
+    def file_cell(file_):
+        return ', '.join(sorted(set(_join_path_values(getters, file_, dedupe=False))))
+    return file_cell
+
+
+def compile_column_to_fields_mapping(column_to_fields_mapping, compile_cell):
+    return OrderedDict(
+        (column, compile_cell(tuple(fields)))
+        for column, fields in column_to_fields_mapping.items()
+    )
+
+
+def make_experiment_cell(paths, experiment):
+    return compile_experiment_cell(tuple(paths))(experiment)
+
+
+def make_file_cell(paths, file_):
+    return compile_file_cell(tuple(paths))(file_)
 
 
 def maybe_int(value):
@@ -7,6 +7,7 @@ import zlib
 from pathlib import Path
 
 from sqlitedict import SqliteDict
+from igvfd.lru import LRUCache
 
 
 ONTOLOGY_FILE_NAME = 'ontology.json.gz'
@@ -15,12 +16,52 @@ REFERENCE_DATABASE_FILE_NAME = '/srv/sqlite/reference.sqlite'
 
 REFERENCE_ONTOLOGY_TABLE_NAME = 'ontology'
 
+ONTOLOGY = 'ontology'
+
+ONTOLOGY_CACHE = 'ontology_cache'
+
+# Decoded term records kept per process, 0 disables the cache.
+ONTOLOGY_CACHE_SIZE_SETTING = 'ontology.cache_size'
+
+DEFAULT_ONTOLOGY_CACHE_SIZE = 10000
+
 
 def includeme(config):
     config.scan(__name__, categories=None)
-    config.registry['ontology'] = get_connection_to_reference_database(
+    config.registry[ONTOLOGY] = get_connection_to_reference_database(
         REFERENCE_ONTOLOGY_TABLE_NAME
     )
+    config.registry[ONTOLOGY_CACHE] = make_ontology_cache(
+        config.registry.settings
+    )
+
+
+def make_ontology_cache(settings):
+    size = int(settings.get(ONTOLOGY_CACHE_SIZE_SETTING, DEFAULT_ONTOLOGY_CACHE_SIZE))
+    if size <= 0:
+        return None
+    return LRUCache(size)
+
+
+def read_ontology_term(ontology, term_id):
+    # Not ontology.get, UserDict.get checks `in` first, a second query.
+    try:
+        return ontology[term_id]
+    except KeyError:
+        return None
+
+
+def get_ontology_term(registry, term_id):
+    '''
+    Decoded record of term_id in the reference database, None if it
+    isn't there. Absent terms are cached too, so each term costs at
+    most one query and one decode per process.
+    '''
+    ontology = registry[ONTOLOGY]
+    cache = registry.get(ONTOLOGY_CACHE)
+    if cache is None:
+        return read_ontology_term(ontology, term_id)
+    return cache.get_or_set(term_id, lambda: read_ontology_term(ontology, term_id))
 
 
 def load_local_gz_json(path):
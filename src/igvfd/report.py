@@ -1,11 +1,20 @@
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pyramid.httpexceptions import HTTPBadRequest
 from pyramid.view import view_config
 from snovault import TYPES
 from snovault.elasticsearch.searches.interfaces import SEARCH_CONFIG
 from snosearch.parsers import QueryString
-from snovault.compat import bytes_
+from igvfd.columnar import generate_columnar_chunks
+from igvfd.columnar import get_column_types_from_schema
+from igvfd.columnar import get_columnar_format
+from igvfd.columnar import get_content_disposition
+from igvfd.columnar import get_content_type
+from igvfd.lru import LRUCache
+from igvfd.searches.generator import fan_out_search_generator
 from igvfd.searches.generator import search_generator
+from igvfd.streaming import set_streaming_app_iter
 
 import datetime
 import re
@@ -13,80 +22,183 @@ import re
 # Those columns contain href value
 HREF_COLUMN_KEYS = ['href', 'attachment', 'attachment.href', 'files.href']
 
+# Bounded because field= params are user supplied.
+COMPILED_COLUMN_LOOKUP_CACHE_SIZE = 1024
+
+REPORT_COLUMNS_CACHE = 'report_columns_cache'
+
+REPORT_COLUMNS_CACHE_SIZE = 1024
+
+# Maximum number of concurrent per-type searches for multireport.tsv,
+# 0 searches all types at once.
+MULTIREPORT_FAN_OUT_MAX_WORKERS_SETTING = 'multireport.fan_out_max_workers'
+
+DEFAULT_MULTIREPORT_FAN_OUT_MAX_WORKERS = 0
+
 
 def includeme(config):
     config.add_route('report_download', '/report.tsv')
     config.add_route('multitype_report_download', '/multireport.tsv')
+    # Lives on the registry so a new registry starts with an empty cache.
+    config.registry[REPORT_COLUMNS_CACHE] = LRUCache(REPORT_COLUMNS_CACHE_SIZE)
     config.scan(__name__, categories=None)
 
 
-def lookup_column_value(value, path):
-    nodes = [value]
-    names = path.split('.')
-    for name in names:
-        nextnodes = []
-        for node in nodes:
-            if name not in node:
-                continue
-            value = node[name]
-            if isinstance(value, list):
-                nextnodes.extend(value)
-            else:
-                nextnodes.append(value)
-        nodes = nextnodes
-        if not nodes:
-            return ''
+@lru_cache(maxsize=COMPILED_COLUMN_LOOKUP_CACHE_SIZE)
+def compile_column_lookup(path):
+    """Return a function equivalent to lookup_column_value(value, path) with the path split once."""
+    names = tuple(path.split('.'))
+    # Quick return if one level deep.
+    if len(names) == 1:
+        name = names[0]
+
+        def lookup(value):
+            if name not in value:
+                return ''
+            value = value[name]
+            if type(value) is str and '@id' not in value:
+                return value
+            if not isinstance(value, list):
+                return _format_nodes([value])
+            if not value:
+                return ''
+            return _format_nodes(value)
+        return lookup
+    # Else crawl nested objects.
+
+    def lookup(value):
+        nodes = [value]
+        for name in names:
+            nextnodes = []
+            for node in nodes:
+                if name not in node:
+                    continue
+                value = node[name]
+                if isinstance(value, list):
+                    nextnodes.extend(value)
+                else:
+                    nextnodes.append(value)
+            nodes = nextnodes
+            if not nodes:
+                return ''
+        return _format_nodes(nodes)
+    return lookup
+
+
+def _format_nodes(nodes):
     # if we ended with an embedded object, show the @id
-    if nodes and hasattr(nodes[0], '__contains__') and '@id' in nodes[0]:
+    if hasattr(nodes[0], '__contains__') and '@id' in nodes[0]:
         nodes = [node['@id'] for node in nodes]
-    deduped_nodes = []
-    for n in nodes:
-        if isinstance(n, dict):
-            n = str(n)
-        if n not in deduped_nodes:
-            deduped_nodes.append(n)
-    return u','.join(u'{}'.format(n) for n in deduped_nodes)
+    if len(nodes) == 1:
+        n = nodes[0]
+        return u'{}'.format(str(n) if isinstance(n, dict) else n)
+    return ','.join(u'{}'.format(n) for n in _dedupe_nodes(nodes))
+
+
+def _dedupe_nodes(nodes):
+    nodes = [str(n) if isinstance(n, dict) else n for n in nodes]
+    try:
+        return dict.fromkeys(nodes)
+    except TypeError:
+        # Unhashable values (lists in lists) are compared pairwise.
+        deduped_nodes = []
+        for n in nodes:
+            if n not in deduped_nodes:
+                deduped_nodes.append(n)
+        return deduped_nodes
+
+
+def lookup_column_value(value, path):
+    return compile_column_lookup(path)(value)
+
+
+def _is_href_token(token):
+    return ''.join([c for c in token if c.isalpha()]) == 'href'
+
+
+def rewrite_href_tokens(tokens, host_url, id):
+    """Add host_url to the href in the whitespace separated tokens of a cell to form a full length url"""
+    # href is not embedded, append host_url directly
+    if len(tokens) == 1:
+        token = tokens[0]
+        # files.href, FileSet can have more than one file in files
+        if ',' in token:
+            return [','.join([host_url + file.strip() for file in token.split(',')])]
+        # attachment.href
+        if token.startswith('@@download'):
+            return [host_url + id + token]
+        # href from File or files.href when there is one file in FileSet
+        return [host_url + token]
+    # href is embedded
+    for index, token in enumerate(tokens[:-1]):
+        if _is_href_token(token):
+            href = tokens[index + 1]
+            tokens = list(tokens)
+            tokens[index + 1] = href[0] + host_url + id + href[1:]
+            break
+    return tokens
+
+
+def encode_cells(cells):
+    return ('\t'.join(cells) + '\r\n').encode('utf-8')
 
 
 def format_row(columns):
     """Format a list of text columns as a tab-separated byte string."""
-    return b'\t'.join([bytes_(' '.join(c.strip('\t\n\r').split()), 'utf-8') for c in columns]) + b'\r\n'
-
-
-def format_row_full_url(columns, href_index, host_url, id):
-    """Format a list of text columns as a tab-separated byte string. add host_url to href to form a full length url"""
-    row = []
-    for index, column in enumerate(columns):
-        ls = column.strip('\t\n\r').split()
-        if index in href_index:
-            # href is not embedded, append host_url directly
-            if len(ls) == 1:
-                # files.href, FileSet can have more than one file in files
-                if ',' in ls[0]:
-                    files = ls[0].split(',')
-                    files_with_host_url = []
-                    for file in files:
-                        file = host_url + file.strip()
-                        files_with_host_url.append(file)
-                    ls[0] = ','.join(files_with_host_url)
-
-                # attachment.href
-                elif ls[0].startswith('@@download'):
-                    ls[0] = host_url + id + ls[0]
-                # href from File or files.href when there is one file in FileSet
-                else:
-                    ls[0] = host_url + ls[0]
-            # href is embedded
-            elif len(ls) > 1:
-                for index, item in enumerate(ls):
-                    if ''.join([i for i in item if i.isalpha()]) == 'href':
-                        embedded_index = index + 1
-                        break
-                if embedded_index:
-                    ls[embedded_index] = ls[embedded_index][0] + host_url + id + ls[embedded_index][1:]
+    return encode_cells([' '.join(c.split()) for c in columns])
 
-        row.append(bytes_(' '.join(ls), 'utf-8'))
-    return b'\t'.join(row) + b'\r\n'
+
+def compile_row_encoder(columns, host_url=None, href_columns=()):
+    """
+    Return a function that looks up every column of an item and encodes
+    the row as tab-separated bytes. Column paths and href rewriting are
+    resolved once per download instead of once per row.
+    """
+    cells = [
+        (compile_column_lookup(path), host_url is not None and path in href_columns)
+        for path in columns
+    ]
+
+    def encode_row(item):
+        row = []
+        for lookup, is_href in cells:
+            tokens = lookup(item).split()
+            if is_href and tokens:
+                tokens = rewrite_href_tokens(tokens, host_url, item['@id'])
+            row.append(' '.join(tokens))
+        return encode_cells(row)
+    return encode_row
+
+
+def compile_row_values(columns):
+    lookups = [compile_column_lookup(path) for path in columns]
+
+    def row_values(item):
+        return [lookup(item) for lookup in lookups]
+    return row_values
+
+
+def get_projected_fields(columns):
+    # @id is needed to rewrite relative hrefs.
+    return list(dict.fromkeys(['@id', *columns]))
+
+
+def make_projected_search_request(request, columns):
+    """
+    Return a copy of the request that only asks OpenSearch for the fields
+    of the columns instead of each document's whole embedded object.
+    """
+    query_string = QueryString(request)
+    query_string.drop('field')
+    query_string.extend(
+        [
+            ('field', field)
+            for field in get_projected_fields(columns)
+        ]
+    )
+    search_request = query_string.get_request_with_new_query_string()
+    search_request.registry = request.registry
+    return search_request
 
 
 def _convert_camel_to_snake(type_str):
@@ -107,10 +219,9 @@ def report_download(context, request):
     request.GET['limit'] = 'all'
     type_str = types[0]
     schema = request.registry[TYPES][type_str].schema
-    search_config = request.registry[SEARCH_CONFIG].as_dict()[type_str]
-    columns = list_visible_columns_for_schemas(request, schema, search_config)
+    columns = get_visible_columns_for_type(request, type_str)
     snake_type = _convert_camel_to_snake(type_str).replace("'", '')
-    results = search_generator(request)
+    results = search_generator(make_projected_search_request(request, columns))
 
     def format_header():
         newheader = '%s\t%s%s?%s\r\n' % (downloadtime, request.host_url, '/report/', request.query_string)
@@ -122,16 +233,19 @@ def report_download(context, request):
 
     header = [column.get('title') or field for field, column in columns.items()]
 
+    def generate_row_values():
+        row_values = compile_row_values(columns)
+        for item in results['@graph']:
+            yield row_values(item)
+
     def generate_rows():
         yield format_header()
         yield format_row(header)
+        encode_row = compile_row_encoder(columns)
         for item in results['@graph']:
-            values = [lookup_column_value(item, path) for path in columns]
-            yield format_row(values)
+            yield encode_row(item)
 
-    # Stream response using chunked encoding.
-    request.response.content_type = 'text/tsv'
-    request.response.content_disposition = 'attachment;filename="{}_report_{}_{}_{}_{}h_{}m.tsv"'.format(
+    filename = '{}_report_{}_{}_{}_{}h_{}m'.format(
         snake_type,
         downloadtime.year,
         downloadtime.month,
@@ -139,8 +253,56 @@ def report_download(context, request):
         downloadtime.hour,
         downloadtime.minute
     )
-    request.response.app_iter = generate_rows()
-    return request.response
+
+    columnar_format = get_columnar_format(request)
+    if columnar_format is not None:
+        # Columnar formats are keyed by field path rather than title
+        # so column names are unique and typed from the schema.
+        request.response.content_type = get_content_type(columnar_format)
+        request.response.content_disposition = get_content_disposition(columnar_format, filename)
+        request.response.app_iter = generate_columnar_chunks(
+            columnar_format,
+            list(columns),
+            get_column_types_from_schema(schema, columns),
+            generate_row_values(),
+        )
+        return request.response
+
+    # Stream response using chunked encoding.
+    request.response.content_type = 'text/tsv'
+    request.response.content_disposition = 'attachment;filename="{}.tsv"'.format(filename)
+    return set_streaming_app_iter(request, request.response, generate_rows())
+
+
+def get_memoized(request, key, make_value):
+    cache = request.registry.get(REPORT_COLUMNS_CACHE)
+    if cache is None:
+        return make_value()
+    return cache.get_or_set(key, make_value)
+
+
+def copy_columns(columns):
+    # Callers change titles in place.
+    return OrderedDict(
+        (field, dict(column))
+        for field, column in columns.items()
+    )
+
+
+def get_visible_columns_for_type(request, type_str):
+    """
+    Memoized list_visible_columns_for_schemas for a single type.
+    """
+    def make_columns():
+        schema = request.registry[TYPES][type_str].schema
+        search_config = request.registry[SEARCH_CONFIG].as_dict()[type_str]
+        return list_visible_columns_for_schemas(request, schema, search_config)
+    key = (
+        'visible_columns',
+        type_str,
+        tuple(request.params.getall('field')),
+    )
+    return copy_columns(get_memoized(request, key, make_columns))
 
 
 def list_visible_columns_for_schemas(request, schema, search_config):
@@ -190,22 +352,35 @@ def multitype_report_download(context, request):
     response = request.embed(f'/multireport?{query_string}')
     facets = response['facets']
     columns = response['result_columns']
-    abstract_types = get_abstract_types(request)
-    types_in_search_result = []
-    for facet in facets:
-        if facet['field'] == 'type':
-            for term in facet['terms']:
-                type_name = term['key']
-                if type_name not in abstract_types:
-                    types_in_search_result.append(term['key'])
-            break
+    types_in_search_result = get_types_in_search_result(request, facets)
     report_type = 'mixed'
     if len(types_in_search_result) == 1:
         report_type = _convert_camel_to_snake(types_in_search_result[0]).replace("'", '')
 
     # Make sure we get all results
     request.GET['limit'] = 'all'
-    results = search_generator(request)
+    search_request = make_projected_search_request(request, columns)
+    concrete_types = get_concrete_types(request, types_in_search_result)
+    max_workers = get_multireport_fan_out_max_workers(request)
+
+    def generate_items():
+        if not max_workers or len(concrete_types) < 2:
+            yield from search_generator(search_request)['@graph']
+            return
+        executor = ThreadPoolExecutor(
+            max_workers=min(max_workers, len(concrete_types)),
+            thread_name_prefix='multireport',
+        )
+        try:
+            yield from fan_out_search_generator(
+                [
+                    make_type_search_request(search_request, type_str)
+                    for type_str in concrete_types
+                ],
+                executor,
+            )['@graph']
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
 
     def format_header():
         newheader = '%s\t%s%s?%s\r\n' % (downloadtime, request.host_url, '/multireport/', request.query_string)
@@ -216,19 +391,17 @@ def multitype_report_download(context, request):
         columns['@id']['title'] = 'id'
 
     header_row = [column.get('title') or field for field, column in columns.items()]
-    columns_keys = list(columns.keys())
-    href_index = []
-    for index, item in enumerate(columns_keys):
-        if item in HREF_COLUMN_KEYS:
-            href_index.append(index)
 
     def generate_rows():
         yield format_header()
         yield format_row(header_row)
-        for item in results['@graph']:
-            id = item['@id']
-            values = [lookup_column_value(item, path) for path in columns]
-            yield format_row_full_url(values, href_index, request.host_url, id)
+        encode_row = compile_row_encoder(
+            columns,
+            host_url=request.host_url,
+            href_columns=HREF_COLUMN_KEYS,
+        )
+        for item in generate_items():
+            yield encode_row(item)
 
     # Stream response using chunked encoding.
     request.response.content_type = 'text/tsv'
@@ -240,15 +413,40 @@ def multitype_report_download(context, request):
         downloadtime.hour,
         downloadtime.minute
     )
-    request.response.app_iter = generate_rows()
-    return request.response
+    return set_streaming_app_iter(request, request.response, generate_rows())
 
-# only return the columns of the concrete types if the type is returned in search restult
+
+def get_multireport_fan_out_max_workers(request):
+    return int(
+        request.registry.settings.get(
+            MULTIREPORT_FAN_OUT_MAX_WORKERS_SETTING,
+            DEFAULT_MULTIREPORT_FAN_OUT_MAX_WORKERS,
+        )
+    )
 
 
-def get_result_columns(request, facets, report_response_columns):
-    columns = OrderedDict({'@id': {'title': 'ID'}})
-    configs = request.params.getall('config')
+def get_concrete_types(request, type_names):
+    concrete_types = {
+        type_info.name
+        for type_info in request.registry[TYPES].by_item_type.values()
+    }
+    return [
+        type_name
+        for type_name in type_names
+        if type_name in concrete_types
+    ]
+
+
+def make_type_search_request(request, type_str):
+    query_string = QueryString(request)
+    query_string.drop('type')
+    query_string.append(('type', type_str))
+    type_request = query_string.get_request_with_new_query_string()
+    type_request.registry = request.registry
+    return type_request
+
+
+def get_types_in_search_result(request, facets):
     abstract_types = get_abstract_types(request)
     types_in_search_result = []
     for facet in facets:
@@ -258,6 +456,35 @@ def get_result_columns(request, facets, report_response_columns):
                 if type_name not in abstract_types:
                     types_in_search_result.append(term['key'])
             break
+    return types_in_search_result
+
+
+# only return the columns of the concrete types if the type is returned in search restult
+def get_result_columns(request, facets, report_response_columns):
+    configs = request.params.getall('config')
+    fields_requested = request.params.getall('field')
+    types_in_search_result = get_types_in_search_result(request, facets)
+
+    def make_columns():
+        return make_result_columns(
+            request,
+            types_in_search_result,
+            configs,
+            report_response_columns,
+            fields_requested,
+        )
+    key = (
+        'result_columns',
+        tuple(types_in_search_result),
+        tuple(configs),
+        tuple(report_response_columns) if configs else (),
+        tuple(fields_requested),
+    )
+    return copy_columns(get_memoized(request, key, make_columns))
+
+
+def make_result_columns(request, types_in_search_result, configs, report_response_columns, fields_requested):
+    columns = OrderedDict({'@id': {'title': 'ID'}})
     # if config in query string
     if configs:
         columns.update(report_response_columns)
@@ -280,7 +507,6 @@ def get_result_columns(request, facets, report_response_columns):
                         'aliases'
                     ] if name in schema['properties']
                 ))
-    fields_requested = request.params.getall('field')
     # if field in query string
     if fields_requested:
         limited_columns = OrderedDict()
@@ -304,6 +530,10 @@ def get_result_columns(request, facets, report_response_columns):
 
 
 def get_abstract_types(request):
+    return list(get_memoized(request, ('abstract_types',), lambda: make_abstract_types(request)))
+
+
+def make_abstract_types(request):
     types = []
     item_registry = request.registry[TYPES]
     for name, item in item_registry.abstract.items():
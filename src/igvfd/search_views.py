@@ -1,8 +1,28 @@
+from pyramid.httpexceptions import HTTPBadRequest
 from pyramid.view import view_config
+from igvfd.lru import LRUCache
+from igvfd.report import get_visible_columns_for_type
 from igvfd.searches.defaults import DEFAULT_ITEM_TYPES
 from igvfd.searches.defaults import RESERVED_KEYS
-from igvfd.searches.defaults import TOP_HITS_ITEM_TYPES
+from igvfd.searches.coalesce import SEARCH_COALESCER
+from igvfd.searches.coalesce import make_search_coalescer
+from igvfd.searches.coalesce import render_coalesced
+from igvfd.searches.generation import INDEX_GENERATION
+from igvfd.searches.generation import make_index_generation
+from igvfd.searches.fields import CachedMatrixWithFacetsResponseField
+from igvfd.searches.fields import CachedReportWithFacetsResponseField
+from igvfd.searches.fields import CachedSearchWithFacetsResponseField
+from igvfd.searches.fields import FACET_CACHE
 from igvfd.searches.fields import ResultColumnsResponseField
+from igvfd.searches.fields import make_facet_cache
+from igvfd.searches.poll import prepare_poll_response
+from igvfd.searches.profile import ProfileDebugQueryResponseField
+from igvfd.searches.top_hits import MultiSearchTopHitsResponseField
+from igvfd.searches.top_hits import TOP_HITS_CACHE
+from igvfd.searches.top_hits import TOP_HITS_CACHE_SIZE
+from igvfd.searches.generator import search_generator as search_hits_generator
+from igvfd.streaming import NDJSON
+from igvfd.streaming import set_ndjson_app_iter
 from snosearch.interfaces import AUDIT_TITLE
 from snosearch.interfaces import MATRIX_TITLE
 from snosearch.interfaces import REPORT_TITLE
@@ -12,20 +32,15 @@ from snosearch.interfaces import SUMMARY_TITLE
 from snosearch.fields import AuditMatrixWithFacetsResponseField
 from snosearch.fields import AllResponseField
 from snosearch.fields import BasicSearchResponseField
-from snosearch.fields import BasicMatrixWithFacetsResponseField
-from snosearch.fields import BasicSearchWithFacetsResponseField
-from snosearch.fields import BasicReportWithFacetsResponseField
 from snosearch.fields import MultipleTypesReportWithFacetsResponseField
 from snosearch.fields import ClearFiltersResponseField
 from snosearch.fields import ColumnsResponseField
 from snosearch.fields import ContextResponseField
-from snosearch.fields import DebugQueryResponseField
 from snosearch.fields import FacetGroupsResponseField
 from snosearch.fields import FiltersResponseField
 from snosearch.fields import IDResponseField
 from snosearch.fields import NotificationResponseField
 from snovault.elasticsearch.searches.fields import NonSortableResponseField
-from snosearch.fields import RawTopHitsResponseField
 from snosearch.fields import SearchBaseResponseField
 from snosearch.fields import SortResponseField
 from snosearch.fields import TitleResponseField
@@ -48,13 +63,19 @@ def includeme(config):
     config.add_route('top-hits-raw', '/top-hits-raw{slash:/?}')
     config.add_route('top-hits', '/top-hits{slash:/?}')
     config.add_route('search-config-registry', '/search-config-registry{slash:/?}')
+    config.add_route('count', '/count{slash:/?}')
+    config.add_route('facets', '/facets{slash:/?}')
+    config.registry[FACET_CACHE] = make_facet_cache(config.registry.settings)
+    config.registry[TOP_HITS_CACHE] = LRUCache(TOP_HITS_CACHE_SIZE)
+    config.registry[SEARCH_COALESCER] = make_search_coalescer(config.registry.settings)
+    config.registry[INDEX_GENERATION] = make_index_generation(config.registry.settings)
     config.scan(__name__, categories=None)
 
 
 @view_config(route_name='search', request_method='GET', permission='search')
 def search(context, request):
     # Note the order of rendering matters for some fields, e.g. AllResponseField and
-    # NotificationResponseField depend on results from BasicSearchWithFacetsResponseField.
+    # NotificationResponseField depend on results from CachedSearchWithFacetsResponseField.
     fr = FieldedResponse(
         _meta={
             'params_parser': ParamsParser(request)
@@ -68,7 +89,7 @@ def search(context, request):
             ),
             IDResponseField(),
             ContextResponseField(),
-            BasicSearchWithFacetsResponseField(
+            CachedSearchWithFacetsResponseField(
                 default_item_types=DEFAULT_ITEM_TYPES,
                 reserved_keys=RESERVED_KEYS,
             ),
@@ -79,10 +100,10 @@ def search(context, request):
             ClearFiltersResponseField(),
             ColumnsResponseField(),
             SortResponseField(),
-            DebugQueryResponseField()
+            ProfileDebugQueryResponseField()
         ]
     )
-    return fr.render()
+    return render_coalesced(request, fr)
 
 
 @view_config(route_name='report', request_method='GET', permission='search')
@@ -100,7 +121,7 @@ def report(context, request):
             ),
             IDResponseField(),
             ContextResponseField(),
-            BasicReportWithFacetsResponseField(
+            CachedReportWithFacetsResponseField(
                 default_item_types=DEFAULT_ITEM_TYPES,
                 reserved_keys=RESERVED_KEYS,
             ),
@@ -112,10 +133,46 @@ def report(context, request):
             ColumnsResponseField(),
             NonSortableResponseField(),
             SortResponseField(),
-            DebugQueryResponseField()
+            ProfileDebugQueryResponseField()
         ]
     )
-    return fr.render()
+    return render_coalesced(request, fr)
+
+
+def stream_ndjson(request):
+    # Stream every hit unless the client asks for fewer.
+    if 'limit' not in request.GET:
+        request.GET['limit'] = 'all'
+    results = search_hits_generator(request)
+    return set_ndjson_app_iter(request, request.response, results['@graph'])
+
+
+@view_config(
+    route_name='search',
+    request_method='GET',
+    permission='search',
+    request_param=f'format={NDJSON}',
+)
+def search_ndjson(context, request):
+    return stream_ndjson(request)
+
+
+@view_config(
+    route_name='report',
+    request_method='GET',
+    permission='search',
+    request_param=f'format={NDJSON}',
+)
+def report_ndjson(context, request):
+    types = request.params.getall('type')
+    if len(types) != 1:
+        msg = 'Report view requires specifying a single type.'
+        raise HTTPBadRequest(explanation=msg)
+    # Return the same fields as the report columns.
+    if not request.params.getall('field'):
+        for field in get_visible_columns_for_type(request, types[0]):
+            request.GET.add('field', field)
+    return stream_ndjson(request)
 
 
 @view_config(route_name='multireport', request_method='GET', permission='search')
@@ -146,10 +203,10 @@ def multireport(context, request):
             ResultColumnsResponseField(),
             NonSortableResponseField(),
             SortResponseField(),
-            DebugQueryResponseField()
+            ProfileDebugQueryResponseField()
         ]
     )
-    return fr.render()
+    return render_coalesced(request, fr)
 
 
 @view_config(route_name='matrix', request_method='GET', permission='search')
@@ -168,7 +225,7 @@ def matrix(context, request):
             IDResponseField(),
             SearchBaseResponseField(),
             ContextResponseField(),
-            BasicMatrixWithFacetsResponseField(
+            CachedMatrixWithFacetsResponseField(
                 default_item_types=DEFAULT_ITEM_TYPES,
                 reserved_keys=RESERVED_KEYS,
             ),
@@ -176,10 +233,10 @@ def matrix(context, request):
             NotificationResponseField(),
             FiltersResponseField(),
             TypeOnlyClearFiltersResponseField(),
-            DebugQueryResponseField()
+            ProfileDebugQueryResponseField()
         ]
     )
-    return fr.render()
+    return render_coalesced(request, fr)
 
 
 @view_config(route_name='summary', request_method='GET', permission='search')
@@ -198,7 +255,7 @@ def summary(context, request):
             IDResponseField(),
             SearchBaseResponseField(),
             ContextResponseField(),
-            BasicMatrixWithFacetsResponseField(
+            CachedMatrixWithFacetsResponseField(
                 default_item_types=DEFAULT_ITEM_TYPES,
                 matrix_definition_name=SUMMARY_MATRIX,
                 reserved_keys=RESERVED_KEYS,
@@ -207,10 +264,10 @@ def summary(context, request):
             NotificationResponseField(),
             FiltersResponseField(),
             TypeOnlyClearFiltersResponseField(),
-            DebugQueryResponseField()
+            ProfileDebugQueryResponseField()
         ]
     )
-    return fr.render()
+    return render_coalesced(request, fr)
 
 
 @view_config(route_name='audit', request_method='GET', permission='search')
@@ -237,10 +294,10 @@ def audit(context, request):
             NotificationResponseField(),
             FiltersResponseField(),
             TypeOnlyClearFiltersResponseField(),
-            DebugQueryResponseField()
+            ProfileDebugQueryResponseField()
         ]
     )
-    return fr.render()
+    return render_coalesced(request, fr)
 
 
 @view_config(route_name='top-hits-raw', request_method='GET', permission='search')
@@ -250,10 +307,7 @@ def top_hits_raw(context, request):
             'params_parser': ParamsParser(request)
         },
         response_fields=[
-            RawTopHitsResponseField(
-                default_item_types=TOP_HITS_ITEM_TYPES,
-                reserved_keys=RESERVED_KEYS,
-            )
+            MultiSearchTopHitsResponseField()
         ]
     )
     return fr.render()
@@ -271,6 +325,52 @@ def top_hits(context, request):
     return fr.render()
 
 
+@view_config(route_name='count', request_method='GET', permission='search')
+def count(context, request):
+    not_modified = prepare_poll_response(request)
+    if not_modified is not None:
+        return not_modified
+    request.GET['limit'] = '0'
+    fr = FieldedResponse(
+        _meta={
+            'params_parser': ParamsParser(request)
+        },
+        response_fields=[
+            BasicSearchResponseField(
+                default_item_types=DEFAULT_ITEM_TYPES,
+                reserved_keys=RESERVED_KEYS,
+            )
+        ]
+    )
+    return {
+        'total': fr.render()['total'],
+    }
+
+
+@view_config(route_name='facets', request_method='GET', permission='search')
+def facets(context, request):
+    not_modified = prepare_poll_response(request)
+    if not_modified is not None:
+        return not_modified
+    request.GET['limit'] = '0'
+    fr = FieldedResponse(
+        _meta={
+            'params_parser': ParamsParser(request)
+        },
+        response_fields=[
+            CachedSearchWithFacetsResponseField(
+                default_item_types=DEFAULT_ITEM_TYPES,
+                reserved_keys=RESERVED_KEYS,
+            )
+        ]
+    )
+    response = fr.render()
+    return {
+        'facets': response['facets'],
+        'total': response['total'],
+    }
+
+
 @view_config(route_name='search-config-registry', request_method='GET', permission='search')
 def search_config_registry(context, request):
     registry = request.registry[SEARCH_CONFIG]
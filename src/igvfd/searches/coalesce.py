@@ -0,0 +1,215 @@
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from igvfd.searches.profile import is_profile_request
+from igvfd.searches.profile import render_profiled
+
+
+SEARCH_COALESCER = 'search_coalescer'
+
+SEARCH_COALESCE_DIR_SETTING = 'search.coalesce_dir'
+
+# Seconds a rendered search is reused for identical requests, 0 disables coalescing.
+SEARCH_COALESCE_SECONDS_SETTING = 'search.coalesce_seconds'
+
+DEFAULT_SEARCH_COALESCE_SECONDS = 0
+
+# Larger rendered searches are not written to the shared directory.
+SEARCH_COALESCE_MAX_BYTES_SETTING = 'search.coalesce_max_bytes'
+
+DEFAULT_SEARCH_COALESCE_MAX_BYTES = 1024 * 1024
+
+# Searches asking for more results than this, or for all of
+# them, are always rendered by the request itself.
+MAX_COALESCED_LIMIT = 100
+
+RESULT_FILE_SUFFIX = '.json'
+
+LOCK_FILE_SUFFIX = '.lock'
+
+# Expired results are removed at most once per this many seconds.
+CLEANUP_INTERVAL_SECONDS = 60
+
+
+class SearchCoalescer:
+    '''
+    Single-flight for searches across all workers on a host. The first
+    worker to take the lock for a key renders it and publishes the
+    result to a shared directory; workers that were waiting on the
+    lock, or that arrive within fresh_seconds, read that result
+    instead of searching again.
+    '''
+
+    def __init__(self, directory, fresh_seconds, max_bytes=DEFAULT_SEARCH_COALESCE_MAX_BYTES):
+        self.directory = directory
+        self.fresh_seconds = fresh_seconds
+        self.max_bytes = max_bytes
+        self.last_cleanup = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _get_result_path(self, key):
+        return os.path.join(self.directory, key + RESULT_FILE_SUFFIX)
+
+    def _get_lock_path(self, key):
+        return os.path.join(self.directory, key + LOCK_FILE_SUFFIX)
+
+    def _load_fresh(self, key):
+        path = self._get_result_path(key)
+        try:
+            with open(path) as result_file:
+                if time.time() - os.fstat(result_file.fileno()).st_mtime >= self.fresh_seconds:
+                    return None
+                return json.load(result_file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _publish(self, key, result):
+        data = json.dumps(result)
+        if len(data) > self.max_bytes:
+            # Identical requests render their own copy instead
+            # of waiting on the lock for one they can't share.
+            data = json.dumps({'too_large': True})
+        fd, temporary_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, 'w') as temporary_file:
+                temporary_file.write(data)
+            os.replace(temporary_path, self._get_result_path(key))
+        except Exception:
+            os.remove(temporary_path)
+            raise
+
+    def cleanup(self):
+        now = time.time()
+        if now - self.last_cleanup < CLEANUP_INTERVAL_SECONDS:
+            return
+        self.last_cleanup = now
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(RESULT_FILE_SUFFIX):
+                continue
+            try:
+                if now - entry.stat().st_mtime >= self.fresh_seconds:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def _lock(self, key):
+        '''
+        Returns the open lock file of key once it's locked. The lock
+        file is removed when released, so a lock taken on a file that
+        was removed meanwhile is dropped and taken again.
+        '''
+        lock_path = self._get_lock_path(key)
+        while True:
+            lock_file = open(lock_path, 'a')
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if os.stat(lock_path).st_ino == os.fstat(lock_file.fileno()).st_ino:
+                    return lock_file
+            except FileNotFoundError:
+                pass
+            lock_file.close()
+
+    def _unlock(self, key, lock_file):
+        try:
+            os.remove(self._get_lock_path(key))
+        except FileNotFoundError:
+            pass
+        lock_file.close()
+
+    def do(self, key, render):
+        '''
+        Returns (value, status_code) of render for key, running
+        render only if no fresh result exists once the lock is held.
+        '''
+        result = self._load_fresh(key)
+        if result is None:
+            lock_file = self._lock(key)
+            try:
+                result = self._load_fresh(key)
+                if result is None:
+                    value, status_code = render()
+                    self._publish(
+                        key,
+                        {
+                            'value': value,
+                            'status_code': status_code,
+                        }
+                    )
+            finally:
+                self._unlock(key, lock_file)
+            self.cleanup()
+            if result is None:
+                return value, status_code
+        if result.get('too_large'):
+            return render()
+        return result['value'], result['status_code']
+
+
+def make_search_coalescer(settings):
+    directory = settings.get(SEARCH_COALESCE_DIR_SETTING)
+    fresh_seconds = float(
+        settings.get(
+            SEARCH_COALESCE_SECONDS_SETTING,
+            DEFAULT_SEARCH_COALESCE_SECONDS,
+        )
+    )
+    max_bytes = int(
+        settings.get(
+            SEARCH_COALESCE_MAX_BYTES_SETTING,
+            DEFAULT_SEARCH_COALESCE_MAX_BYTES,
+        )
+    )
+    if not directory or fresh_seconds <= 0:
+        return None
+    return SearchCoalescer(directory, fresh_seconds, max_bytes=max_bytes)
+
+
+def make_search_coalesce_key(request):
+    key = json.dumps(
+        [
+            request.path_info,
+            sorted(request.params.items()),
+            sorted(request.effective_principals),
+        ]
+    )
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def is_bounded_request(request):
+    limit = request.params.get('limit')
+    if limit is None:
+        return True
+    try:
+        return int(limit) <= MAX_COALESCED_LIMIT
+    except ValueError:
+        return False
+
+
+def render_coalesced(request, fielded_response):
+    '''
+    Renders the response, sharing the result with identical
+    concurrent requests (same path, params and principals).
+    Profiled requests and requests for more than
+    MAX_COALESCED_LIMIT results always render their own response.
+    '''
+    if is_profile_request(request):
+        return render_profiled(request, fielded_response)
+    coalescer = request.registry.get(SEARCH_COALESCER)
+    if coalescer is None or not is_bounded_request(request):
+        return fielded_response.render()
+
+    def render():
+        value = fielded_response.render()
+        # Fields can set the status, e.g. 404 for no results.
+        return value, request.response.status_code
+
+    value, status_code = coalescer.do(
+        make_search_coalesce_key(request),
+        render,
+    )
+    request.response.status_code = status_code
+    return value
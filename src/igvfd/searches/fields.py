@@ -1,5 +1,36 @@
+import copy
+import hashlib
+import json
+
+from snosearch.fields import BasicMatrixWithFacetsResponseField
+from snosearch.fields import BasicReportWithFacetsResponseField
+from snosearch.fields import BasicSearchWithFacetsResponseField
 from snosearch.fields import ResponseField
+from igvfd.lru import LRUCache
 from igvfd.report import get_result_columns
+from igvfd.searches.generation import get_index_generation
+from igvfd.searches.profile import get_profile
+from igvfd.searches.profile import is_profile_request
+
+
+FACET_CACHE = 'facet_cache'
+
+# Number of aggregation results kept per process, 0 disables the cache.
+FACET_CACHE_SIZE_SETTING = 'search.facet_cache_size'
+
+DEFAULT_FACET_CACHE_SIZE = 256
+
+# Params that change which hits are returned or how they
+# are rendered but not the aggregations over them.
+HIT_ONLY_PARAMS = [
+    'limit',
+    'from',
+    'sort',
+    'field',
+    'frame',
+    'format',
+    'debug',
+]
 
 
 class ResultColumnsResponseField(ResponseField):
@@ -15,3 +46,144 @@ class ResultColumnsResponseField(ResponseField):
         return {
             'result_columns': get_result_columns(request, facets, columns)
         }
+
+
+def make_facet_cache(settings):
+    size = int(settings.get(FACET_CACHE_SIZE_SETTING, DEFAULT_FACET_CACHE_SIZE))
+    if size <= 0:
+        return None
+    return LRUCache(size)
+
+
+def get_normalized_filters(request):
+    return sorted(
+        (k, v)
+        for k, v in request.params.items()
+        if k not in HIT_ONLY_PARAMS
+    )
+
+
+def make_facet_cache_key(request, name, aggregations):
+    '''
+    The index generation changes whenever the indexer writes, so
+    entries for an older index are never read again and age out.
+    '''
+    key = json.dumps(
+        [
+            name,
+            aggregations,
+            get_normalized_filters(request),
+            sorted(request.effective_principals),
+            get_index_generation(request),
+        ],
+        sort_keys=True,
+    )
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def get_aggregations(search):
+    return search.to_dict().get('aggs', {})
+
+
+def without_aggregations(search):
+    # Extra body params replace the ones built from the search.
+    return search.extra(aggs={})
+
+
+class AggregationResults:
+    '''
+    Results of a search whose aggregation methods return the cached
+    values, or record the values they compute when none are cached.
+    Everything else is read from the wrapped results.
+    '''
+
+    def __init__(self, results, aggregation_methods, cached=None):
+        self.wrapped = results
+        self.aggregation_methods = aggregation_methods
+        self.cached = cached
+        self.aggregations = {}
+
+    def __getattr__(self, name):
+        if name not in self.aggregation_methods:
+            return getattr(self.wrapped, name)
+        if self.cached is not None:
+            # Responses are built in place by later fields.
+            return lambda: copy.deepcopy(self.cached[name])
+        method = getattr(self.wrapped, name)
+
+        def record():
+            value = method()
+            self.aggregations[name] = copy.deepcopy(value)
+            return value
+        return record
+
+
+class CachedAggregationsMixin:
+    '''
+    Serves the aggregation-derived parts of a response (facets, matrix)
+    from the registry facet cache. On a hit the search is sent without
+    its aggregations, so only the hits and total are computed.
+    '''
+
+    aggregation_methods = ['to_facets']
+
+    def _get_facet_cache_name(self):
+        return type(self).__name__
+
+    def _execute_query(self):
+        request = self.get_request()
+        profiling = is_profile_request(request)
+        self.facet_cache = request.registry.get(FACET_CACHE)
+        self.facet_cache_key = None
+        self.cached_aggregations = None
+        if profiling:
+            # Profile the aggregations rather than the cache.
+            self.facet_cache = None
+            self.query = self.query.extra(profile=True)
+        if self.facet_cache is not None:
+            self.facet_cache_key = make_facet_cache_key(
+                request,
+                self._get_facet_cache_name(),
+                get_aggregations(self.query),
+            )
+            self.cached_aggregations = self.facet_cache.get(self.facet_cache_key)
+        if self.cached_aggregations is not None:
+            self.query = without_aggregations(self.query)
+        super()._execute_query()
+        if profiling:
+            get_profile(self.parent)['opensearch'] = self.results.results.to_dict().get('profile')
+
+    def _format_results(self):
+        self.results = AggregationResults(
+            self.results,
+            self.aggregation_methods,
+            cached=self.cached_aggregations,
+        )
+        super()._format_results()
+        aggregations = self.results.aggregations
+        if (
+                self.facet_cache_key is not None and
+                self.cached_aggregations is None and
+                len(aggregations) == len(self.aggregation_methods)
+        ):
+            self.facet_cache.set(self.facet_cache_key, aggregations)
+
+
+class CachedSearchWithFacetsResponseField(CachedAggregationsMixin, BasicSearchWithFacetsResponseField):
+    pass
+
+
+class CachedReportWithFacetsResponseField(CachedAggregationsMixin, BasicReportWithFacetsResponseField):
+    pass
+
+
+class CachedMatrixWithFacetsResponseField(CachedAggregationsMixin, BasicMatrixWithFacetsResponseField):
+
+    aggregation_methods = ['to_facets', 'to_matrix']
+
+    def _get_facet_cache_name(self):
+        # /matrix and /summary render different matrix definitions.
+        return '{}:{}'.format(
+            type(self).__name__,
+            self.kwargs.get('matrix_definition_name'),
+        )
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import threading
+import time
+
+from snovault.elasticsearch.interfaces import ELASTIC_SEARCH
+from snovault.elasticsearch.interfaces import RESOURCES_INDEX
+
+
+INDEX_GENERATION = 'index_generation'
+
+INDEX_GENERATION_ATTRIBUTE = '_index_generation'
+
+# Seconds a process reuses the index generation, 0 reads it every request.
+INDEX_GENERATION_SECONDS_SETTING = 'search.index_generation_seconds'
+
+DEFAULT_INDEX_GENERATION_SECONDS = 5
+
+# OpenSearch default refresh_interval. Writes seen for at least
+# this long are searchable.
+INDEX_REFRESH_SECONDS = 1
+
+
+def _get_shard_seq_nos(client):
+    stats = client.indices.stats(
+        index=RESOURCES_INDEX,
+        level='shards',
+        filter_path=(
+            'indices.*.uuid,'
+            'indices.*.shards.*.routing.primary,'
+            'indices.*.shards.*.seq_no.max_seq_no'
+        ),
+    )
+    seq_nos = []
+    for index in stats.get('indices', {}).values():
+        for shard_number, copies in index.get('shards', {}).items():
+            for copy in copies:
+                if copy.get('routing', {}).get('primary'):
+                    seq_nos.append(
+                        [
+                            index.get('uuid'),
+                            shard_number,
+                            copy.get('seq_no', {}).get('max_seq_no'),
+                        ]
+                    )
+    return sorted(seq_nos)
+
+
+def read_index_generation(client):
+    '''
+    Derived from the sequence number of every primary shard. Sequence
+    numbers are stored with the shards, so unlike indexing counters
+    they don't restart when a node does or a shard moves.
+    '''
+    return hashlib.sha256(
+        json.dumps(_get_shard_seq_nos(client)).encode('utf-8')
+    ).hexdigest()
+
+
+class IndexGeneration:
+    '''
+    Per-process index generation, read from OpenSearch at most once
+    per ttl_seconds. Sequence numbers rise before the writes are
+    refreshed, so a new generation is only returned once it has been
+    seen for INDEX_REFRESH_SECONDS; results cached under it then
+    include its writes without anyone forcing a refresh.
+    '''
+
+    def __init__(self, ttl_seconds):
+        self.ttl_seconds = ttl_seconds
+        self.generation = None
+        self.checked = 0
+        self.seen = None
+        self.seen_at = 0
+        self._lock = threading.Lock()
+
+    def get(self, client):
+        with self._lock:
+            now = time.monotonic()
+            if self.generation is not None and now - self.checked < self.ttl_seconds:
+                return self.generation
+            seen = read_index_generation(client)
+            if self.generation is None:
+                self.generation = seen
+            elif seen != self.seen:
+                if now - self.seen_at >= INDEX_REFRESH_SECONDS:
+                    self.generation = self.seen
+                self.seen_at = now
+            elif now - self.seen_at >= INDEX_REFRESH_SECONDS:
+                self.generation = seen
+            self.seen = seen
+            self.checked = now
+            return self.generation
+
+
+def make_index_generation(settings):
+    ttl_seconds = float(
+        settings.get(
+            INDEX_GENERATION_SECONDS_SETTING,
+            DEFAULT_INDEX_GENERATION_SECONDS,
+        )
+    )
+    if ttl_seconds <= 0:
+        return None
+    return IndexGeneration(ttl_seconds)
+
+
+def get_index_generation(request):
+    '''
+    Returns a marker that changes whenever documents are indexed or
+    deleted. Computed at most once per request.
+    '''
+    generation = getattr(request, INDEX_GENERATION_ATTRIBUTE, None)
+    if generation is None:
+        client = request.registry[ELASTIC_SEARCH]
+        index_generation = request.registry.get(INDEX_GENERATION)
+        if index_generation is None:
+            generation = read_index_generation(client)
+        else:
+            generation = index_generation.get(client)
+        setattr(request, INDEX_GENERATION_ATTRIBUTE, generation)
+    return generation
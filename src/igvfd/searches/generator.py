@@ -1,10 +1,26 @@
+import heapq
+
+from functools import cmp_to_key
 from snosearch.responses import FieldedGeneratorResponse
 from snosearch.parsers import ParamsParser
 from snosearch.fields import BasicSearchResponseField
+from snosearch.queries import BasicSearchQueryFactory
 from igvfd.searches.defaults import DEFAULT_ITEM_TYPES
 from igvfd.searches.defaults import RESERVED_KEYS
 
 
+CURSOR_PAGE_SIZE = 1000
+
+# Unique per document, used to break ties so search_after
+# never skips or repeats hits that share a sort value.
+CURSOR_TIEBREAKER_SORT = {
+    'uuid': {
+        'order': 'asc',
+        'unmapped_type': 'keyword',
+    }
+}
+
+
 def search_generator(request):
     '''
     For internal use (no view). Like search_quick but returns raw generator
@@ -22,3 +38,152 @@ def search_generator(request):
         ]
     )
     return fgr.render()
+
+
+def get_cursor_sort(search):
+    sort = list(search.to_dict().get('sort', []))
+    if CURSOR_TIEBREAKER_SORT not in sort:
+        sort.append(CURSOR_TIEBREAKER_SORT)
+    return sort
+
+
+def fetch_cursor_page(search, search_after=None):
+    page = search
+    if search_after is not None:
+        page = search.extra(search_after=search_after)
+    return page.execute().to_dict().get('hits', {}).get('hits', [])
+
+
+def iter_hits_with_cursor(search, page_size=CURSOR_PAGE_SIZE):
+    '''
+    Walks every hit of the search in fixed-size pages, passing the sort
+    values of the last hit of a page as the search_after cursor of the
+    next. Only one page is held in memory at a time.
+    '''
+    search = search.sort(*get_cursor_sort(search))[0:page_size]
+    search_after = None
+    while True:
+        hits = fetch_cursor_page(search, search_after)
+        yield from hits
+        if len(hits) < page_size:
+            return
+        search_after = hits[-1]['sort']
+
+
+def _iter_prefetched_hits(executor, search, page_size, future):
+    while future is not None:
+        hits = future.result()
+        future = None
+        if len(hits) >= page_size:
+            future = executor.submit(fetch_cursor_page, search, hits[-1]['sort'])
+        yield from hits
+
+
+def iter_hits_with_prefetched_cursor(executor, search, page_size=CURSOR_PAGE_SIZE):
+    '''
+    Like iter_hits_with_cursor but pages are fetched on the executor.
+    The first page is requested right away and each next page as soon
+    as the one before it arrives, so at most two pages are held.
+    '''
+    search = search.sort(*get_cursor_sort(search))[0:page_size]
+    future = executor.submit(fetch_cursor_page, search)
+    return _iter_prefetched_hits(executor, search, page_size, future)
+
+
+def get_sort_orders(sort):
+    orders = []
+    for key in sort:
+        if isinstance(key, dict):
+            options = next(iter(key.values()))
+            order = options.get('order', 'asc') if isinstance(options, dict) else options
+        elif key.startswith('-'):
+            order = 'desc'
+        elif key == '_score':
+            order = 'desc'
+        else:
+            order = 'asc'
+        orders.append(order)
+    return orders
+
+
+def _compare_values(x, y):
+    try:
+        return (x > y) - (x < y)
+    except TypeError:
+        # Same field mapped with different types in different indices.
+        return _compare_values(str(x), str(y))
+
+
+def make_sort_key(orders):
+    '''
+    Key that orders hits by their sort values the way OpenSearch does,
+    with missing values last in both directions.
+    '''
+    def compare(a, b):
+        for order, x, y in zip(orders, a['sort'], b['sort']):
+            if x == y:
+                continue
+            if x is None:
+                return 1
+            if y is None:
+                return -1
+            result = _compare_values(x, y)
+            return -result if order == 'desc' else result
+        return 0
+    return cmp_to_key(compare)
+
+
+def format_hit(hit):
+    source = hit.get('_source', {})
+    item = source.get('embedded', {})
+    if 'audit' in source:
+        item['audit'] = source['audit']
+    return item
+
+
+def build_search(request):
+    query_builder = BasicSearchQueryFactory(
+        params_parser=ParamsParser(request),
+        default_item_types=DEFAULT_ITEM_TYPES,
+        reserved_keys=RESERVED_KEYS,
+    )
+    return query_builder.build_query()
+
+
+def cursor_search_generator(request, page_size=CURSOR_PAGE_SIZE):
+    '''
+    For internal use (no view). Like search_generator but pages through
+    results with search_after instead of loading them all at once, so
+    memory stays constant and the first hit is available after the
+    first page returns.
+    '''
+    search = build_search(request)
+    return {
+        '@graph': (
+            format_hit(hit)
+            for hit in iter_hits_with_cursor(search, page_size=page_size)
+        )
+    }
+
+
+def fan_out_search_generator(requests, executor, page_size=CURSOR_PAGE_SIZE):
+    '''
+    For internal use (no view). Runs one cursor search per request (e.g.
+    one per concrete type of a multi-type query) concurrently on the
+    executor and merges their hits in sort order. The requests must only
+    differ in the types they search so their sort values are comparable.
+    '''
+    searches = [build_search(request) for request in requests]
+    # Searches are built on the calling thread because the query depends
+    # on the request (principals, params) and only fetching is handed off.
+    streams = [
+        iter_hits_with_prefetched_cursor(executor, search, page_size=page_size)
+        for search in searches
+    ]
+    sort_key = make_sort_key(get_sort_orders(get_cursor_sort(searches[0])))
+    return {
+        '@graph': (
+            format_hit(hit)
+            for hit in heapq.merge(*streams, key=sort_key)
+        )
+    }
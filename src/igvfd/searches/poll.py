@@ -0,0 +1,62 @@
+import hashlib
+import json
+
+from pyramid.httpexceptions import HTTPNotModified
+from igvfd.searches.fields import get_normalized_filters
+from igvfd.searches.generation import get_index_generation
+
+
+# Seconds clients may reuse a /count or /facets response.
+POLL_MAX_AGE_SETTING = 'search.poll_max_age'
+
+DEFAULT_POLL_MAX_AGE = 60
+
+# Responses differ by user, so shared caches must not
+# serve an anonymous response to a signed in user.
+POLL_VARY = ('Cookie', 'Authorization')
+
+
+def make_poll_etag(request):
+    key = json.dumps(
+        [
+            request.path_info,
+            get_normalized_filters(request),
+            sorted(request.effective_principals),
+            get_index_generation(request),
+        ]
+    )
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def add_poll_vary(response):
+    vary = list(response.vary or ())
+    response.vary = vary + [header for header in POLL_VARY if header not in vary]
+
+
+def prepare_poll_response(request):
+    '''
+    Sets the cache headers of a /count or /facets response. The ETag
+    only changes when the index does, so a poller that sends it back
+    gets a 304 without a search being run.
+    '''
+    etag = make_poll_etag(request)
+    max_age = int(
+        request.registry.settings.get(
+            POLL_MAX_AGE_SETTING,
+            DEFAULT_POLL_MAX_AGE,
+        )
+    )
+    if etag in request.if_none_match:
+        not_modified = HTTPNotModified(etag=etag)
+        not_modified.cache_control.max_age = max_age
+        add_poll_vary(not_modified)
+        return not_modified
+    response = request.response
+    response.etag = etag
+    response.cache_control.max_age = max_age
+    add_poll_vary(response)
+    if request.authenticated_userid is None:
+        response.cache_control.public = True
+    else:
+        response.cache_control.private = True
+    return None
@@ -0,0 +1,111 @@
+import json
+import time
+
+from pyramid.httpexceptions import HTTPForbidden
+from snosearch.fields import DebugQueryResponseField
+
+
+PROFILE = 'profile'
+
+ADMIN_PRINCIPAL = 'group.admin'
+
+
+def check_profile_permission(request):
+    if ADMIN_PRINCIPAL not in request.effective_principals:
+        raise HTTPForbidden(explanation='debug=profile is restricted to admins.')
+
+
+def is_profile_request(request):
+    '''
+    Raises HTTPForbidden for debug=profile from anyone but admins,
+    so no caller can profile or skip the caches for them.
+    '''
+    if PROFILE not in request.params.getall('debug'):
+        return False
+    check_profile_permission(request)
+    return True
+
+
+def get_profile(fielded_response):
+    return fielded_response._meta.setdefault(
+        PROFILE,
+        {
+            'fields': {},
+            'opensearch': None,
+        }
+    )
+
+
+def _elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 3)
+
+
+def time_field_renders(fielded_response):
+    '''
+    Wraps the render of every response field so its time
+    is recorded in the profile of the fielded response.
+    '''
+    timings = get_profile(fielded_response)['fields']
+    for field in fielded_response.response_fields:
+        name = type(field).__name__
+
+        def timed_render(*args, render=field.render, name=name, **kwargs):
+            start = time.perf_counter()
+            try:
+                return render(*args, **kwargs)
+            finally:
+                timings[name] = timings.get(name, 0) + _elapsed_ms(start)
+        field.render = timed_render
+
+
+def render_profiled(request, fielded_response):
+    time_field_renders(fielded_response)
+    return fielded_response.render()
+
+
+def get_aggregation_times(opensearch_profile):
+    '''
+    Total time of each top-level aggregation, e.g. one per facet,
+    summed over shards.
+    '''
+    times = {}
+    for shard in (opensearch_profile or {}).get('shards', []):
+        for aggregation in shard.get('aggregations', []):
+            name = aggregation.get('description')
+            times[name] = times.get(name, 0) + aggregation.get('time_in_nanos', 0) / 1e6
+    return {
+        name: round(ms, 3)
+        for name, ms in sorted(times.items(), key=lambda item: item[1], reverse=True)
+    }
+
+
+def get_serialization_time(value):
+    start = time.perf_counter()
+    json.dumps(value)
+    return _elapsed_ms(start)
+
+
+class ProfileDebugQueryResponseField(DebugQueryResponseField):
+    '''
+    With debug=profile also returns the OpenSearch profile, time per
+    aggregation, time spent rendering each earlier response field and
+    time to serialize the response so far.
+    '''
+
+    def render(self, *args, **kwargs):
+        self.parent = kwargs.get('parent')
+        response = super().render(*args, **kwargs)
+        request = self.get_request()
+        if not is_profile_request(request):
+            return response
+        profile = get_profile(self.parent)
+        response = dict(response)
+        debug = dict(response.get('debug', {}))
+        debug[PROFILE] = {
+            'fields': dict(profile['fields']),
+            'aggregations': get_aggregation_times(profile['opensearch']),
+            'serialization_ms': get_serialization_time(self.parent.response),
+            'opensearch': profile['opensearch'],
+        }
+        response['debug'] = debug
+        return response
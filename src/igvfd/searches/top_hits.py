@@ -0,0 +1,264 @@
+import hashlib
+import json
+import time
+
+from pyramid.httpexceptions import HTTPBadRequest
+from snosearch.fields import ResponseField
+from snosearch.parsers import ParamsParser
+from snosearch.parsers import QueryString
+from snosearch.queries import TopHitsQueryFactory
+from snovault.elasticsearch.interfaces import ELASTIC_SEARCH
+from snovault.elasticsearch.interfaces import RESOURCES_INDEX
+from igvfd.searches.defaults import RESERVED_KEYS
+from igvfd.searches.defaults import TOP_HITS_ITEM_TYPES
+
+
+TOP_HITS_CACHE = 'top_hits_cache'
+
+TOP_HITS_CACHE_SIZE = 1024
+
+# Seconds a top hits result is reused for the same query, 0 disables the cache.
+TOP_HITS_CACHE_SECONDS_SETTING = 'top_hits.cache_seconds'
+
+DEFAULT_TOP_HITS_CACHE_SECONDS = 0
+
+# Per-type search timeout; types still searching when it passes
+# return the hits collected so far.
+TOP_HITS_TIMEOUT_MS_SETTING = 'top_hits.timeout_ms'
+
+DEFAULT_TOP_HITS_TIMEOUT_MS = 500
+
+# limit.<Type>=N overrides limit for one type.
+TYPE_LIMIT_PREFIX = 'limit.'
+
+# Numeric fields of a search response that are summed when
+# the per-type responses are merged.
+SUMMED_FIELDS = [
+    'doc_count',
+    'sum_other_doc_count',
+    'doc_count_error_upper_bound',
+    'value',
+]
+
+
+def get_top_hits_cache_seconds(request):
+    return float(
+        request.registry.settings.get(
+            TOP_HITS_CACHE_SECONDS_SETTING,
+            DEFAULT_TOP_HITS_CACHE_SECONDS,
+        )
+    )
+
+
+def get_top_hits_timeout_ms(request):
+    return int(
+        request.registry.settings.get(
+            TOP_HITS_TIMEOUT_MS_SETTING,
+            DEFAULT_TOP_HITS_TIMEOUT_MS,
+        )
+    )
+
+
+def get_top_hits_types(request):
+    return request.params.getall('type') or TOP_HITS_ITEM_TYPES
+
+
+def get_type_limits(request):
+    type_limits = {}
+    for k, v in request.params.items():
+        if not k.startswith(TYPE_LIMIT_PREFIX):
+            continue
+        try:
+            limit = int(v)
+        except ValueError:
+            limit = -1
+        if limit < 0:
+            msg = f'{k} must be a non-negative integer.'
+            raise HTTPBadRequest(explanation=msg)
+        type_limits[k[len(TYPE_LIMIT_PREFIX):]] = limit
+    return type_limits
+
+
+def make_top_hits_request(request, types):
+    query_string = QueryString(request)
+    for key in list(request.params):
+        if key.startswith(TYPE_LIMIT_PREFIX):
+            query_string.drop(key)
+    query_string.drop('type')
+    for type_str in types:
+        query_string.append(('type', type_str))
+    top_hits_request = query_string.get_request_with_new_query_string()
+    top_hits_request.registry = request.registry
+    return top_hits_request
+
+
+def set_top_hits_size(body, size):
+    '''
+    Sets the size of every top_hits aggregation in a search body,
+    which may itself be in an aggregation named top_hits.
+    '''
+    if isinstance(body, dict):
+        for k, v in body.items():
+            if k == 'top_hits' and isinstance(v, dict) and 'top_hits' not in v:
+                v['size'] = size
+            else:
+                set_top_hits_size(v, size)
+    elif isinstance(body, list):
+        for v in body:
+            set_top_hits_size(v, size)
+
+
+def build_top_hits_search(request, types):
+    query_builder = TopHitsQueryFactory(
+        params_parser=ParamsParser(
+            make_top_hits_request(request, types)
+        ),
+        default_item_types=TOP_HITS_ITEM_TYPES,
+        reserved_keys=RESERVED_KEYS,
+    )
+    return query_builder.build_query()
+
+
+def make_msearch_body(request, types):
+    '''
+    One top hits search for all the types without a limit.<Type>, like
+    a single top hits search, and one for each type with its own limit.
+    Every search has the timeout that bounds how long it can search.
+    '''
+    timeout_ms = get_top_hits_timeout_ms(request)
+    type_limits = get_type_limits(request)
+    searches = []
+    shared_types = [
+        type_str
+        for type_str in types
+        if type_str not in type_limits
+    ]
+    if shared_types:
+        searches.append((shared_types, None))
+    for type_str in types:
+        if type_str in type_limits:
+            searches.append(([type_str], type_limits[type_str]))
+    lines = []
+    for search_types, size in searches:
+        body = build_top_hits_search(request, search_types).to_dict()
+        if size is not None:
+            set_top_hits_size(body, size)
+        if timeout_ms:
+            body['timeout'] = f'{timeout_ms}ms'
+        lines.extend([{'index': RESOURCES_INDEX}, body])
+    return lines
+
+
+def merge_responses(left, right):
+    '''
+    Merges the aggregations of two search responses: bucket lists
+    are concatenated, counts summed and nested objects merged.
+    '''
+    if not isinstance(left, dict) or not isinstance(right, dict):
+        return left
+    merged = dict(left)
+    for k, v in right.items():
+        if k not in merged:
+            merged[k] = v
+        elif k == 'buckets' and isinstance(v, list):
+            merged[k] = merged[k] + v
+        elif k in SUMMED_FIELDS and isinstance(v, int) and isinstance(merged[k], int):
+            merged[k] = merged[k] + v
+        elif isinstance(v, dict):
+            merged[k] = merge_responses(merged[k], v)
+    return merged
+
+
+def sort_buckets(value):
+    '''
+    Orders merged bucket lists the way a terms aggregation does,
+    by descending doc_count and then key.
+    '''
+    if isinstance(value, dict):
+        for k, v in value.items():
+            if k == 'buckets' and isinstance(v, list):
+                v.sort(key=lambda bucket: (-bucket.get('doc_count', 0), str(bucket.get('key'))))
+            sort_buckets(v)
+    elif isinstance(value, list):
+        for v in value:
+            sort_buckets(v)
+
+
+def format_top_hits_results(results):
+    responses = results.get('responses', [])
+    succeeded = [
+        response
+        for response in responses
+        if 'error' not in response
+    ]
+    formatted = {}
+    for response in succeeded:
+        formatted = merge_responses(
+            formatted,
+            {
+                'hits': {
+                    'total': response.get('hits', {}).get('total', 0),
+                },
+                'aggregations': response.get('aggregations', {}),
+            }
+        )
+    formatted.setdefault('hits', {}).setdefault('total', 0)
+    formatted['hits']['hits'] = []
+    formatted.setdefault('aggregations', {})
+    sort_buckets(formatted['aggregations'])
+    formatted['took'] = results.get('took', 0)
+    formatted['timed_out'] = (
+        len(succeeded) < len(responses) or
+        any(response.get('timed_out') for response in succeeded)
+    )
+    return formatted
+
+
+def make_top_hits_cache_key(request):
+    key = json.dumps(
+        [
+            sorted(request.params.items()),
+            sorted(request.effective_principals),
+        ]
+    )
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def search_top_hits(request):
+    types = get_top_hits_types(request)
+    results = request.registry[ELASTIC_SEARCH].msearch(
+        body=make_msearch_body(request, types)
+    )
+    return format_top_hits_results(results)
+
+
+def get_top_hits(request):
+    '''
+    Results are reused for a few seconds so the same prefix typed by
+    many users costs one msearch. Partial results from a timeout are
+    not reused.
+    '''
+    cache = request.registry.get(TOP_HITS_CACHE)
+    cache_seconds = get_top_hits_cache_seconds(request)
+    if cache is None or cache_seconds <= 0:
+        return search_top_hits(request)
+    key = make_top_hits_cache_key(request)
+    cached = cache.get(key)
+    now = time.monotonic()
+    if cached is not None and now - cached[0] < cache_seconds:
+        return cached[1]
+    results = search_top_hits(request)
+    if not results['timed_out']:
+        cache.set(key, (now, results))
+    return results
+
+
+class MultiSearchTopHitsResponseField(ResponseField):
+    '''
+    Searches the types in one msearch request and merges the
+    responses into the shape of a single top hits search.
+    '''
+
+    def render(self, *args, **kwargs):
+        self.parent = kwargs.get('parent')
+        return get_top_hits(self.get_request())
@@ -0,0 +1,91 @@
+import json
+import zlib
+
+
+ACCEPT_ENCODING = 'Accept-Encoding'
+
+GZIP = 'gzip'
+
+# Rows are joined into chunks of at least this many bytes
+# before being handed to the WSGI server.
+STREAMING_CHUNK_SIZE = 64 * 1024
+
+GZIP_COMPRESS_LEVEL = 6
+
+NDJSON = 'ndjson'
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+
+def coalesce_chunks(rows, chunk_size=STREAMING_CHUNK_SIZE):
+    buffer = []
+    buffered_size = 0
+    for row in rows:
+        buffer.append(row)
+        buffered_size += len(row)
+        if buffered_size >= chunk_size:
+            yield b''.join(buffer)
+            buffer = []
+            buffered_size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzip_chunks(chunks, compress_level=GZIP_COMPRESS_LEVEL):
+    # 16 + MAX_WBITS writes a gzip header and trailer
+    # instead of a raw zlib stream.
+    compressor = zlib.compressobj(
+        compress_level,
+        zlib.DEFLATED,
+        16 + zlib.MAX_WBITS,
+    )
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def client_accepts_gzip(request):
+    # Without an Accept-Encoding header WebOb treats every
+    # encoding as acceptable, so require the client to ask.
+    if ACCEPT_ENCODING not in request.headers:
+        return False
+    return bool(request.accept_encoding.acceptable_offers([GZIP]))
+
+
+def _add_accept_encoding_to_vary(response):
+    vary = response.vary or ()
+    if ACCEPT_ENCODING not in vary:
+        response.vary = tuple(vary) + (ACCEPT_ENCODING,)
+
+
+def set_streaming_app_iter(request, response, rows, chunk_size=STREAMING_CHUNK_SIZE):
+    '''
+    Streams encoded rows in coalesced chunks, gzip compressed
+    when the client accepts it.
+    '''
+    chunks = coalesce_chunks(rows, chunk_size=chunk_size)
+    _add_accept_encoding_to_vary(response)
+    if client_accepts_gzip(request):
+        response.content_encoding = GZIP
+        chunks = gzip_chunks(chunks)
+    response.app_iter = chunks
+    return response
+
+
+def format_ndjson_row(item):
+    return json.dumps(item, separators=(',', ':')).encode('utf-8') + b'\n'
+
+
+def set_ndjson_app_iter(request, response, items, chunk_size=STREAMING_CHUNK_SIZE):
+    '''
+    Streams one compact JSON object per line as items are yielded.
+    '''
+    response.content_type = NDJSON_CONTENT_TYPE
+    return set_streaming_app_iter(
+        request,
+        response,
+        (format_ndjson_row(item) for item in items),
+        chunk_size=chunk_size,
+    )
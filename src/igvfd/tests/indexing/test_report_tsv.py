@@ -122,3 +122,26 @@ def test_multitype_report_download_href(workbook, testapp):
     res = testapp.get('/multireport.tsv?type=Lab&field=href')
     lines = res.text.splitlines()
     assert lines[2] == ''
+
+
+def test_report_download_only_fetches_column_fields(workbook, testapp, mocker):
+    from igvfd.report import search_generator
+    search_generator = mocker.patch('igvfd.report.search_generator', wraps=search_generator)
+    testapp.get('/report.tsv?type=Award&field=contact_pi&field=title')
+    search_request = search_generator.call_args[0][0]
+    assert search_request.params.getall('field') == ['@id', 'contact_pi', 'title']
+
+
+def test_multitype_report_download_fan_out_per_type(workbook, testapp):
+    from igvfd.report import MULTIREPORT_FAN_OUT_MAX_WORKERS_SETTING
+    settings = testapp.app.registry.settings
+    url = '/multireport.tsv?type=File&status=released&field=accession&field=status'
+    serial_lines = testapp.get(url).body.splitlines()
+    settings[MULTIREPORT_FAN_OUT_MAX_WORKERS_SETTING] = '2'
+    try:
+        fan_out_lines = testapp.get(url).body.splitlines()
+    finally:
+        settings.pop(MULTIREPORT_FAN_OUT_MAX_WORKERS_SETTING)
+    assert fan_out_lines[1] == serial_lines[1]
+    assert len(fan_out_lines) > 3
+    assert sorted(fan_out_lines[2:]) == sorted(serial_lines[2:])
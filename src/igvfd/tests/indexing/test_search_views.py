@@ -376,3 +376,116 @@ def test_search_views_multireport_view_values(workbook, testapp):
     assert r.json['notification'] == 'Success'
     assert r.json['filters'][0] == {'field': 'status', 'remove': '/multireport/', 'term': 'released'}
     assert r.json['clear_filters'] == '/multireport/'
+
+
+def test_search_views_search_view_ndjson(workbook, testapp):
+    import json
+    r = testapp.get(
+        '/search/?type=User&format=ndjson'
+    )
+    assert r.headers['content-type'].startswith('application/x-ndjson')
+    items = [json.loads(line) for line in r.body.splitlines()]
+    assert len(items) >= 48
+    assert all('User' in item['@type'] for item in items)
+    r = testapp.get(
+        '/search/?type=User&format=ndjson&limit=5'
+    )
+    assert len(r.body.splitlines()) == 5
+    r = testapp.get(
+        '/search/?type=User&format=ndjson&limit=5',
+        headers={'Accept-Encoding': 'gzip'}
+    )
+    assert r.headers['content-encoding'] == 'gzip'
+
+
+def test_search_views_report_view_ndjson(workbook, testapp):
+    import json
+    columns = testapp.get(
+        '/report/?type=User&limit=0'
+    ).json['columns']
+    r = testapp.get(
+        '/report/?type=User&format=ndjson'
+    )
+    assert r.headers['content-type'].startswith('application/x-ndjson')
+    items = [json.loads(line) for line in r.body.splitlines()]
+    assert len(items) >= 48
+    fields = {column.split('.')[0] for column in columns} | {'@id', '@type'}
+    assert all(set(item) <= fields for item in items)
+    r = testapp.get(
+        '/report/?type=User&format=ndjson&field=title'
+    )
+    items = [json.loads(line) for line in r.body.splitlines()]
+    assert all(set(item) <= {'@id', '@type', 'title'} for item in items)
+    testapp.get(
+        '/report/?type=User&type=Lab&format=ndjson',
+        status=400
+    )
+
+
+def test_search_views_top_hits_raw_view_per_type_limit(workbook, testapp):
+    r = testapp.get(
+        '/top-hits-raw/?query=a&field=@id&type=Award&type=User&limit=3&limit.User=1'
+    )
+    assert r.json['timed_out'] is False
+    buckets = r.json['aggregations']['types']['types']['buckets']
+    assert {bucket['key'] for bucket in buckets} <= {'Award', 'User'}
+    for bucket in buckets:
+        hits = bucket['top_hits']['hits']['hits']
+        assert len(hits) <= (1 if bucket['key'] == 'User' else 3)
+    doc_counts = [bucket['doc_count'] for bucket in buckets]
+    assert doc_counts == sorted(doc_counts, reverse=True)
+    testapp.get(
+        '/top-hits-raw/?query=a&field=@id&limit.User=all',
+        status=400
+    )
+
+
+def test_search_views_search_view_debug_profile(workbook, testapp, anontestapp):
+    r = testapp.get(
+        '/search/?type=MeasurementSet&debug=profile'
+    )
+    profile = r.json['debug']['profile']
+    assert 'CachedSearchWithFacetsResponseField' in profile['fields']
+    assert 'FacetGroupsResponseField' in profile['fields']
+    assert profile['serialization_ms'] >= 0
+    assert 'shards' in profile['opensearch']
+    assert profile['aggregations']
+    anontestapp.get(
+        '/search/?type=MeasurementSet&debug=profile',
+        status=403
+    )
+    anontestapp.get(
+        '/facets/?type=MeasurementSet&debug=profile',
+        status=403
+    )
+
+
+def test_search_views_count_view(workbook, testapp):
+    search = testapp.get('/search/?type=MeasurementSet&status=released&limit=0').json
+    r = testapp.get('/count/?type=MeasurementSet&status=released')
+    assert r.json == {'total': search['total']}
+    assert r.json['total'] > 0
+    assert r.headers['Cache-Control'] == 'max-age=60, private'
+    etag = r.headers['ETag']
+    r = testapp.get(
+        '/count/?type=MeasurementSet&status=released&limit=25',
+        headers={'If-None-Match': etag},
+        status=304
+    )
+    assert not r.body
+    r = testapp.get(
+        '/count/?type=MeasurementSet&status=in+progress',
+        headers={'If-None-Match': etag},
+    )
+    assert r.headers['ETag'] != etag
+
+
+def test_search_views_facets_view(workbook, testapp, anontestapp):
+    search = testapp.get('/search/?type=MeasurementSet').json
+    r = testapp.get('/facets/?type=MeasurementSet')
+    assert set(r.json) == {'facets', 'total'}
+    assert r.json['facets'] == search['facets']
+    assert r.json['total'] == search['total']
+    r = anontestapp.get('/facets/?type=MeasurementSet')
+    assert r.headers['Cache-Control'] == 'max-age=60, public'
+    assert {'Cookie', 'Authorization'} <= set(r.headers['Vary'].split(', '))
@@ -33,3 +33,79 @@ def test_searches_fields_result_columns_response_field_config_field_in_query(wor
     assert len(r.json['result_columns']) < len(r.json['columns'])
     assert '@id' in r.json['result_columns']
     assert 'age' in r.json['result_columns']
+
+
+def test_searches_fields_make_facet_cache():
+    from igvfd.lru import LRUCache
+    from igvfd.searches.fields import make_facet_cache
+    assert isinstance(make_facet_cache({}), LRUCache)
+    assert make_facet_cache({'search.facet_cache_size': '10'}).maxsize == 10
+    assert make_facet_cache({'search.facet_cache_size': '0'}) is None
+
+
+def test_searches_fields_make_facet_cache_key(dummy_request, mocker):
+    from igvfd.searches.fields import make_facet_cache_key
+    generation = mocker.patch(
+        'igvfd.searches.fields.get_index_generation',
+        return_value='10-0',
+    )
+    aggregations = {'status': {'terms': {'field': 'embedded.status'}}}
+    dummy_request.environ['QUERY_STRING'] = 'type=MeasurementSet&status=released&limit=25&field=accession'
+    key = make_facet_cache_key(dummy_request, 'search', aggregations)
+    dummy_request.environ['QUERY_STRING'] = 'status=released&type=MeasurementSet&sort=-date_created&from=25'
+    assert make_facet_cache_key(dummy_request, 'search', aggregations) == key
+    assert make_facet_cache_key(dummy_request, 'report', aggregations) != key
+    assert make_facet_cache_key(dummy_request, 'search', {}) != key
+    dummy_request.environ['QUERY_STRING'] = 'type=MeasurementSet&status=in+progress'
+    assert make_facet_cache_key(dummy_request, 'search', aggregations) != key
+    dummy_request.environ['QUERY_STRING'] = 'type=MeasurementSet&status=released'
+    generation.return_value = '11-0'
+    assert make_facet_cache_key(dummy_request, 'search', aggregations) != key
+
+
+def test_searches_fields_aggregation_results(mocker):
+    from igvfd.searches.fields import AggregationResults
+    results = mocker.Mock()
+    results.to_facets.return_value = [{'field': 'status'}]
+    results.get_total.return_value = 3
+    recording = AggregationResults(results, ['to_facets'])
+    assert recording.to_facets() == [{'field': 'status'}]
+    assert recording.get_total() == 3
+    assert recording.aggregations == {'to_facets': [{'field': 'status'}]}
+    results.to_facets.reset_mock()
+    cached = AggregationResults(results, ['to_facets'], cached=recording.aggregations)
+    facets = cached.to_facets()
+    assert facets == [{'field': 'status'}]
+    facets.append({'field': 'type'})
+    assert cached.to_facets() == [{'field': 'status'}]
+    assert not results.to_facets.called
+    assert cached.aggregations == {}
+
+
+def test_searches_fields_cached_facets_search(workbook, testapp):
+    from igvfd.searches.fields import FACET_CACHE
+    cache = testapp.app.registry[FACET_CACHE]
+    cache.clear()
+    r1 = testapp.get('/search/?type=MeasurementSet&limit=1')
+    assert cache.stats()['misses'] == 1
+    assert cache.stats()['size'] == 1
+    r2 = testapp.get('/search/?type=MeasurementSet&limit=all')
+    assert cache.stats()['hits'] == 1
+    assert r2.json['facets'] == r1.json['facets']
+    assert r2.json['total'] == r1.json['total']
+    assert len(r2.json['@graph']) == r1.json['total']
+    testapp.get('/search/?type=MeasurementSet&status=released')
+    assert cache.stats()['size'] == 2
+
+
+def test_searches_fields_cached_facets_report(workbook, testapp):
+    from igvfd.searches.fields import FACET_CACHE
+    cache = testapp.app.registry[FACET_CACHE]
+    cache.clear()
+    r1 = testapp.get('/report/?type=MeasurementSet&field=accession')
+    r2 = testapp.get('/report/?type=MeasurementSet&field=status')
+    assert cache.stats()['hits'] == 1
+    assert r2.json['facets'] == r1.json['facets']
+    assert r2.json['total'] == r1.json['total']
+    testapp.get('/search/?type=MeasurementSet')
+    assert cache.stats()['hits'] == 1
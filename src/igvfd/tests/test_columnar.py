@@ -0,0 +1,117 @@
+import io
+import pytest
+
+
+def test_columnar_converters():
+    import datetime
+    from igvfd.columnar import to_boolean
+    from igvfd.columnar import to_float64
+    from igvfd.columnar import to_int64
+    from igvfd.columnar import to_string
+    from igvfd.columnar import to_timestamp
+    assert to_string('abc') == 'abc'
+    assert to_string(3) == '3'
+    assert to_string(None) is None
+    assert to_int64(3356650) == 3356650
+    assert to_int64('12') == 12
+    assert to_int64('') is None
+    assert to_float64('0.5') == 0.5
+    assert to_float64(None) is None
+    assert to_boolean('True') is True
+    assert to_boolean('false') is False
+    assert to_boolean('') is None
+    assert to_timestamp('2023-06-07T18:38:57.000000+00:00') == datetime.datetime(
+        2023, 6, 7, 18, 38, 57, tzinfo=datetime.timezone.utc
+    )
+    assert to_timestamp('') is None
+
+
+def test_columnar_get_columnar_format(dummy_request):
+    from igvfd.columnar import get_columnar_format
+    assert get_columnar_format(dummy_request) is None
+    dummy_request.environ['QUERY_STRING'] = 'type=MeasurementSet&format=parquet'
+    assert get_columnar_format(dummy_request) == 'parquet'
+    dummy_request.environ['QUERY_STRING'] = 'type=MeasurementSet&format=arrow'
+    assert get_columnar_format(dummy_request) == 'arrow'
+    dummy_request.environ['QUERY_STRING'] = 'type=MeasurementSet&format=json'
+    assert get_columnar_format(dummy_request) is None
+
+
+def test_columnar_get_content_disposition():
+    from igvfd.columnar import get_content_disposition
+    assert get_content_disposition('parquet', 'metadata') == 'attachment; filename="metadata.parquet"'
+    assert get_content_disposition('arrow', 'files') == 'attachment; filename="files.arrows"'
+
+
+def test_columnar_chunked_sink():
+    from igvfd.columnar import ChunkedSink
+    sink = ChunkedSink()
+    assert sink.write(b'abc') == 3
+    assert sink.write(memoryview(b'de')) == 2
+    assert sink.tell() == 5
+    assert sink.drain() == b'abcde'
+    assert sink.drain() == b''
+    assert sink.tell() == 5
+
+
+def test_columnar_generate_columnar_chunks_parquet():
+    import pyarrow
+    import pyarrow.parquet
+    from igvfd.columnar import generate_columnar_chunks
+    header = ['Accession', 'Size', 'Creation timestamp']
+    column_types = {'Size': 'int64', 'Creation timestamp': 'timestamp'}
+    rows = [
+        ['IGVFDS0001AAAA', 10, '2023-06-07T18:38:57.000000+00:00'],
+        ['IGVFDS0002AAAA', '', ''],
+        ['IGVFDS0003AAAA', 30, '2023-06-08T18:38:57.000000+00:00'],
+    ]
+    chunks = list(generate_columnar_chunks('parquet', header, column_types, iter(rows), batch_size=2))
+    assert len(chunks) >= 2
+    parquet_file = pyarrow.parquet.ParquetFile(io.BytesIO(b''.join(chunks)))
+    assert parquet_file.metadata.num_row_groups == 2
+    table = parquet_file.read()
+    assert table.column_names == header
+    assert table.schema.field('Size').type == pyarrow.int64()
+    assert table.schema.field('Creation timestamp').type == pyarrow.timestamp('us', tz='UTC')
+    assert table.column('Accession').to_pylist() == ['IGVFDS0001AAAA', 'IGVFDS0002AAAA', 'IGVFDS0003AAAA']
+    assert table.column('Size').to_pylist() == [10, None, 30]
+
+
+def test_columnar_generate_columnar_chunks_arrow():
+    import pyarrow
+    import pyarrow.ipc
+    from igvfd.columnar import generate_columnar_chunks
+    rows = [['a', '1'], ['b', '2'], ['c', '']]
+    chunks = generate_columnar_chunks('arrow', ['name', 'count'], {'count': 'int64'}, iter(rows), batch_size=2)
+    table = pyarrow.ipc.open_stream(b''.join(chunks)).read_all()
+    assert table.column('name').to_pylist() == ['a', 'b', 'c']
+    assert table.column('count').to_pylist() == [1, 2, None]
+
+
+def test_columnar_generate_columnar_chunks_no_rows():
+    import pyarrow.parquet
+    from igvfd.columnar import generate_columnar_chunks
+    chunks = generate_columnar_chunks('parquet', ['name'], {}, iter([]))
+    table = pyarrow.parquet.read_table(io.BytesIO(b''.join(chunks)))
+    assert table.num_rows == 0
+    assert table.column_names == ['name']
+
+
+def test_columnar_get_column_types_from_schema():
+    from igvfd.columnar import get_column_types_from_schema
+    schema = {
+        'properties': {
+            'accession': {'type': 'string'},
+            'file_size': {'type': 'integer'},
+            'read_count': {'type': 'number'},
+            'controlled_access': {'type': 'boolean'},
+        }
+    }
+    assert get_column_types_from_schema(
+        schema,
+        ['@id', 'accession', 'file_size', 'read_count', 'controlled_access', 'lab.title']
+    ) == {
+        'file_size': 'int64',
+        'read_count': 'float64',
+        'controlled_access': 'boolean',
+    }
@@ -0,0 +1,103 @@
+def test_embed_group_paths(dummy_request):
+    from igvfd.embed import group_paths
+    uuids, unique_keys = group_paths(
+        dummy_request,
+        [
+            '/in-vitro-systems/PKBSM0000AAAA/',
+            '/human-donors/PKBDO0000AAAA/',
+            '/treatments/bd2b6d4c-8a8a-4f2b-9a3e-2f3a2c6a1d11/',
+            'bd2b6d4c-8a8a-4f2b-9a3e-2f3a2c6a1d12',
+            '/not-a-collection/PKBSM0000AAAA/',
+            '/',
+        ]
+    )
+    assert uuids == {
+        'bd2b6d4c-8a8a-4f2b-9a3e-2f3a2c6a1d11',
+        'bd2b6d4c-8a8a-4f2b-9a3e-2f3a2c6a1d12',
+    }
+    assert unique_keys == {
+        'accession': {'PKBSM0000AAAA', 'PKBDO0000AAAA'},
+    }
+
+
+def test_embed_embed_many(dummy_request, mocker):
+    from igvfd import embed
+    prefetch_items = mocker.patch.object(embed, 'prefetch_items')
+    dummy_request.embed = mocker.Mock(side_effect=lambda path, *args: {'@id': path, 'args': args})
+    assert embed.embed_many(dummy_request, ['/a/'], '@@object') == [
+        {'@id': '/a/', 'args': ('@@object',)},
+    ]
+    assert not prefetch_items.called
+    assert embed.embed_many(dummy_request, iter(['/a/', '/b/'])) == [
+        {'@id': '/a/', 'args': ()},
+        {'@id': '/b/', 'args': ()},
+    ]
+    prefetch_items.assert_called_once_with(dummy_request, ['/a/', '/b/'])
+
+
+def test_embed_embed_many_prefetches_in_chunks(dummy_request, mocker):
+    from igvfd import embed
+    mocker.patch.object(embed, 'PREFETCH_CHUNK_SIZE', 2)
+    prefetched = []
+    embedded = []
+
+    def prefetch_items(request, paths):
+        prefetched.append(paths)
+
+    def request_embed(path, *args):
+        # Each chunk is embedded before the next one is prefetched.
+        embedded.append((len(prefetched), path))
+        return {'@id': path}
+    mocker.patch.object(embed, 'prefetch_items', side_effect=prefetch_items)
+    dummy_request.embed = mocker.Mock(side_effect=request_embed)
+    paths = ['/a/', '/b/', '/c/', '/d/', '/e/']
+    assert embed.embed_many(dummy_request, paths) == [{'@id': path} for path in paths]
+    assert prefetched == [['/a/', '/b/'], ['/c/', '/d/']]
+    assert embedded == [(1, '/a/'), (1, '/b/'), (2, '/c/'), (2, '/d/'), (2, '/e/')]
+
+
+def test_embed_prefetch_items_skips_non_database_datastore(dummy_request, mocker):
+    from igvfd import embed
+    group_paths = mocker.patch.object(embed, 'group_paths')
+    dummy_request.datastore = 'elasticsearch'
+    embed.prefetch_items(dummy_request, ['/a/', '/b/'])
+    assert not group_paths.called
+
+
+def test_embed_request_embed_many(testapp, in_vitro_cell_line, human_donor, dummy_request):
+    from igvfd.embed import embed_many
+    embedded = embed_many(
+        dummy_request,
+        [in_vitro_cell_line['@id'], human_donor['@id']],
+        '@@object?skip_calculated=true'
+    )
+    assert [item['@id'] for item in embedded] == [in_vitro_cell_line['@id'], human_donor['@id']]
+
+
+def test_embed_prefetch_items_avoids_per_item_queries(testapp, dummy_request, threadlocals, conn, tissue, in_vitro_cell_line, human_donor, rodent_donor):
+    from sqlalchemy import event
+    from snovault import CONNECTION
+    from igvfd.embed import prefetch_items
+    items = [tissue, in_vitro_cell_line, human_donor, rodent_donor]
+    paths = [item['@id'] for item in items[:2]] + [item['uuid'] for item in items[2:]]
+    uuids = [item['uuid'] for item in items]
+    statements = []
+
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append(statement)
+
+    event.listen(conn, 'before_cursor_execute', record_statement)
+    try:
+        prefetch_items(dummy_request, paths)
+        # One query for the uuids and one for the accessions.
+        assert len(statements) == 2
+        del statements[:]
+        connection = dummy_request.registry[CONNECTION]
+        for uuid in uuids:
+            assert str(connection.get_by_uuid(uuid).uuid) == uuid
+        for item in items[:2]:
+            assert str(connection.get_by_unique_key('accession', item['accession']).uuid) == item['uuid']
+        assert statements == []
+    finally:
+        event.remove(conn, 'before_cursor_execute', record_statement)
@@ -0,0 +1,32 @@
+def test_lineage_updated_on_sample_and_donor_writes(testapp, dummy_request, tissue, rodent_donor, human_donor):
+    from igvfd.lineage import get_samples_lineage
+    lineage = get_samples_lineage(dummy_request, [tissue['@id'], '/technical-samples/PKBSM0000AAAA/'])
+    assert lineage == {
+        tissue['@id']: [
+            {
+                'donor': rodent_donor['uuid'],
+                'taxa': 'Mus musculus',
+                'sex': rodent_donor.get('gender'),
+            }
+        ]
+    }
+    assert rodent_donor['uuid'] in dummy_request._embedded_uuids
+    testapp.patch_json(tissue['@id'], {'donors': [human_donor['@id']]})
+    lineage = get_samples_lineage(dummy_request, [tissue['uuid']])
+    assert [donor['donor'] for donor in lineage[tissue['uuid']]] == [human_donor['uuid']]
+    testapp.patch_json(human_donor['@id'], {'gender': 'Female'})
+    lineage = get_samples_lineage(dummy_request, [tissue['uuid']])
+    assert lineage[tissue['uuid']][0]['sex'] == 'Female'
+
+
+def test_lineage_get_donors_from_samples(testapp, dummy_request, tissue, rodent_donor):
+    from igvfd.types.file_set import get_donors_from_samples
+    assert get_donors_from_samples(dummy_request, [tissue['@id']]) == [rodent_donor['@id']]
+
+
+def test_lineage_biosample_taxa_and_sex(testapp, tissue, human_donor, rodent_donor):
+    res = testapp.get(tissue['@id'] + '@@object')
+    assert res.json['taxa'] == 'Mus musculus'
+    testapp.patch_json(tissue['@id'], {'donors': [human_donor['@id'], rodent_donor['@id']]})
+    res = testapp.get(tissue['@id'] + '@@object')
+    assert 'taxa' not in res.json
@@ -0,0 +1,52 @@
+import pytest
+
+
+def test_lru_cache_get_and_set():
+    from igvfd.lru import LRUCache
+    cache = LRUCache(maxsize=2)
+    assert cache.get('a') is None
+    assert cache.get('a', 'default') == 'default'
+    cache.set('a', 1)
+    assert cache.get('a') == 1
+    assert 'a' in cache
+    assert len(cache) == 1
+    assert cache.stats() == {'hits': 1, 'misses': 2, 'size': 1, 'maxsize': 2}
+
+
+def test_lru_cache_evicts_least_recently_used():
+    from igvfd.lru import LRUCache
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert 'a' in cache
+    assert 'b' not in cache
+    assert 'c' in cache
+    assert len(cache) == 2
+
+
+def test_lru_cache_get_or_set():
+    from igvfd.lru import LRUCache
+    cache = LRUCache(maxsize=2)
+    calls = []
+
+    def make_value():
+        calls.append(1)
+        return 'value'
+    assert cache.get_or_set('a', make_value) == 'value'
+    assert cache.get_or_set('a', make_value) == 'value'
+    assert len(calls) == 1
+    cache.set('b', None)
+    assert cache.get_or_set('b', make_value) is None
+    assert len(calls) == 1
+
+
+def test_lru_cache_clear():
+    from igvfd.lru import LRUCache
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.get('a')
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.stats() == {'hits': 0, 'misses': 0, 'size': 0, 'maxsize': 2}
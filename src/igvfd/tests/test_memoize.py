@@ -0,0 +1,54 @@
+import pytest
+
+
+@pytest.fixture
+def calculated_property_cache(registry):
+    from igvfd.lru import LRUCache
+    from igvfd.memoize import CALCULATED_PROPERTY_CACHE
+    cache = registry.get(CALCULATED_PROPERTY_CACHE)
+    registry[CALCULATED_PROPERTY_CACHE] = LRUCache(100)
+    yield registry[CALCULATED_PROPERTY_CACHE]
+    registry[CALCULATED_PROPERTY_CACHE] = cache
+
+
+def test_memoize_make_calculated_property_cache():
+    from igvfd.lru import LRUCache
+    from igvfd.memoize import make_calculated_property_cache
+    assert make_calculated_property_cache({}) is None
+    assert make_calculated_property_cache({'calculated_property_cache.size': '0'}) is None
+    cache = make_calculated_property_cache({'calculated_property_cache.size': '10'})
+    assert isinstance(cache, LRUCache)
+    assert cache.maxsize == 10
+
+
+def test_memoize_memoized_calculation_keeps_signature():
+    from igvfd.types.sample import Biosample
+    summary = Biosample.summary
+    assert summary.__name__ == 'summary'
+    assert summary.__code__.co_varnames[:4] == ('self', 'request', 'sample_terms', 'donors')
+
+
+def test_memoize_summary_reused_until_dependency_changes(testapp, tissue, rodent_donor, calculated_property_cache):
+    res = testapp.get(tissue['@id'] + '@@object')
+    assert res.json['summary'] == 'adrenal gland tissue, male, Mus musculus strain1'
+    misses = calculated_property_cache.misses
+    res = testapp.get(tissue['@id'] + '@@object')
+    assert res.json['summary'] == 'adrenal gland tissue, male, Mus musculus strain1'
+    assert calculated_property_cache.hits >= 1
+    assert calculated_property_cache.misses == misses
+    testapp.patch_json(rodent_donor['@id'], {'strain': 'strain2'})
+    res = testapp.get(tissue['@id'] + '@@object')
+    assert res.json['summary'] == 'adrenal gland tissue, male, Mus musculus strain2'
+    testapp.patch_json(tissue['@id'], {'lower_bound_age': 10, 'upper_bound_age': 10, 'age_units': 'month'})
+    res = testapp.get(tissue['@id'] + '@@object')
+    assert res.json['summary'] == 'adrenal gland tissue, male, Mus musculus strain2 (10 months)'
+
+
+def test_memoize_get_sids(testapp, dummy_request, tissue):
+    from igvfd.memoize import get_sids
+    missing = '00000000-0000-0000-0000-000000000000'
+    sids = get_sids(dummy_request, {tissue['uuid'], missing})
+    assert isinstance(sids[tissue['uuid']], int)
+    assert sids[missing] is None
+    testapp.patch_json(tissue['@id'], {'description': 'updated'})
+    assert get_sids(dummy_request, {tissue['uuid']})[tissue['uuid']] > sids[tissue['uuid']]
@@ -231,7 +231,7 @@ def test_metadata_batch_download_build_query_string(dummy_request):
     bd.query_string.deduplicate()
     assert str(bd.query_string) == (
         'type=Experiment&files.file_type=bigWig'
-        '&files.file_type=bam&limit=all&field=files.%40id'
+        '&files.file_type=bam&files.href=%2A&limit=all&field=files.%40id'
         '&field=files.href&field=files.file_format'
         '&field=files.file_format_type&field=files.file_type'
     )
@@ -248,7 +248,7 @@ def test_metadata_batch_download_build_query_string(dummy_request):
         'type=Experiment&files.file_type=bigWig'
         '&files.file_type=bam&files.replicate.library.size_range=50-100'
         '&files.status%21=archived&files.biological_replicates=2'
-        '&limit=all&field=files.%40id&field=files.href'
+        '&files.href=%2A&limit=all&field=files.%40id&field=files.href'
         '&field=files.file_format&field=files.file_format_type'
         '&field=files.href&field=files.file_type&field=files.file_type'
         '&field=files.replicate.library.size_range'
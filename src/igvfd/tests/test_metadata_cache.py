@@ -0,0 +1,82 @@
+import os
+import pytest
+
+
+def test_metadata_cache_export_cache_tee_and_open(tmp_path):
+    from igvfd.metadata.cache import ExportCache
+    cache = ExportCache(str(tmp_path), max_bytes=1024)
+    assert cache.open('abc') is None
+    assert list(cache.tee('abc', iter([b'a\tb\n', b'c\td\n']))) == [b'a\tb\n', b'c\td\n']
+    cached_file = cache.open('abc')
+    assert cached_file is not None
+    assert b''.join(cache.iter_file(cached_file, chunk_size=3)) == b'a\tb\nc\td\n'
+    assert cached_file.closed
+    assert [p.name for p in tmp_path.iterdir()] == ['abc.cache']
+
+
+def test_metadata_cache_export_cache_tee_closed_early_is_not_cached(tmp_path):
+    from igvfd.metadata.cache import ExportCache
+    cache = ExportCache(str(tmp_path), max_bytes=1024)
+    chunks = cache.tee('abc', iter([b'a\tb\n', b'c\td\n']))
+    assert next(chunks) == b'a\tb\n'
+    chunks.close()
+    assert cache.open('abc') is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_metadata_cache_export_cache_tee_too_large_is_not_cached(tmp_path):
+    from igvfd.metadata.cache import ExportCache
+    cache = ExportCache(str(tmp_path), max_bytes=5)
+    assert list(cache.tee('abc', iter([b'a\tb\n', b'c\td\n']))) == [b'a\tb\n', b'c\td\n']
+    assert cache.open('abc') is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_metadata_cache_export_cache_evicts_least_recently_used(tmp_path):
+    from igvfd.metadata.cache import ExportCache
+    cache = ExportCache(str(tmp_path), max_bytes=10)
+    list(cache.tee('first', iter([b'1234'])))
+    os.utime(tmp_path / 'first.cache', (1, 1))
+    list(cache.tee('second', iter([b'5678'])))
+    os.utime(tmp_path / 'second.cache', (2, 2))
+    cache.open('first').close()
+    list(cache.tee('third', iter([b'9012'])))
+    assert cache.open('second') is None
+    assert cache.open('first') is not None
+    assert cache.open('third') is not None
+
+
+def test_metadata_cache_make_export_cache(tmp_path):
+    from igvfd.metadata.cache import ExportCache
+    from igvfd.metadata.cache import make_export_cache
+    assert make_export_cache({}, 'metadata.cache_dir', 'metadata.cache_max_bytes', '1GB') is None
+    cache = make_export_cache(
+        {
+            'metadata.cache_dir': str(tmp_path / 'exports'),
+            'metadata.cache_max_bytes': '2MB',
+        },
+        'metadata.cache_dir',
+        'metadata.cache_max_bytes',
+        '1GB',
+    )
+    assert isinstance(cache, ExportCache)
+    assert cache.max_bytes == 2000000
+    assert (tmp_path / 'exports').is_dir()
+
+
+def test_metadata_cache_make_export_cache_key(dummy_request, mocker):
+    from igvfd.metadata.cache import make_export_cache_key
+    mocker.patch('igvfd.metadata.cache.get_index_generation', return_value='10-0')
+    dummy_request.environ['QUERY_STRING'] = 'type=MeasurementSet&files.file_format=bam'
+    key = make_export_cache_key(dummy_request, [], None)
+    assert len(key) == 64
+    assert key == make_export_cache_key(dummy_request, [], None)
+    assert key != make_export_cache_key(dummy_request, ['/measurement-sets/IGVFDS0001AAAA/'], None)
+    assert key != make_export_cache_key(dummy_request, [], 'gzip')
+    dummy_request.environ['QUERY_STRING'] = 'files.file_format=bam&type=MeasurementSet'
+    assert key == make_export_cache_key(dummy_request, [], None)
+    mocker.patch('igvfd.metadata.cache.get_index_generation', return_value='11-0')
+    assert key != make_export_cache_key(dummy_request, [], None)
+    key = make_export_cache_key(dummy_request, [], None)
+    dummy_request.environ['HTTP_HOST'] = 'other.example.org'
+    assert key != make_export_cache_key(dummy_request, [], None)
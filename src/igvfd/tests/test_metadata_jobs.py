@@ -0,0 +1,260 @@
+import pytest
+
+
+def test_metadata_jobs_local_job_store_save_and_load(tmp_path):
+    from igvfd.metadata.jobs import LocalJobStore
+    store = LocalJobStore(str(tmp_path / 'jobs'))
+    assert store.load('abc') is None
+    store.save({'job_id': 'abc', 'status': 'queued'})
+    assert store.load('abc') == {'job_id': 'abc', 'status': 'queued'}
+    store.save({'job_id': 'abc', 'status': 'running'})
+    assert store.load('abc') == {'job_id': 'abc', 'status': 'running'}
+    assert sorted(p.name for p in (tmp_path / 'jobs').iterdir()) == ['abc.json', 'queue']
+
+
+def test_metadata_jobs_local_job_store_queue(tmp_path):
+    import os
+    from igvfd.metadata.jobs import LocalJobStore
+    store = LocalJobStore(str(tmp_path))
+    assert store.get_queued_job_ids() == []
+    store.enqueue({'job_id': 'abc', 'status': 'queued'})
+    store.enqueue({'job_id': 'def', 'status': 'queued'})
+    os.utime(tmp_path / 'queue' / 'abc', (0, 0))
+    assert store.get_queued_job_ids() == ['abc', 'def']
+    assert store.load('def') == {'job_id': 'def', 'status': 'queued'}
+    store.dequeue('abc')
+    store.dequeue('abc')
+    assert store.get_queued_job_ids() == ['def']
+
+
+def test_metadata_jobs_local_job_store_store_output_and_download(dummy_request, tmp_path):
+    import io
+    from igvfd.metadata.jobs import LocalJobStore
+    store = LocalJobStore(str(tmp_path))
+    store.store_output('abc', 'tsv', io.BytesIO(b'a\tb\n1\t2\n'))
+    response = store.get_download_response(
+        dummy_request,
+        {
+            'job_id': 'abc',
+            'extension': 'tsv',
+            'content_type': 'text/tsv',
+            'filename': 'metadata.tsv',
+        }
+    )
+    assert response.content_type == 'text/tsv'
+    assert response.content_disposition == 'attachment; filename="metadata.tsv"'
+    assert b''.join(response.app_iter) == b'a\tb\n1\t2\n'
+
+
+def test_metadata_jobs_make_job_store(tmp_path):
+    from igvfd.metadata.jobs import LocalJobStore
+    from igvfd.metadata.jobs import make_job_store
+    assert make_job_store({}) is None
+    store = make_job_store({'metadata.jobs_dir': str(tmp_path)})
+    assert isinstance(store, LocalJobStore)
+    assert store.directory == str(tmp_path)
+
+
+def test_metadata_jobs_make_job(dummy_request):
+    from igvfd.metadata.jobs import make_job
+    dummy_request.environ['QUERY_STRING'] = 'type=MeasurementSet'
+    job = make_job(dummy_request)
+    assert job['status'] == 'queued'
+    assert job['@id'] == f'/metadata/jobs/{job["job_id"]}/'
+    assert job['query_string'] == 'type=MeasurementSet'
+    assert job['extension'] == 'tsv'
+    assert job['content_type'] == 'text/tsv'
+    assert job['filename'] == 'metadata.tsv'
+    assert job['bytes_written'] == 0
+    assert job['rows_written'] == 0
+    assert job['remote_user'] is None
+    assert job['host_url'] == dummy_request.host_url
+    assert job['body'] is None
+    dummy_request.environ['QUERY_STRING'] = 'type=MeasurementSet&format=parquet'
+    job = make_job(dummy_request)
+    assert job['extension'] == 'parquet'
+    assert job['content_type'] == 'application/vnd.apache.parquet'
+    assert job['filename'] == 'metadata.parquet'
+
+
+def test_metadata_jobs_get_remote_user(dummy_request, mocker):
+    from igvfd.metadata.jobs import get_remote_user
+    assert get_remote_user(dummy_request) is None
+    mocker.patch.object(
+        type(dummy_request),
+        'authenticated_userid',
+        new_callable=mocker.PropertyMock,
+        return_value='auth0.someone@example.org',
+    )
+    mocker.patch.object(
+        type(dummy_request),
+        'effective_principals',
+        new_callable=mocker.PropertyMock,
+        return_value=['system.Everyone', 'system.Authenticated', 'userid.abc', 'group.admin'],
+    )
+    assert get_remote_user(dummy_request) == 'abc'
+    type(dummy_request).authenticated_userid.return_value = 'remoteuser.TEST'
+    assert get_remote_user(dummy_request) == 'TEST'
+
+
+def test_metadata_jobs_make_export_request():
+    from igvfd.metadata.jobs import make_export_request
+    job = {
+        'query_string': 'type=MeasurementSet',
+        'remote_user': None,
+        'host_url': 'https://data.pankbase.org',
+        'body': None,
+    }
+    request = make_export_request(job)
+    assert request.method == 'GET'
+    assert request.path_info == '/metadata/'
+    assert request.query_string == 'type=MeasurementSet'
+    assert request.host_url == 'https://data.pankbase.org'
+    assert 'REMOTE_USER' not in request.environ
+    job['remote_user'] = 'abc'
+    job['body'] = '{"elements": ["/measurement-sets/PKBDS0000AAAA/"]}'
+    request = make_export_request(job)
+    assert request.method == 'POST'
+    assert request.environ['REMOTE_USER'] == 'abc'
+    assert request.json == {'elements': ['/measurement-sets/PKBDS0000AAAA/']}
+
+
+def test_metadata_jobs_write_export_to_file(mocker):
+    import io
+    from igvfd.metadata.jobs import write_export_to_file
+    mocker.patch('igvfd.metadata.jobs.PROGRESS_INTERVAL_BYTES', 8)
+    store = mocker.Mock()
+    job = {'extension': 'tsv', 'bytes_written': 0, 'rows_written': 0}
+    output_file = io.BytesIO()
+    write_export_to_file(job, store, iter([b'a\tb\n', b'1\t2\n3\t4\n']), output_file)
+    assert output_file.getvalue() == b'a\tb\n1\t2\n3\t4\n'
+    assert job['bytes_written'] == 12
+    assert job['rows_written'] == 2
+    assert store.save.call_count == 1
+    job = {'extension': 'parquet', 'bytes_written': 0, 'rows_written': 0}
+    write_export_to_file(job, store, iter([b'PAR1\n']), io.BytesIO())
+    assert job['bytes_written'] == 5
+    assert job['rows_written'] == 0
+
+
+def make_test_job(**fields):
+    job = {
+        '@id': '/metadata/jobs/abc/',
+        'job_id': 'abc',
+        'status': 'queued',
+        'query_string': 'type=MeasurementSet',
+        'remote_user': None,
+        'host_url': 'http://localhost',
+        'body': None,
+        'extension': 'tsv',
+        'bytes_written': 0,
+        'rows_written': 0,
+    }
+    job.update(fields)
+    return job
+
+
+def test_metadata_jobs_run_export_job(mocker, tmp_path):
+    from pyramid.response import Response
+    from igvfd.metadata.jobs import LocalJobStore
+    from igvfd.metadata.jobs import run_export_job
+    store = LocalJobStore(str(tmp_path))
+    job = make_test_job(bytes_written=3, rows_written=1)
+    app = mocker.Mock(wraps=Response(app_iter=iter([b'a\tb\n', b'1\t2\n'])))
+    run_export_job(job, store, app)
+    environ = app.call_args[0][0]
+    assert environ['PATH_INFO'] == '/metadata/'
+    assert environ['QUERY_STRING'] == 'type=MeasurementSet'
+    saved_job = store.load('abc')
+    assert saved_job['status'] == 'completed'
+    assert saved_job['href'] == '/metadata/jobs/abc/@@download'
+    assert saved_job['rows_written'] == 1
+    assert saved_job['bytes_written'] == 8
+    assert (tmp_path / 'abc.tsv').read_bytes() == b'a\tb\n1\t2\n'
+
+
+def test_metadata_jobs_run_export_job_failed(tmp_path):
+    from pyramid.response import Response
+    from igvfd.metadata.jobs import LocalJobStore
+    from igvfd.metadata.jobs import run_export_job
+    store = LocalJobStore(str(tmp_path))
+    run_export_job(make_test_job(), store, Response(status=400))
+    saved_job = store.load('abc')
+    assert saved_job['status'] == 'failed'
+    assert saved_job['error'] == 'Export request returned 400 Bad Request'
+    assert 'href' not in saved_job
+    assert not (tmp_path / 'abc.tsv').exists()
+
+
+def test_metadata_jobs_run_queued_jobs(mocker, tmp_path):
+    from igvfd.metadata.jobs import LocalJobStore
+    from igvfd.metadata.jobs import run_queued_jobs
+    run_export_job = mocker.patch('igvfd.metadata.jobs.run_export_job')
+    store = LocalJobStore(str(tmp_path))
+    store.enqueue(make_test_job(job_id='queued'))
+    store.enqueue(make_test_job(job_id='running', status='running'))
+    store.enqueue(make_test_job(job_id='completed', status='completed'))
+    store.enqueue(make_test_job(job_id='deleted'))
+    (tmp_path / 'deleted.json').unlink()
+    app = object()
+    run_queued_jobs(app, store)
+    assert sorted(call[0][0]['job_id'] for call in run_export_job.call_args_list) == ['queued', 'running']
+    assert all(call[0][1:] == (store, app) for call in run_export_job.call_args_list)
+    assert store.get_queued_job_ids() == []
+
+
+def test_metadata_jobs_create_metadata_job_queues_job(testapp, registry, tmp_path):
+    from igvfd.metadata.constants import METADATA_JOB_STORE
+    from igvfd.metadata.jobs import LocalJobStore
+    store = LocalJobStore(str(tmp_path))
+    original_store = registry.get(METADATA_JOB_STORE)
+    registry[METADATA_JOB_STORE] = store
+    try:
+        res = testapp.post_json(
+            '/metadata/jobs/?type=MeasurementSet',
+            {'elements': ['/measurement-sets/PKBDS0000AAAA/']},
+            status=202,
+        )
+    finally:
+        registry[METADATA_JOB_STORE] = original_store
+    assert res.json['status'] == 'queued'
+    assert 'remote_user' not in res.json
+    assert store.get_queued_job_ids() == [res.json['job_id']]
+    job = store.load(res.json['job_id'])
+    assert job['remote_user'] == 'TEST'
+    assert job['body'] == '{"elements": ["/measurement-sets/PKBDS0000AAAA/"]}'
+
+
+def test_metadata_jobs_s3_job_store(aws_credentials):
+    import boto3
+    import io
+    from moto import mock_s3
+    from igvfd.metadata.jobs import S3JobStore
+    with mock_s3():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket='metadata-jobs-bucket')
+        store = S3JobStore('metadata-jobs-bucket', client)
+        assert store.load('abc') is None
+        store.save({'job_id': 'abc', 'status': 'queued'})
+        assert store.load('abc') == {'job_id': 'abc', 'status': 'queued'}
+        assert store.get_queued_job_ids() == []
+        store.enqueue({'job_id': 'def', 'status': 'queued'})
+        assert store.get_queued_job_ids() == ['def']
+        store.dequeue('def')
+        assert store.get_queued_job_ids() == []
+        store.store_output('abc', 'tsv', io.BytesIO(b'a\tb\n'))
+        result = client.get_object(Bucket='metadata-jobs-bucket', Key='metadata-jobs/abc.tsv')
+        assert result['Body'].read() == b'a\tb\n'
+        response = store.get_download_response(
+            None,
+            {'job_id': 'abc', 'extension': 'tsv', 'filename': 'metadata.tsv'}
+        )
+        assert response.status_code == 307
+        assert 'metadata-jobs/abc.tsv' in response.location
+
+
+def test_metadata_jobs_format_job():
+    from igvfd.metadata.jobs import format_job
+    assert format_job(
+        {'job_id': 'abc', 'userid': 'xyz', 'remote_user': 'xyz', 'host_url': 'http://localhost', 'body': None}
+    ) == {'job_id': 'abc'}
@@ -380,8 +380,17 @@ def audits_():
     }
 
 
+def file_matches_file_params(file_, positive_file_param_set):
+    from igvfd.metadata.metadata import compile_file_filter
+    return compile_file_filter(positive_file_param_set, {})(file_)
+
+
+def file_satisfies_inequality_constraints(file_, positive_file_inequalities):
+    from igvfd.metadata.metadata import compile_file_filter
+    return compile_file_filter({}, positive_file_inequalities)(file_)
+
+
 def test_metadata_file_matches_file_params():
-    from igvfd.metadata.metadata import file_matches_file_params
     file_param_list = {}
     assert file_matches_file_params(file_(), file_param_list)
     file_param_list = {'assembly': set(['GRCh38'])}
@@ -516,7 +525,6 @@ def test_metadata_some_value_satisfies_inequalities():
 
 
 def test_metadata_file_satisfies_inequality_constraints():
-    from igvfd.metadata.metadata import file_satisfies_inequality_constraints
     from igvfd.metadata.inequalities import map_param_values_to_inequalities
     positive_file_inequalities = {
         'file_size':  map_param_values_to_inequalities(['gt:500'])
@@ -551,6 +559,61 @@ def test_metadata_file_satisfies_inequality_constraints():
     assert not file_satisfies_inequality_constraints(file_(), positive_file_inequalities)
 
 
+def test_metadata_compile_file_filter():
+    from igvfd.metadata.metadata import compile_file_filter
+    from igvfd.metadata.inequalities import map_param_values_to_inequalities
+    file_size_in_range = {
+        'file_size': map_param_values_to_inequalities(['gt:500', 'gte:3356650', 'lt: 8356650'])
+    }
+    file_size_too_small = {
+        'file_size': map_param_values_to_inequalities(['gt:3356650'])
+    }
+    missing_field_inequality = {
+        'missing_field': map_param_values_to_inequalities(['gt:500'])
+    }
+    concentration_in_range = {
+        'replicate.rbns_protein_concentration': map_param_values_to_inequalities(['gt:10', 'lt:30'])
+    }
+    assert compile_file_filter({}, {})(file_())
+    assert compile_file_filter({'assembly': set(['GRCh38'])}, file_size_in_range)(file_())
+    assert compile_file_filter({'assembly': set(['*'])}, concentration_in_range)(file_())
+    assert compile_file_filter(
+        {
+            'derived_from': set(['/files/ENCFF895UWM/', '/files/ENCFFABC123/']),
+            'biological_replicates': set([2]),
+            'no_file_available': set([False]),
+        },
+        {
+            **file_size_in_range,
+            **concentration_in_range,
+        }
+    )(file_())
+    # Params match but an inequality doesn't.
+    assert not compile_file_filter({'assembly': set(['GRCh38'])}, file_size_too_small)(file_())
+    assert not compile_file_filter({'assembly': set(['GRCh38'])}, missing_field_inequality)(file_())
+    assert not compile_file_filter(
+        {'assembly': set(['GRCh38'])},
+        {
+            **file_size_in_range,
+            **missing_field_inequality,
+        }
+    )(file_())
+    # Inequalities hold but a param doesn't match.
+    assert not compile_file_filter({'assembly': set(['hg19'])}, file_size_in_range)(file_())
+    assert not compile_file_filter({'restricted': set([True])}, file_size_in_range)(file_())
+    assert not compile_file_filter({'no_such_thing': set(['*'])}, concentration_in_range)(file_())
+    assert not compile_file_filter({'assembly': set(['hg19'])}, file_size_too_small)(file_())
+    assert compile_file_filter({'nested.list': set(['b'])}, {})(abstract_file())
+    assert not compile_file_filter({'nested.list': set(['b'])}, missing_field_inequality)(abstract_file())
+    # The same filter is reused for every file of a report.
+    file_filter = compile_file_filter({'file_format': set(['bed'])}, file_size_in_range)
+    small_file = file_()
+    small_file['file_size'] = 100
+    bam_file = file_()
+    bam_file['file_format'] = 'bam'
+    assert [file_filter(f) for f in [file_(), small_file, bam_file, file_()]] == [True, False, False, True]
+
+
 def test_metadata_group_audits_by_files_and_type():
     from igvfd.metadata.metadata import group_audits_by_files_and_type
     grouped_file_audits, grouped_other_audits = group_audits_by_files_and_type(audits_())
@@ -908,11 +971,25 @@ def test_metadata_metadata_report_build_query_string(dummy_request):
         'type=MeasurementSet&files.file_type=bigWig'
         '&files.file_type=bam&replicates.library.size_range=50-100'
         '&files.status%21=archived&files.biological_replicates=2'
-        '&field=audit&field=files.%40id&field=files.href&field=files.file_format'
+        '&files.href=%2A&field=audit&field=files.%40id&field=files.href&field=files.file_format'
         '&field=files.file_format_type&field=files.status&limit=all'
     )
 
 
+def test_metadata_metadata_report_get_file_filter_params(dummy_request):
+    from igvfd.metadata.metadata import MetadataReport
+    dummy_request.environ['QUERY_STRING'] = (
+        'type=MeasurementSet&files.file_type=bigWig'
+    )
+    mr = MetadataReport(dummy_request)
+    assert mr._get_file_filter_params() == [('files.href', '*')]
+    dummy_request.environ['QUERY_STRING'] = (
+        'type=MeasurementSet&files.href=/files/ENCFF000AAA/@@download/ENCFF000AAA.bed.gz'
+    )
+    mr = MetadataReport(dummy_request)
+    assert mr._get_file_filter_params() == []
+
+
 def test_metadata_metadata_report_get_search_path(dummy_request):
     from igvfd.metadata.metadata import MetadataReport
     dummy_request.environ['QUERY_STRING'] = (
@@ -982,7 +1059,7 @@ def test_metadata_metadata_report_build_new_request(dummy_request):
     assert str(new_request.query_string) == (
         'type=MeasurementSet&files.file_type=bigWig&files.file_type=bam&replicates.library.size_range=50-100'
         '&files.status%21=archived&files.biological_replicates=2&files.derived_from=%2Fexperiments%2FENCSR123ABC%2F'
-        '&files.replicate.library=%2A&field=audit&field=files.%40id&field=files.href&field=files.file_format'
+        '&files.replicate.library=%2A&files.href=%2A&field=audit&field=files.%40id&field=files.href&field=files.file_format'
         '&field=files.file_format_type&field=files.status&limit=all&field=files.accession&field=files.content_type'
         '&field=accession&field=assay_term.term_name&field=donors.accession&field=samples.accession&field=creation_timestamp'
         '&field=files.file_size&field=lab.title&field=files.file_type&field=files.biological_replicates'
@@ -108,3 +108,87 @@ def test_metadata_search_batched_search_generator_build_new_request(dummy_reques
     )
     assert request.path_info == '/search/'
     assert request.registry
+
+
+def test_metadata_search_batched_search_generator_get_effective_prefetch_depth(dummy_request):
+    from igvfd.metadata.search import BatchedSearchGenerator
+    dummy_request.environ['QUERY_STRING'] = (
+        'type=Experiment&@id=/files/ENCFFABC123/'
+        '&@id=/files/ENCFFABC345/&@id=/files/ENCFFABC567/'
+        '&@id=/files/ENCFFABC789/&@id=/files/ENCFFDEF123/'
+        '&@id=/files/ENCFFDEF345/&@id=/files/ENCFFDEF567/'
+    )
+    bsg = BatchedSearchGenerator(dummy_request, batch_size=2)
+    assert bsg._get_effective_prefetch_depth() == 0
+    assert not bsg._should_prefetch()
+    bsg = BatchedSearchGenerator(dummy_request, batch_size=2, prefetch_depth=3)
+    assert bsg._get_effective_prefetch_depth() == 3
+    assert bsg._should_prefetch()
+    bsg = BatchedSearchGenerator(dummy_request, batch_size=2, prefetch_depth=10)
+    assert bsg._get_effective_prefetch_depth() == 4
+    bsg = BatchedSearchGenerator(dummy_request, batch_size=2, prefetch_depth=3, max_prefetched_results=4)
+    assert bsg._get_effective_prefetch_depth() == 2
+    bsg = BatchedSearchGenerator(dummy_request, batch_size=2, prefetch_depth=3, max_prefetched_results=3)
+    assert bsg._get_effective_prefetch_depth() == 1
+    assert not bsg._should_prefetch()
+
+
+def test_metadata_search_batched_search_generator_prefetched_results_preserve_order(dummy_request, mocker):
+    from igvfd.metadata.search import BatchedSearchGenerator
+    dummy_request.environ['QUERY_STRING'] = (
+        'type=Experiment&@id=/files/ENCFFABC123/'
+        '&@id=/files/ENCFFABC345/&@id=/files/ENCFFABC567/'
+        '&@id=/files/ENCFFABC789/&@id=/files/ENCFFDEF123/'
+        '&@id=/files/ENCFFDEF345/&@id=/files/ENCFFDEF567/'
+    )
+
+    def fake_search_generator(request):
+        return {
+            '@graph': (
+                {'@id': at_id}
+                for at_id in request.params.getall('@id')
+            )
+        }
+
+    mocker.patch(
+        'igvfd.metadata.search.search_generator',
+        side_effect=fake_search_generator,
+    )
+    serial = list(BatchedSearchGenerator(dummy_request, batch_size=2).results())
+    prefetched = list(
+        BatchedSearchGenerator(dummy_request, batch_size=2, prefetch_depth=3).results()
+    )
+    assert serial == prefetched
+    assert [r['@id'] for r in prefetched] == [
+        '/files/ENCFFABC123/',
+        '/files/ENCFFABC345/',
+        '/files/ENCFFABC567/',
+        '/files/ENCFFABC789/',
+        '/files/ENCFFDEF123/',
+        '/files/ENCFFDEF345/',
+        '/files/ENCFFDEF567/',
+    ]
+
+
+def test_metadata_search_batched_search_generator_search_uses_cursor_when_page_size_set(dummy_request, mocker):
+    from igvfd.metadata.search import BatchedSearchGenerator
+    dummy_request.environ['QUERY_STRING'] = (
+        'type=Experiment&@id=/files/ENCFFABC123/'
+    )
+    search_generator = mocker.patch(
+        'igvfd.metadata.search.search_generator',
+        return_value={'@graph': iter([{'@id': '/files/ENCFFABC123/'}])},
+    )
+    cursor_search_generator = mocker.patch(
+        'igvfd.metadata.search.cursor_search_generator',
+        return_value={'@graph': iter([{'@id': '/files/ENCFFABC123/'}])},
+    )
+    bsg = BatchedSearchGenerator(dummy_request)
+    assert list(bsg.results()) == [{'@id': '/files/ENCFFABC123/'}]
+    assert search_generator.call_count == 1
+    assert cursor_search_generator.call_count == 0
+    bsg = BatchedSearchGenerator(dummy_request, cursor_page_size=100)
+    assert list(bsg.results()) == [{'@id': '/files/ENCFFABC123/'}]
+    assert search_generator.call_count == 1
+    assert cursor_search_generator.call_count == 1
+    assert cursor_search_generator.call_args[1] == {'page_size': 100}
@@ -186,3 +186,52 @@ def test_map_strings_to_booleans_and_ints():
     ]
     assert map_strings_to_booleans_and_ints(['3356650', '*']) == [3356650, '*']
     assert map_strings_to_booleans_and_ints(['20', 'nM']) == [20, 'nM']
+
+
+def test_metadata_serializers_compile_path():
+    from igvfd.metadata.serializers import compile_path
+    assert compile_path('assembly')(file_()) == ['GRCh38']
+    assert compile_path('lab.title')(file_()) == ['ENCODE Processing Pipeline']
+    assert compile_path('protein_tags.target')(experiment()) == [
+        '/targets/STAG1-human/',
+        '/targets/STAG2-human/'
+    ]
+    assert compile_path('dbxrefs')(file_()) == []
+    assert compile_path('missing.field')(file_()) == []
+
+
+def test_metadata_serializers_compile_experiment_cell():
+    from igvfd.metadata.serializers import compile_experiment_cell
+    from igvfd.metadata.serializers import make_experiment_cell
+    make_cell = compile_experiment_cell(('protein_tags.location',))
+    assert make_cell(experiment()) == 'C-terminal'
+    assert compile_experiment_cell(('protein_tags.location',)) is make_cell
+    assert make_experiment_cell(['protein_tags.location'], experiment()) == make_cell(experiment())
+    assert compile_experiment_cell(('assay_title', 'assembly'))(experiment()) == 'TF ChIP-seq GRCh38'
+
+
+def test_metadata_serializers_compile_file_cell():
+    from igvfd.metadata.serializers import compile_file_cell
+    assert compile_file_cell(('biological_replicates',))(file_()) == '2'
+    assert compile_file_cell(('lab.title',))(file_()) == 'ENCODE Processing Pipeline'
+    assert compile_file_cell(('file_format', 'file_format_type'))(file_()) == 'bed idr_ranked_peak'
+
+
+def test_metadata_serializers_compile_column_to_fields_mapping():
+    from igvfd.metadata.serializers import compile_column_to_fields_mapping
+    from igvfd.metadata.serializers import compile_file_cell
+    compiled = compile_column_to_fields_mapping(
+        {
+            'File format': ['file_format'],
+            'Lab': ['lab.title'],
+        },
+        compile_file_cell,
+    )
+    assert list(compiled.keys()) == ['File format', 'Lab']
+    assert {
+        column: make_cell(file_())
+        for column, make_cell in compiled.items()
+    } == {
+        'File format': 'bed',
+        'Lab': 'ENCODE Processing Pipeline',
+    }
@@ -184,3 +184,46 @@ def test_ontology_get_connection_to_reference_database():
     # Clean up.
     os.remove(filename)
     assert not os.path.isfile(filename)
+
+
+def test_ontology_make_ontology_cache():
+    from igvfd.lru import LRUCache
+    from igvfd.ontology import make_ontology_cache
+    assert isinstance(make_ontology_cache({}), LRUCache)
+    assert make_ontology_cache({'ontology.cache_size': '5'}).maxsize == 5
+    assert make_ontology_cache({'ontology.cache_size': '0'}) is None
+
+
+def test_ontology_get_ontology_term(tmp_path):
+    from igvfd.lru import LRUCache
+    from igvfd.ontology import ONTOLOGY
+    from igvfd.ontology import ONTOLOGY_CACHE
+    from igvfd.ontology import get_ontology_term
+    from igvfd.ontology import write_data_to_reference_database
+    from igvfd.ontology import get_connection_to_reference_database
+    data = {
+        'UBERON:0002369': {'organs': ['adrenal gland'], 'synonyms': ['glandula suprarenalis']},
+    }
+    filename = str(tmp_path / 'test.sqlite')
+    tablename = 'testdata'
+    write_data_to_reference_database(
+        data,
+        tablename,
+        filename=filename,
+    )
+    registry = {
+        ONTOLOGY: get_connection_to_reference_database(
+            tablename,
+            filename=filename,
+        ),
+        ONTOLOGY_CACHE: None,
+    }
+    assert get_ontology_term(registry, 'UBERON:0002369') == data['UBERON:0002369']
+    assert get_ontology_term(registry, 'UBERON:0000000') is None
+    cache = registry[ONTOLOGY_CACHE] = LRUCache(10)
+    assert get_ontology_term(registry, 'UBERON:0002369') == data['UBERON:0002369']
+    assert get_ontology_term(registry, 'UBERON:0002369') == data['UBERON:0002369']
+    assert get_ontology_term(registry, 'UBERON:0000000') is None
+    assert get_ontology_term(registry, 'UBERON:0000000') is None
+    assert cache.stats() == {'hits': 2, 'misses': 2, 'size': 2, 'maxsize': 10}
+    registry[ONTOLOGY].close()
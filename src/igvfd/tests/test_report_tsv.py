@@ -26,3 +26,106 @@ def test_convert_camel_to_snake_with_one_words():
 def test_batch_download_lookup_column_value(lookup_column_value_item, lookup_column_value_validate):
     for path in lookup_column_value_validate.keys():
         assert lookup_column_value_validate[path] == lookup_column_value(lookup_column_value_item, path)
+
+
+def test_report_compile_column_lookup(lookup_column_value_item, lookup_column_value_validate):
+    from igvfd.report import compile_column_lookup
+    for path in lookup_column_value_validate.keys():
+        assert lookup_column_value_validate[path] == compile_column_lookup(path)(lookup_column_value_item)
+    item = {
+        'tags': ['a', 'b', 'a'],
+        'samples': [{'@id': '/samples/1/'}, {'@id': '/samples/2/'}, {'@id': '/samples/1/'}],
+        'files': [{'status': 'released'}, {'status': 'released'}, {'status': 'revoked'}],
+        'size': 10,
+    }
+    assert compile_column_lookup('tags')(item) == 'a,b'
+    assert compile_column_lookup('samples')(item) == '/samples/1/,/samples/2/'
+    assert compile_column_lookup('files.status')(item) == 'released,revoked'
+    assert compile_column_lookup('size')(item) == '10'
+    assert compile_column_lookup('files.missing')(item) == ''
+
+
+def test_report_compile_row_encoder():
+    from igvfd.report import compile_row_encoder
+    item = {
+        '@id': '/documents/1/',
+        'title': ' some \t title ',
+        'href': '/files/1/@@download/1.bam',
+        'attachment': {'href': '@@download/attachment/1.pdf', 'type': 'application/pdf'},
+        'files': [{'href': '/files/2/a.bam'}, {'href': '/files/3/b.bam'}],
+    }
+    columns = ['@id', 'title', 'href', 'attachment', 'attachment.href', 'files.href']
+    assert compile_row_encoder(columns)(item) == format_row(
+        [lookup_column_value(item, path) for path in columns]
+    )
+    encode_row = compile_row_encoder(
+        columns,
+        host_url='https://pankbase.org',
+        href_columns=['href', 'attachment', 'attachment.href', 'files.href'],
+    )
+    assert encode_row(item).split(b'\t') == [
+        b'/documents/1/',
+        b'some title',
+        b'https://pankbase.org/files/1/@@download/1.bam',
+        b"{'href': 'https://pankbase.org/documents/1/@@download/attachment/1.pdf', 'type': 'application/pdf'}",
+        b'https://pankbase.org/documents/1/@@download/attachment/1.pdf',
+        b'https://pankbase.org/files/2/a.bam,https://pankbase.org/files/3/b.bam\r\n',
+    ]
+
+
+def test_report_make_projected_search_request(dummy_request):
+    from collections import OrderedDict
+    from igvfd.report import make_projected_search_request
+    dummy_request.environ['QUERY_STRING'] = (
+        'type=MeasurementSet&field=files.href&field=lab.title&limit=all'
+    )
+    columns = OrderedDict(
+        [
+            ('lab.title', {'title': 'Lab'}),
+            ('files.href', {'title': 'Files'}),
+        ]
+    )
+    search_request = make_projected_search_request(dummy_request, columns)
+    assert search_request.registry is dummy_request.registry
+    assert search_request.params.getall('field') == ['@id', 'lab.title', 'files.href']
+    assert search_request.params.getall('type') == ['MeasurementSet']
+    assert search_request.params['limit'] == 'all'
+    assert dummy_request.params.getall('field') == ['files.href', 'lab.title']
+
+
+def test_report_get_visible_columns_for_type_is_memoized(dummy_request, mocker):
+    from igvfd import report
+    dummy_request.registry[report.REPORT_COLUMNS_CACHE].clear()
+    list_visible_columns_for_schemas = mocker.spy(report, 'list_visible_columns_for_schemas')
+    dummy_request.environ['QUERY_STRING'] = 'type=Lab'
+    columns = report.get_visible_columns_for_type(dummy_request, 'Lab')
+    assert list(columns)[0] == '@id'
+    # Changes made by callers aren't cached.
+    columns['@id']['title'] = 'id'
+    assert report.get_visible_columns_for_type(dummy_request, 'Lab')['@id']['title'] == 'ID'
+    assert list_visible_columns_for_schemas.call_count == 1
+    dummy_request.environ['QUERY_STRING'] = 'type=Lab&field=title'
+    assert list(report.get_visible_columns_for_type(dummy_request, 'Lab')) == ['title']
+    assert list_visible_columns_for_schemas.call_count == 2
+
+
+def test_report_get_result_columns_is_memoized(dummy_request, mocker):
+    from igvfd import report
+    dummy_request.registry[report.REPORT_COLUMNS_CACHE].clear()
+    make_result_columns = mocker.spy(report, 'make_result_columns')
+    facets = [
+        {
+            'field': 'type',
+            'terms': [
+                {'key': 'Lab', 'doc_count': 1},
+                {'key': 'Award', 'doc_count': 1},
+            ]
+        }
+    ]
+    dummy_request.environ['QUERY_STRING'] = 'type=Lab&type=Award'
+    columns = report.get_result_columns(dummy_request, facets, {})
+    assert report.get_result_columns(dummy_request, facets, {}) == columns
+    assert make_result_columns.call_count == 1
+    facets[0]['terms'].reverse()
+    report.get_result_columns(dummy_request, facets, {})
+    assert make_result_columns.call_count == 2
@@ -0,0 +1,160 @@
+import pytest
+
+
+def test_searches_coalesce_search_coalescer_do(tmp_path):
+    from igvfd.searches.coalesce import SearchCoalescer
+    coalescer = SearchCoalescer(str(tmp_path), fresh_seconds=60)
+    calls = []
+
+    def render():
+        calls.append(1)
+        return {'@graph': [{'@id': '/a/'}]}, 404
+    key = 'ab' * 32
+    assert coalescer.do(key, render) == ({'@graph': [{'@id': '/a/'}]}, 404)
+    assert coalescer.do(key, render) == ({'@graph': [{'@id': '/a/'}]}, 404)
+    assert len(calls) == 1
+    assert coalescer.do('cd' * 32, render) == ({'@graph': [{'@id': '/a/'}]}, 404)
+    assert len(calls) == 2
+
+
+def test_searches_coalesce_search_coalescer_expires(tmp_path):
+    from igvfd.searches.coalesce import SearchCoalescer
+    coalescer = SearchCoalescer(str(tmp_path), fresh_seconds=0.01)
+    calls = []
+
+    def render():
+        calls.append(1)
+        return {'total': len(calls)}, 200
+    key = 'ab' * 32
+    assert coalescer.do(key, render) == ({'total': 1}, 200)
+    import time
+    time.sleep(0.02)
+    assert coalescer.do(key, render) == ({'total': 2}, 200)
+    coalescer.last_cleanup = 0
+    time.sleep(0.02)
+    coalescer.cleanup()
+    assert not list(tmp_path.glob('*.json'))
+
+
+def test_searches_coalesce_search_coalescer_concurrent_requests_share_render(tmp_path):
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from igvfd.searches.coalesce import SearchCoalescer
+    coalescer = SearchCoalescer(str(tmp_path), fresh_seconds=60)
+    calls = []
+    started = threading.Event()
+
+    def render():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return {'total': 3}, 200
+    key = 'ab' * 32
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        first = executor.submit(coalescer.do, key, render)
+        started.wait()
+        others = [executor.submit(coalescer.do, key, render) for _ in range(4)]
+        results = [first.result()] + [other.result() for other in others]
+    assert len(calls) == 1
+    assert results == [({'total': 3}, 200)] * 5
+
+
+def test_searches_coalesce_search_coalescer_render_error_is_not_shared(tmp_path):
+    from igvfd.searches.coalesce import SearchCoalescer
+    coalescer = SearchCoalescer(str(tmp_path), fresh_seconds=60)
+
+    def render():
+        raise ValueError('search failed')
+    key = 'ab' * 32
+    with pytest.raises(ValueError):
+        coalescer.do(key, render)
+    assert coalescer.do(key, lambda: ({'total': 1}, 200)) == ({'total': 1}, 200)
+
+
+def test_searches_coalesce_search_coalescer_removes_lock_files(tmp_path):
+    from igvfd.searches.coalesce import SearchCoalescer
+    coalescer = SearchCoalescer(str(tmp_path), fresh_seconds=60)
+    assert coalescer.do('ab' * 32, lambda: ({'total': 1}, 200)) == ({'total': 1}, 200)
+    assert not list(tmp_path.glob('*.lock'))
+
+
+def test_searches_coalesce_search_coalescer_does_not_share_large_results(tmp_path):
+    from igvfd.searches.coalesce import SearchCoalescer
+    coalescer = SearchCoalescer(str(tmp_path), fresh_seconds=60, max_bytes=100)
+    calls = []
+
+    def render():
+        calls.append(1)
+        return {'@graph': ['x' * 100]}, 200
+    key = 'ab' * 32
+    assert coalescer.do(key, render) == ({'@graph': ['x' * 100]}, 200)
+    assert coalescer.do(key, render) == ({'@graph': ['x' * 100]}, 200)
+    assert len(calls) == 2
+    assert 'x' * 100 not in (tmp_path / (key + '.json')).read_text()
+
+
+def test_searches_coalesce_make_search_coalescer(tmp_path):
+    from igvfd.searches.coalesce import SearchCoalescer
+    from igvfd.searches.coalesce import make_search_coalescer
+    assert make_search_coalescer({}) is None
+    assert make_search_coalescer({'search.coalesce_dir': str(tmp_path)}) is None
+    coalescer = make_search_coalescer(
+        {
+            'search.coalesce_dir': str(tmp_path / 'coalesce'),
+            'search.coalesce_seconds': '1.5',
+            'search.coalesce_max_bytes': '1000',
+        }
+    )
+    assert isinstance(coalescer, SearchCoalescer)
+    assert coalescer.fresh_seconds == 1.5
+    assert coalescer.max_bytes == 1000
+    assert (tmp_path / 'coalesce').is_dir()
+
+
+def test_searches_coalesce_render_coalesced(dummy_request, mocker, tmp_path):
+    from igvfd.searches.coalesce import SEARCH_COALESCER
+    from igvfd.searches.coalesce import SearchCoalescer
+    from igvfd.searches.coalesce import render_coalesced
+    fielded_response = mocker.Mock()
+    fielded_response.render.return_value = {'total': 0}
+    coalescer = dummy_request.registry.get(SEARCH_COALESCER)
+    dummy_request.registry[SEARCH_COALESCER] = SearchCoalescer(str(tmp_path), fresh_seconds=60)
+    try:
+        dummy_request.response.status_code = 404
+        assert render_coalesced(dummy_request, fielded_response) == {'total': 0}
+        dummy_request.response.status_code = 200
+        assert render_coalesced(dummy_request, fielded_response) == {'total': 0}
+        assert dummy_request.response.status_code == 404
+        assert fielded_response.render.call_count == 1
+    finally:
+        dummy_request.registry[SEARCH_COALESCER] = coalescer
+
+
+def test_searches_coalesce_is_bounded_request(dummy_request):
+    from igvfd.searches.coalesce import is_bounded_request
+    assert is_bounded_request(dummy_request)
+    dummy_request.environ['QUERY_STRING'] = 'type=Tissue&limit=25'
+    assert is_bounded_request(dummy_request)
+    dummy_request.environ['QUERY_STRING'] = 'type=Tissue&limit=1000'
+    assert not is_bounded_request(dummy_request)
+    dummy_request.environ['QUERY_STRING'] = 'type=Tissue&limit=all'
+    assert not is_bounded_request(dummy_request)
+
+
+def test_searches_coalesce_render_coalesced_skips_unbounded_requests(dummy_request, mocker, tmp_path):
+    from igvfd.searches.coalesce import SEARCH_COALESCER
+    from igvfd.searches.coalesce import SearchCoalescer
+    from igvfd.searches.coalesce import render_coalesced
+    fielded_response = mocker.Mock()
+    fielded_response.render.return_value = {'total': 0}
+    coalescer = dummy_request.registry.get(SEARCH_COALESCER)
+    dummy_request.registry[SEARCH_COALESCER] = SearchCoalescer(str(tmp_path), fresh_seconds=60)
+    dummy_request.environ['QUERY_STRING'] = 'type=Tissue&limit=all'
+    try:
+        assert render_coalesced(dummy_request, fielded_response) == {'total': 0}
+        assert render_coalesced(dummy_request, fielded_response) == {'total': 0}
+        assert fielded_response.render.call_count == 2
+        assert not list(tmp_path.glob('*.json'))
+    finally:
+        dummy_request.registry[SEARCH_COALESCER] = coalescer
@@ -0,0 +1,79 @@
+def make_stats(max_seq_no, replica_max_seq_no=0):
+    return {
+        'indices': {
+            'tissue_abc': {
+                'uuid': 'u1',
+                'shards': {
+                    '0': [
+                        {'routing': {'primary': True}, 'seq_no': {'max_seq_no': max_seq_no}},
+                        {'routing': {'primary': False}, 'seq_no': {'max_seq_no': replica_max_seq_no}},
+                    ],
+                },
+            },
+        },
+    }
+
+
+def test_searches_generation_read_index_generation(mocker):
+    from igvfd.searches.generation import read_index_generation
+    client = mocker.Mock()
+    client.indices.stats.return_value = make_stats(10, 9)
+    generation = read_index_generation(client)
+    # A replica catching up doesn't change the generation.
+    client.indices.stats.return_value = make_stats(10, 10)
+    assert read_index_generation(client) == generation
+    client.indices.stats.return_value = make_stats(11, 10)
+    assert read_index_generation(client) != generation
+    assert not client.indices.refresh.called
+
+
+def test_searches_generation_index_generation(mocker):
+    from igvfd.searches import generation
+    from igvfd.searches.generation import IndexGeneration
+    from igvfd.searches.generation import read_index_generation
+    now = mocker.patch.object(generation.time, 'monotonic', return_value=100)
+    client = mocker.Mock()
+    client.indices.stats.return_value = make_stats(10)
+    first = read_index_generation(client)
+    index_generation = IndexGeneration(ttl_seconds=5)
+    assert index_generation.get(client) == first
+    client.indices.stats.return_value = make_stats(11)
+    second = read_index_generation(client)
+    client.indices.stats.reset_mock()
+    now.return_value = 104
+    assert index_generation.get(client) == first
+    assert not client.indices.stats.called
+    # Not returned until the new writes have had time to be refreshed.
+    now.return_value = 105
+    assert index_generation.get(client) == first
+    now.return_value = 110
+    assert index_generation.get(client) == second
+    assert not client.indices.refresh.called
+
+
+def test_searches_generation_make_index_generation():
+    from igvfd.searches.generation import IndexGeneration
+    from igvfd.searches.generation import make_index_generation
+    assert make_index_generation({'search.index_generation_seconds': '0'}) is None
+    assert isinstance(make_index_generation({}), IndexGeneration)
+    assert make_index_generation({'search.index_generation_seconds': '2'}).ttl_seconds == 2
+
+
+def test_searches_generation_get_index_generation(dummy_request, mocker):
+    from snovault.elasticsearch.interfaces import ELASTIC_SEARCH
+    from igvfd.searches.generation import INDEX_GENERATION
+    from igvfd.searches.generation import get_index_generation
+    client = mocker.Mock()
+    client.indices.stats.return_value = make_stats(10)
+    registry = dummy_request.registry
+    original_client = registry.get(ELASTIC_SEARCH)
+    original_index_generation = registry.get(INDEX_GENERATION)
+    registry[ELASTIC_SEARCH] = client
+    registry[INDEX_GENERATION] = None
+    try:
+        generation = get_index_generation(dummy_request)
+        assert get_index_generation(dummy_request) == generation
+        assert client.indices.stats.call_count == 1
+    finally:
+        registry[ELASTIC_SEARCH] = original_client
+        registry[INDEX_GENERATION] = original_index_generation
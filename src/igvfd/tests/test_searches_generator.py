@@ -0,0 +1,178 @@
+import pytest
+
+
+class FakeResponse:
+
+    def __init__(self, hits):
+        self.hits = hits
+
+    def to_dict(self):
+        return {'hits': {'hits': self.hits}}
+
+
+class FakeSearch:
+
+    def __init__(self, docs, sort=None, size=None, search_after=None, executed=None):
+        self.docs = docs
+        self._sort = sort or []
+        self.size = size
+        self.search_after = search_after
+        self.executed = executed if executed is not None else []
+
+    def _copy(self, **kwargs):
+        params = dict(
+            docs=self.docs,
+            sort=self._sort,
+            size=self.size,
+            search_after=self.search_after,
+            executed=self.executed,
+        )
+        params.update(kwargs)
+        return FakeSearch(**params)
+
+    def to_dict(self):
+        if self._sort:
+            return {'sort': self._sort}
+        return {}
+
+    def sort(self, *keys):
+        return self._copy(sort=list(keys))
+
+    def __getitem__(self, slice_):
+        return self._copy(size=slice_.stop - slice_.start)
+
+    def extra(self, search_after=None):
+        return self._copy(search_after=search_after)
+
+    def execute(self):
+        self.executed.append(self.search_after)
+        docs = sorted(self.docs, key=lambda d: d['uuid'])
+        if self.search_after is not None:
+            docs = [d for d in docs if [d['uuid']] > self.search_after]
+        return FakeResponse(
+            [
+                {
+                    '_source': {'embedded': {'uuid': d['uuid']}},
+                    'sort': [d['uuid']],
+                }
+                for d in docs[:self.size]
+            ]
+        )
+
+
+def test_searches_generator_get_cursor_sort():
+    from igvfd.searches.generator import get_cursor_sort
+    from igvfd.searches.generator import CURSOR_TIEBREAKER_SORT
+    assert get_cursor_sort(FakeSearch([])) == [CURSOR_TIEBREAKER_SORT]
+    search = FakeSearch([], sort=[{'embedded.accession': {'order': 'desc'}}])
+    assert get_cursor_sort(search) == [
+        {'embedded.accession': {'order': 'desc'}},
+        CURSOR_TIEBREAKER_SORT,
+    ]
+    search = FakeSearch([], sort=[CURSOR_TIEBREAKER_SORT])
+    assert get_cursor_sort(search) == [CURSOR_TIEBREAKER_SORT]
+
+
+def test_searches_generator_iter_hits_with_cursor():
+    from igvfd.searches.generator import iter_hits_with_cursor
+    docs = [{'uuid': f'{i:04d}'} for i in range(7)]
+    search = FakeSearch(docs)
+    hits = list(iter_hits_with_cursor(search, page_size=3))
+    assert [h['_source']['embedded']['uuid'] for h in hits] == [d['uuid'] for d in docs]
+    assert search.executed == [None, ['0002'], ['0005']]
+    search = FakeSearch(docs[:6])
+    list(iter_hits_with_cursor(search, page_size=3))
+    assert search.executed == [None, ['0002'], ['0005']]
+    search = FakeSearch([])
+    assert list(iter_hits_with_cursor(search, page_size=3)) == []
+    assert search.executed == [None]
+
+
+def test_searches_generator_format_hit():
+    from igvfd.searches.generator import format_hit
+    hit = {
+        '_source': {
+            'embedded': {'@id': '/analysis-sets/IGVFDS0001ABCD/'},
+            'audit': {'WARNING': [{'category': 'missing documents'}]},
+        },
+        'sort': ['abc'],
+    }
+    assert format_hit(hit) == {
+        '@id': '/analysis-sets/IGVFDS0001ABCD/',
+        'audit': {'WARNING': [{'category': 'missing documents'}]},
+    }
+    assert format_hit({'_source': {'embedded': {'@id': '/labs/a/'}}}) == {'@id': '/labs/a/'}
+
+
+def test_searches_generator_iter_hits_with_prefetched_cursor():
+    from concurrent.futures import ThreadPoolExecutor
+    from igvfd.searches.generator import iter_hits_with_prefetched_cursor
+    docs = [{'uuid': f'{i:04d}'} for i in range(7)]
+    search = FakeSearch(docs)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        hits = iter_hits_with_prefetched_cursor(executor, search, page_size=3)
+        executor.submit(lambda: None).result()
+        # First page is requested before iteration starts.
+        assert search.executed == [None]
+        assert [h['_source']['embedded']['uuid'] for h in hits] == [d['uuid'] for d in docs]
+    assert search.executed == [None, ['0002'], ['0005']]
+
+
+def test_searches_generator_get_sort_orders():
+    from igvfd.searches.generator import get_sort_orders
+    assert get_sort_orders(
+        [
+            {'embedded.date_created': {'order': 'desc'}},
+            {'embedded.label': 'asc'},
+            '-embedded.accession',
+            '_score',
+            'embedded.title',
+            {'uuid': {'unmapped_type': 'keyword'}},
+        ]
+    ) == ['desc', 'asc', 'desc', 'desc', 'asc', 'asc']
+
+
+def test_searches_generator_make_sort_key():
+    from igvfd.searches.generator import make_sort_key
+    hits = [
+        {'sort': [None, 'a']},
+        {'sort': [1, 'c']},
+        {'sort': [2, 'b']},
+        {'sort': [2, 'a']},
+        {'sort': ['x', 'd']},
+    ]
+    sort_key = make_sort_key(['asc', 'asc'])
+    assert sorted(hits, key=sort_key) == [
+        {'sort': [1, 'c']},
+        {'sort': [2, 'a']},
+        {'sort': [2, 'b']},
+        {'sort': ['x', 'd']},
+        {'sort': [None, 'a']},
+    ]
+    sort_key = make_sort_key(['desc', 'asc'])
+    assert sorted(hits, key=sort_key) == [
+        {'sort': ['x', 'd']},
+        {'sort': [2, 'a']},
+        {'sort': [2, 'b']},
+        {'sort': [1, 'c']},
+        {'sort': [None, 'a']},
+    ]
+
+
+def test_searches_generator_fan_out_search_generator(mocker):
+    from concurrent.futures import ThreadPoolExecutor
+    from igvfd.searches.generator import fan_out_search_generator
+    searches = {
+        'Lab': FakeSearch([{'uuid': f'{i:04d}'} for i in range(0, 20, 2)]),
+        'Award': FakeSearch([{'uuid': f'{i:04d}'} for i in range(1, 20, 2)]),
+        'User': FakeSearch([]),
+    }
+    mocker.patch(
+        'igvfd.searches.generator.build_search',
+        side_effect=lambda request: searches[request],
+    )
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = fan_out_search_generator(['Lab', 'Award', 'User'], executor, page_size=3)
+        assert [item['uuid'] for item in results['@graph']] == [f'{i:04d}' for i in range(20)]
+    assert searches['Lab'].executed == [None, ['0004'], ['0010'], ['0016']]
+    assert searches['User'].executed == [None]
@@ -0,0 +1,24 @@
+import pytest
+
+
+def test_searches_poll_prepare_poll_response(dummy_request, mocker):
+    from pyramid.httpexceptions import HTTPNotModified
+    from igvfd.searches.poll import prepare_poll_response
+    generation = mocker.patch(
+        'igvfd.searches.poll.get_index_generation',
+        return_value='10-0',
+    )
+    dummy_request.environ['QUERY_STRING'] = 'type=MeasurementSet&limit=0'
+    assert prepare_poll_response(dummy_request) is None
+    etag = dummy_request.response.etag
+    assert dummy_request.response.cache_control.max_age == 60
+    assert dummy_request.response.cache_control.public
+    assert dummy_request.response.vary == ('Cookie', 'Authorization')
+    dummy_request.environ['HTTP_IF_NONE_MATCH'] = f'"{etag}"'
+    not_modified = prepare_poll_response(dummy_request)
+    assert isinstance(not_modified, HTTPNotModified)
+    assert not_modified.etag == etag
+    assert not_modified.vary == ('Cookie', 'Authorization')
+    generation.return_value = '11-0'
+    assert prepare_poll_response(dummy_request) is None
+    assert dummy_request.response.etag != etag
@@ -0,0 +1,67 @@
+import pytest
+
+
+def test_searches_profile_get_aggregation_times():
+    from igvfd.searches.profile import get_aggregation_times
+    opensearch_profile = {
+        'shards': [
+            {
+                'aggregations': [
+                    {'description': 'status', 'time_in_nanos': 1000000},
+                    {'description': 'type', 'time_in_nanos': 3000000},
+                ]
+            },
+            {
+                'aggregations': [
+                    {'description': 'status', 'time_in_nanos': 500000},
+                ]
+            },
+        ]
+    }
+    assert list(get_aggregation_times(opensearch_profile).items()) == [
+        ('type', 3.0),
+        ('status', 1.5),
+    ]
+    assert get_aggregation_times(None) == {}
+
+
+def test_searches_profile_time_field_renders(mocker):
+    from igvfd.searches.profile import get_profile
+    from igvfd.searches.profile import time_field_renders
+
+    class FirstField:
+        def render(self, *args, **kwargs):
+            return {'first': kwargs['parent']}
+
+    class SecondField:
+        def render(self, *args, **kwargs):
+            return {'second': True}
+    fielded_response = mocker.Mock()
+    fielded_response._meta = {}
+    fielded_response.response_fields = [FirstField(), SecondField()]
+    time_field_renders(fielded_response)
+    assert fielded_response.response_fields[0].render(parent='parent') == {'first': 'parent'}
+    assert fielded_response.response_fields[1].render() == {'second': True}
+    timings = get_profile(fielded_response)['fields']
+    assert list(timings) == ['FirstField', 'SecondField']
+    assert all(ms >= 0 for ms in timings.values())
+
+
+def test_searches_profile_is_profile_request(dummy_request, mocker):
+    from pyramid.httpexceptions import HTTPForbidden
+    from igvfd.searches.profile import check_profile_permission
+    from igvfd.searches.profile import is_profile_request
+    dummy_request.environ['QUERY_STRING'] = 'type=MeasurementSet&debug=true'
+    assert not is_profile_request(dummy_request)
+    dummy_request.environ['QUERY_STRING'] = 'type=MeasurementSet&debug=profile'
+    with pytest.raises(HTTPForbidden):
+        is_profile_request(dummy_request)
+    with pytest.raises(HTTPForbidden):
+        check_profile_permission(dummy_request)
+    mocker.patch.object(
+        type(dummy_request),
+        'effective_principals',
+        new_callable=mocker.PropertyMock,
+        return_value=['system.Everyone', 'group.admin'],
+    )
+    assert is_profile_request(dummy_request)
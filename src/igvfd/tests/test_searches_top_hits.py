@@ -0,0 +1,184 @@
+import pytest
+
+
+def make_type_response(type_str, total, hits, timed_out=False):
+    return {
+        'took': 3,
+        'timed_out': timed_out,
+        'hits': {
+            'total': {'value': total, 'relation': 'eq'},
+            'hits': [],
+        },
+        'aggregations': {
+            'types': {
+                'doc_count': total,
+                'types': {
+                    'doc_count_error_upper_bound': 0,
+                    'sum_other_doc_count': 0,
+                    'buckets': [
+                        {
+                            'key': type_str,
+                            'doc_count': total,
+                            'top_hits': {'hits': {'hits': hits}},
+                        }
+                    ],
+                },
+            },
+        },
+    }
+
+
+def test_searches_top_hits_set_top_hits_size():
+    from igvfd.searches.top_hits import set_top_hits_size
+    body = {
+        'size': 0,
+        'aggs': {
+            'types': {
+                'aggs': {
+                    'types': {
+                        'terms': {'size': 200},
+                        'aggs': {'top_hits': {'top_hits': {'size': 5, '_source': ['@id']}}},
+                    }
+                }
+            }
+        }
+    }
+    set_top_hits_size(body, 2)
+    assert body['size'] == 0
+    assert body['aggs']['types']['aggs']['types']['terms'] == {'size': 200}
+    assert body['aggs']['types']['aggs']['types']['aggs']['top_hits']['top_hits'] == {
+        'size': 2,
+        '_source': ['@id'],
+    }
+
+
+def test_searches_top_hits_format_top_hits_results():
+    from igvfd.searches.top_hits import format_top_hits_results
+    results = {
+        'took': 7,
+        'responses': [
+            make_type_response('Award', 2, [{'_id': 'a1'}, {'_id': 'a2'}]),
+            make_type_response('Biomarker', 1, [{'_id': 'b1'}]),
+        ]
+    }
+    formatted = format_top_hits_results(results)
+    assert formatted['took'] == 7
+    assert formatted['timed_out'] is False
+    assert formatted['hits'] == {'total': {'value': 3, 'relation': 'eq'}, 'hits': []}
+    types = formatted['aggregations']['types']
+    assert types['doc_count'] == 3
+    assert [bucket['key'] for bucket in types['types']['buckets']] == ['Award', 'Biomarker']
+    assert types['types']['buckets'][1]['top_hits']['hits']['hits'] == [{'_id': 'b1'}]
+
+
+def test_searches_top_hits_format_top_hits_results_sorts_merged_buckets():
+    from igvfd.searches.top_hits import format_top_hits_results
+    results = {
+        'took': 7,
+        'responses': [
+            make_type_response('Award', 1, [{'_id': 'a1'}]),
+            make_type_response('User', 5, [{'_id': 'u1'}]),
+            make_type_response('Lab', 1, [{'_id': 'l1'}]),
+        ]
+    }
+    formatted = format_top_hits_results(results)
+    buckets = formatted['aggregations']['types']['types']['buckets']
+    assert [bucket['key'] for bucket in buckets] == ['User', 'Award', 'Lab']
+
+
+def test_searches_top_hits_format_top_hits_results_partial():
+    from igvfd.searches.top_hits import format_top_hits_results
+    results = {
+        'took': 600,
+        'responses': [
+            make_type_response('Award', 2, [{'_id': 'a1'}], timed_out=True),
+            {'error': {'type': 'search_phase_execution_exception'}, 'status': 500},
+        ]
+    }
+    formatted = format_top_hits_results(results)
+    assert formatted['timed_out'] is True
+    assert [bucket['key'] for bucket in formatted['aggregations']['types']['types']['buckets']] == ['Award']
+    formatted = format_top_hits_results({'took': 1, 'responses': []})
+    assert formatted == {'hits': {'total': 0, 'hits': []}, 'aggregations': {}, 'took': 1, 'timed_out': False}
+
+
+def test_searches_top_hits_get_type_limits(dummy_request):
+    from pyramid.httpexceptions import HTTPBadRequest
+    from igvfd.searches.top_hits import get_type_limits
+    from igvfd.searches.top_hits import get_top_hits_types
+    from igvfd.searches.defaults import TOP_HITS_ITEM_TYPES
+    dummy_request.environ['QUERY_STRING'] = 'query=CXX&limit=5&limit.Document=2&limit.User=0'
+    assert get_type_limits(dummy_request) == {'Document': 2, 'User': 0}
+    for limit in ['all', '', '-1']:
+        dummy_request.environ['QUERY_STRING'] = f'query=CXX&limit.User={limit}'
+        with pytest.raises(HTTPBadRequest):
+            get_type_limits(dummy_request)
+    assert get_top_hits_types(dummy_request) == TOP_HITS_ITEM_TYPES
+    dummy_request.environ['QUERY_STRING'] = 'query=CXX&type=Award&type=User'
+    assert get_top_hits_types(dummy_request) == ['Award', 'User']
+
+
+def test_searches_top_hits_make_msearch_body(dummy_request, mocker):
+    from igvfd.searches.top_hits import make_msearch_body
+
+    def build_top_hits_search(request, types):
+        search = mocker.Mock()
+        search.to_dict.return_value = {
+            'types': types,
+            'aggs': {'top_hits': {'top_hits': {'size': 5}}},
+        }
+        return search
+    mocker.patch(
+        'igvfd.searches.top_hits.build_top_hits_search',
+        side_effect=build_top_hits_search,
+    )
+    dummy_request.registry.settings['top_hits.timeout_ms'] = '500'
+    dummy_request.environ['QUERY_STRING'] = 'query=CXX&limit.User=1'
+    try:
+        lines = make_msearch_body(dummy_request, ['Award', 'Lab', 'User'])
+    finally:
+        dummy_request.registry.settings.pop('top_hits.timeout_ms')
+    assert lines == [
+        {'index': 'snovault-resources'},
+        {
+            'types': ['Award', 'Lab'],
+            'aggs': {'top_hits': {'top_hits': {'size': 5}}},
+            'timeout': '500ms',
+        },
+        {'index': 'snovault-resources'},
+        {
+            'types': ['User'],
+            'aggs': {'top_hits': {'top_hits': {'size': 1}}},
+            'timeout': '500ms',
+        },
+    ]
+
+
+def test_searches_top_hits_get_top_hits_cache(dummy_request, mocker):
+    from igvfd.lru import LRUCache
+    from igvfd.searches.top_hits import TOP_HITS_CACHE
+    from igvfd.searches.top_hits import get_top_hits
+    search_top_hits = mocker.patch(
+        'igvfd.searches.top_hits.search_top_hits',
+        return_value={'timed_out': False, 'aggregations': {}},
+    )
+    top_hits_cache = dummy_request.registry.get(TOP_HITS_CACHE)
+    dummy_request.registry[TOP_HITS_CACHE] = LRUCache(10)
+    dummy_request.registry.settings['top_hits.cache_seconds'] = '0'
+    dummy_request.environ['QUERY_STRING'] = 'query=CXX'
+    try:
+        get_top_hits(dummy_request)
+        get_top_hits(dummy_request)
+        assert search_top_hits.call_count == 2
+        dummy_request.registry.settings['top_hits.cache_seconds'] = '60'
+        get_top_hits(dummy_request)
+        get_top_hits(dummy_request)
+        assert search_top_hits.call_count == 3
+        dummy_request.environ['QUERY_STRING'] = 'query=CXXC'
+        search_top_hits.return_value = {'timed_out': True, 'aggregations': {}}
+        get_top_hits(dummy_request)
+        get_top_hits(dummy_request)
+        assert search_top_hits.call_count == 5
+    finally:
+        dummy_request.registry.settings.pop('top_hits.cache_seconds')
+        dummy_request.registry[TOP_HITS_CACHE] = top_hits_cache
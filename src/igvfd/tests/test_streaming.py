@@ -0,0 +1,57 @@
+import gzip
+import pytest
+
+
+def test_streaming_coalesce_chunks():
+    from igvfd.streaming import coalesce_chunks
+    rows = [b'a\tb\n', b'c\td\n', b'e\tf\n']
+    assert list(coalesce_chunks(rows, chunk_size=8)) == [b'a\tb\nc\td\n', b'e\tf\n']
+    assert list(coalesce_chunks(rows, chunk_size=1024)) == [b'a\tb\nc\td\ne\tf\n']
+    assert list(coalesce_chunks(rows, chunk_size=1)) == rows
+    assert list(coalesce_chunks([], chunk_size=8)) == []
+
+
+def test_streaming_gzip_chunks():
+    from igvfd.streaming import gzip_chunks
+    chunks = [b'a\tb\n' * 1000, b'c\td\n' * 1000]
+    compressed = b''.join(gzip_chunks(chunks))
+    assert gzip.decompress(compressed) == b''.join(chunks)
+    assert len(compressed) < len(b''.join(chunks))
+    assert gzip.decompress(b''.join(gzip_chunks([]))) == b''
+
+
+def test_streaming_client_accepts_gzip(dummy_request):
+    from igvfd.streaming import client_accepts_gzip
+    assert not client_accepts_gzip(dummy_request)
+    dummy_request.headers['Accept-Encoding'] = 'gzip, deflate, br'
+    assert client_accepts_gzip(dummy_request)
+    dummy_request.headers['Accept-Encoding'] = 'identity'
+    assert not client_accepts_gzip(dummy_request)
+    dummy_request.headers['Accept-Encoding'] = 'gzip;q=0'
+    assert not client_accepts_gzip(dummy_request)
+
+
+def test_streaming_set_streaming_app_iter(dummy_request):
+    from igvfd.streaming import set_streaming_app_iter
+    from pyramid.response import Response
+    rows = [b'a\tb\n', b'c\td\n']
+    response = set_streaming_app_iter(dummy_request, Response(), iter(rows), chunk_size=1024)
+    assert response.content_encoding is None
+    assert 'Accept-Encoding' in response.vary
+    assert list(response.app_iter) == [b'a\tb\nc\td\n']
+    dummy_request.headers['Accept-Encoding'] = 'gzip'
+    response = set_streaming_app_iter(dummy_request, Response(), iter(rows), chunk_size=1024)
+    assert response.content_encoding == 'gzip'
+    assert gzip.decompress(b''.join(response.app_iter)) == b'a\tb\nc\td\n'
+
+
+def test_streaming_set_ndjson_app_iter(dummy_request):
+    from igvfd.streaming import set_ndjson_app_iter
+    from pyramid.response import Response
+    items = [{'@id': '/a/', 'files': [1, 2]}, {'@id': '/b/', 'title': 'é'}]
+    response = set_ndjson_app_iter(dummy_request, Response(), iter(items), chunk_size=1)
+    assert response.content_type == 'application/x-ndjson'
+    assert list(response.app_iter) == [
+        b'{"@id":"/a/","files":[1,2]}\n',
+        b'{"@id":"/b/","title":"\\u00e9"}\n',
+    ]
@@ -20,3 +20,33 @@ def test_summary(testapp, multiplexed_sample, tissue, in_vitro_cell_line, human_
     res = testapp.get(multiplexed_sample_x3['@id'])
     assert res.json.get(
         'summary') == 'multiplexed sample: K562 cell line, male, Mus musculus strain1; pluripotent stem cell, Homo sapiens; ... and 2 more samples'
+
+
+def test_multiplexed_samples_constituents_embedded_once(dummy_request, mocker):
+    from igvfd.types.sample import collect_multiplexed_samples_prop
+    from igvfd.types.sample import decompose_multiplexed_samples
+    objects = {
+        '/multiplexed-samples/PKBSM0000AAAB/': {
+            'multiplexed_samples': ['/multiplexed-samples/PKBSM0000AAAA/', '/primary-cells/PKBSM0000AAAC/'],
+        },
+        '/multiplexed-samples/PKBSM0000AAAA/': {
+            'multiplexed_samples': ['/tissues/PKBSM0000AAAD/', '/in-vitro-systems/PKBSM0000AAAE/'],
+        },
+        '/primary-cells/PKBSM0000AAAC/': {'sample_terms': ['/sample-terms/CL_0000001/']},
+        '/tissues/PKBSM0000AAAD/': {'sample_terms': ['/sample-terms/UBERON_0000001/']},
+        '/in-vitro-systems/PKBSM0000AAAE/': {'sample_terms': ['/sample-terms/EFO_0000001/']},
+    }
+    mocker.patch('igvfd.embed.prefetch_items')
+    dummy_request.embed = mocker.Mock(side_effect=lambda path, *args: objects[path])
+    multiplexed_samples = ['/multiplexed-samples/PKBSM0000AAAB/', '/in-vitro-systems/PKBSM0000AAAE/']
+    assert decompose_multiplexed_samples(dummy_request, multiplexed_samples) == [
+        '/in-vitro-systems/PKBSM0000AAAE/',
+        '/primary-cells/PKBSM0000AAAC/',
+        '/tissues/PKBSM0000AAAD/',
+    ]
+    assert collect_multiplexed_samples_prop(dummy_request, multiplexed_samples, 'sample_terms') == [
+        '/sample-terms/EFO_0000001/',
+    ]
+    assert collect_multiplexed_samples_prop(dummy_request, multiplexed_samples, 'donors') == []
+    # Two constituents, then the two samples of each nested multiplexed sample.
+    assert dummy_request.embed.call_count == 6
@@ -5,6 +5,9 @@ from snovault import (
     load_schema,
 )
 from snovault.util import Path
+from igvfd.lineage import get_donor_paths
+from igvfd.lineage import get_samples_lineage
+from igvfd.memoize import memoize_calculation
 
 from .base import (
     Item,
@@ -15,9 +18,14 @@ from datetime import datetime
 
 
 def get_donors_from_samples(request, samples):
-    donor_objects = []
-    for sample in samples:
-        donor_objects += request.embed(sample, '@@object').get('donors', [])
+    samples_lineage = get_samples_lineage(request, samples)
+    donor_objects = get_donor_paths(
+        request,
+        {donor['donor'] for lineage in samples_lineage.values() for donor in lineage}
+    )
+    other_samples = [sample for sample in samples if sample not in samples_lineage]
+    for sample_object in request.embed_many(other_samples, '@@object'):
+        donor_objects += sample_object.get('donors', [])
     return list(set(donor_objects))
 
 
@@ -138,12 +146,14 @@ class FileSet(Item):
         if files:
             files_to_traverse.extend(files)
         if auxiliary_sets:
-            for auxiliary_set in auxiliary_sets:
-                aux_set_object = request.embed(auxiliary_set, '@@object_with_select_calculated_properties?field=files')
+            aux_set_objects = request.embed_many(
+                auxiliary_sets,
+                '@@object_with_select_calculated_properties?field=files'
+            )
+            for aux_set_object in aux_set_objects:
                 if 'files' in aux_set_object:
                     files_to_traverse.extend(aux_set_object['files'])
-        for current_file_path in files_to_traverse:
-            file_object = request.embed(current_file_path, '@@object?skip_calculated=true')
+        for file_object in request.embed_many(files_to_traverse, '@@object?skip_calculated=true'):
             timestamp = file_object.get('creation_timestamp', None)
             if timestamp:
                 timestamps.add(timestamp)
@@ -193,6 +203,7 @@ class AnalysisSet(FileSet):
             'notSubmittable': True,
         }
     )
+    @memoize_calculation
     def summary(self, request, file_set_type, input_file_sets=[]):
         sentence = f'{file_set_type}'
         inspected_filesets = set()
@@ -247,8 +258,7 @@ class AnalysisSet(FileSet):
     def assay_titles(self, request, input_file_sets=None):
         assay_title = set()
         if input_file_sets is not None:
-            for fileset in input_file_sets:
-                file_set_object = request.embed(fileset, '@@object')
+            for file_set_object in request.embed_many(input_file_sets, '@@object'):
                 if file_set_object.get('preferred_assay_title') and \
                         'MeasurementSet' in file_set_object.get('@type'):
                     assay_title.add(file_set_object.get('preferred_assay_title'))
@@ -312,8 +322,7 @@ class CuratedSet(FileSet):
     def assemblies(self, request, files=None):
         if files:
             assembly_values = set()
-            for current_file_path in files:
-                file_object = request.embed(current_file_path, '@@object?skip_calculated=true')
+            for file_object in request.embed_many(files, '@@object?skip_calculated=true'):
                 if file_object.get('assembly'):
                     assembly_values.add(file_object.get('assembly'))
             if assembly_values:
@@ -337,8 +346,7 @@ class CuratedSet(FileSet):
     def transcriptome_annotations(self, request, files=None):
         if files:
             annotation_values = set()
-            for current_file_path in files:
-                file_object = request.embed(current_file_path, '@@object?skip_calculated=true')
+            for file_object in request.embed_many(files, '@@object?skip_calculated=true'):
                 if file_object.get('transcriptome_annotation'):
                     annotation_values.add(file_object.get('transcriptome_annotation'))
             if annotation_values:
@@ -423,8 +431,7 @@ class MeasurementSet(FileSet):
         object_id = self.jsonld_id(request)
         if samples:
             related_datasets = []
-            for sample in samples:
-                sample_object = request.embed(sample, '@@object')
+            for sample_object in request.embed_many(samples, '@@object'):
                 if sample_object.get('file_sets'):
                     for file_set_id in sample_object.get('file_sets'):
                         if '/measurement-sets/' == file_set_id[:18] and \
@@ -450,16 +457,15 @@ class MeasurementSet(FileSet):
         preferred_title_phrase = ''
 
         if samples:
-            for sample in samples:
-                sample_object = request.embed(sample, '@@object')
-                if sample_object.get('modifications'):
-                    for modification in sample_object.get('modifications'):
-                        modality = request.embed(modification)['modality']
-                        modality_set.add(modality)
-                if sample_object.get('construct_library_sets'):
-                    for construct_library in sample_object.get('construct_library_sets'):
-                        cls_summary = request.embed(construct_library)['summary']
-                        cls_set.add(cls_summary)
+            modifications = []
+            construct_libraries = []
+            for sample_object in request.embed_many(samples, '@@object'):
+                modifications.extend(sample_object.get('modifications', []))
+                construct_libraries.extend(sample_object.get('construct_library_sets', []))
+            for modification_object in request.embed_many(modifications):
+                modality_set.add(modification_object['modality'])
+            for construct_library_object in request.embed_many(construct_libraries):
+                cls_set.add(construct_library_object['summary'])
         if preferred_assay_title:
             preferred_title_phrase = f' ({preferred_assay_title})'
         if len(modality_set) > 1:
@@ -698,6 +704,7 @@ class ConstructLibrarySet(FileSet):
             'notSubmittable': True,
         }
     )
+    @memoize_calculation
     def summary(self, request, file_set_type, scope, selection_criteria, small_scale_gene_list=None, large_scale_gene_list=None, guide_type=None,
                 small_scale_loci_list=None, large_scale_loci_list=None, exon=None, tile=None, orf_list=None, associated_phenotypes=None):
         library_type = ''
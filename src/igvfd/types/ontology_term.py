@@ -9,6 +9,7 @@ from .base import (
     Item,
 )
 from snovault.util import Path
+from igvfd.ontology import get_ontology_term
 
 
 @abstract_collection(
@@ -57,9 +58,10 @@ class OntologyTerm(Item):
 
     @staticmethod
     def _get_ontology_slims(registry, term_id, slim_key):
-        if term_id not in registry['ontology']:
+        term = get_ontology_term(registry, term_id)
+        if term is None:
             return []
-        key = registry['ontology'][term_id].get(slim_key, [])
+        key = term.get(slim_key, [])
         return list(set(
             slim for slim in key
         ))
@@ -5,16 +5,56 @@ from snovault import (
     load_schema,
 )
 from snovault.util import Path
+from igvfd.lineage import get_samples_lineage
+from igvfd.memoize import memoize_calculation
 from .base import (
     Item,
     paths_filtered_by_status
 )
 
 
+MULTIPLEXED_SAMPLE_PREFIX = '/multiplexed-samples/'
+
+
+def get_multiplexed_samples_constituents(request, multiplexed_samples):
+    '''
+    Walks the multiplexing graph below multiplexed_samples once per request,
+    embedding every sample in it once. Returns the objects of the direct
+    constituents and the paths of the samples they decompose into, shared
+    by all the calculated properties of a multiplexed sample.
+    '''
+    cache = getattr(request, '_multiplexed_samples_constituents', None)
+    if cache is None:
+        cache = request._multiplexed_samples_constituents = {}
+    key = tuple(multiplexed_samples)
+    if key in cache:
+        return cache[key]
+    objects = request.embed_many(multiplexed_samples, '@@object?skip_calculated=true')
+    visited_multiplexed_samples = set()
+    decomposed_samples = set()
+    paths = list(multiplexed_samples)
+    level_objects = objects
+    while paths:
+        next_paths = []
+        for path, sample_object in zip(paths, level_objects):
+            if path.startswith(MULTIPLEXED_SAMPLE_PREFIX) and path not in visited_multiplexed_samples:
+                visited_multiplexed_samples.add(path)
+                next_paths.extend(sample_object.get('multiplexed_samples', []))
+            else:
+                decomposed_samples.add(path)
+        paths = next_paths
+        level_objects = request.embed_many(paths, '@@object?skip_calculated=true')
+    cache[key] = {
+        'objects': objects,
+        'decomposed_samples': sorted(decomposed_samples),
+    }
+    return cache[key]
+
+
 def collect_multiplexed_samples_prop(request, multiplexed_samples, property_name):
     property_set = set()
-    for sample in multiplexed_samples:
-        sample_props = request.embed(sample, '@@object?skip_calculated=true')
+    constituents = get_multiplexed_samples_constituents(request, multiplexed_samples)
+    for sample_props in constituents['objects']:
         property_contents = sample_props.get(property_name, None)
         if property_contents:
             if type(property_contents) == list:
@@ -26,20 +66,8 @@ def collect_multiplexed_samples_prop(request, multiplexed_samples, property_name
     return property_list
 
 
-def decompose_multiplexed_samples(request, samples, visited_multiplexed_samples=None):
-    if visited_multiplexed_samples is None:
-        visited_multiplexed_samples = set()
-    decomposed_samples = set()
-    for sample in samples:
-        if sample.startswith('/multiplexed-samples/') and sample not in visited_multiplexed_samples:
-            visited_multiplexed_samples.add(sample)
-            multiplexed_samples = request.embed(sample, '@@object').get('multiplexed_samples')
-            if multiplexed_samples:
-                decomposed_samples.update(decompose_multiplexed_samples(
-                    request, multiplexed_samples, visited_multiplexed_samples))
-        else:
-            decomposed_samples.add(sample)
-    return list(decomposed_samples)
+def decompose_multiplexed_samples(request, samples):
+    return get_multiplexed_samples_constituents(request, samples)['decomposed_samples']
 
 
 def concat_numeric_and_units(numeric, numeric_units, no_numeric_on_one=False):
@@ -238,10 +266,13 @@ class Biosample(Sample):
     def sex(self, request, donors=None):
         genders = set()
         if donors:
-            for d in donors:
-                donor_object = request.embed(d, '@@object')
-                if donor_object.get('gender'):
-                    genders.add(donor_object.get('gender'))
+            lineage = get_samples_lineage(request, [str(self.uuid)]).get(str(self.uuid))
+            if lineage is not None:
+                genders = {donor['sex'] for donor in lineage if donor['sex']}
+            else:
+                for donor_object in request.embed_many(donors, '@@object'):
+                    if donor_object.get('gender'):
+                        genders.add(donor_object.get('gender'))
         if len(genders) == 1:
             return list(genders).pop()
         elif len(genders) > 1:
@@ -326,10 +357,13 @@ class Biosample(Sample):
     def taxa(self, request, donors):
         taxas = set()
         if donors:
-            for d in donors:
-                donor_object = request.embed(d, '@@object?skip_calculated=true')
-                if donor_object.get('taxa'):
-                    taxas.add(donor_object.get('taxa'))
+            lineage = get_samples_lineage(request, [str(self.uuid)]).get(str(self.uuid))
+            if lineage is not None:
+                taxas = {donor['taxa'] for donor in lineage if donor['taxa']}
+            else:
+                for donor_object in request.embed_many(donors, '@@object?skip_calculated=true'):
+                    if donor_object.get('taxa'):
+                        taxas.add(donor_object.get('taxa'))
 
         if len(taxas) == 1:
             return list(taxas).pop()
@@ -342,6 +376,7 @@ class Biosample(Sample):
             'notSubmittable': True,
         }
     )
+    @memoize_calculation
     def summary(self, request, sample_terms, donors, sex, age, age_units=None, embryonic=None, virtual=None, classifications=None, time_post_change=None, time_post_change_units=None, targeted_sample_term=None, cellular_sub_pool=None, taxa=None, sorted_from_detail=None, disease_terms=None, biomarkers=None, treatments=None, construct_library_sets=None, moi=None, nucleic_acid_delivery=None, growth_medium=None):
         term_object = request.embed(sample_terms[0], '@@object?skip_calculated=true')
         term_name = term_object.get('term_name')
@@ -437,8 +472,7 @@ class Biosample(Sample):
             if not taxa or taxa == 'Mus musculus':
                 taxa_set = set()
                 strains_set = set()
-                for donor in donors:
-                    donor_object = request.embed(donor, '@@object?skip_calculated=true')
+                for donor_object in request.embed_many(donors, '@@object?skip_calculated=true'):
                     taxa_set.add(donor_object['taxa'])
                     if donor_object['taxa'] == 'Mus musculus':
                         strains_set.add(donor_object.get('strain', ''))
@@ -465,8 +499,7 @@ class Biosample(Sample):
         if (biomarkers and
                 biosample_type in ['primary_cell', 'primary_islet', 'in_vitro_system']):
             biomarker_summaries = []
-            for biomarker in biomarkers:
-                biomarker_object = request.embed(biomarker)
+            for biomarker_object in request.embed_many(biomarkers):
                 if biomarker_object['quantification'] in ['positive', 'negative']:
                     biomarker_summary = f'{biomarker_object["quantification"]} detection of {biomarker_object["name"]}'
                 elif biomarker_object['quantification'] in ['high', 'intermediate', 'low']:
@@ -481,14 +514,14 @@ class Biosample(Sample):
         # disease terms are appended to the end of the summary
         if (disease_terms and
                 biosample_type in ['primary_cell', 'primary_islet', 'in_vitro_system', 'tissue', 'whole_organism']):
-            phenotype_term_names = sorted([request.embed(disease_term).get('term_name')
-                                          for disease_term in disease_terms])
+            phenotype_term_names = sorted([disease_term_object.get('term_name')
+                                          for disease_term_object in request.embed_many(disease_terms)])
             summary_terms += f' associated with {", ".join(phenotype_term_names)},'
 
         # treatment summaries are appended to the end of the summary
         if (treatments and
                 biosample_type in ['primary_cell', 'primary_islet', 'in_vitro_system', 'tissue', 'whole_organism', 'human_beta_cell_line']):
-            treatment_objects = [request.embed(treatment) for treatment in treatments]
+            treatment_objects = request.embed_many(treatments)
             depleted_treatment_summaries = sorted([treatment.get('summary')[13:]
                                                   for treatment in treatment_objects if treatment.get('depletion')])
             perturbation_treatment_summaries = sorted([treatment.get('summary')[13:]
@@ -503,8 +536,7 @@ class Biosample(Sample):
                 biosample_type in ['primary_cell', 'primary_islet', 'in_vitro_system', 'tissue', 'whole_organism']):
             verb = 'modified with'
             library_types = set()
-            for CLS in construct_library_sets:
-                CLS_object = request.embed(CLS, '@@object?skip_calculated=true')
+            for CLS_object in request.embed_many(construct_library_sets, '@@object?skip_calculated=true'):
                 library_types.add(CLS_object['file_set_type'])
             if nucleic_acid_delivery:
                 if nucleic_acid_delivery == 'lentiviral transduction':
@@ -777,8 +809,7 @@ class TechnicalSample(Sample):
         if construct_library_sets:
             verb = 'modified with'
             library_types = set()
-            for CLS in construct_library_sets:
-                CLS_object = request.embed(CLS, '@@object?skip_calculated=true')
+            for CLS_object in request.embed_many(construct_library_sets, '@@object?skip_calculated=true'):
                 library_types.add(CLS_object['file_set_type'])
             if nucleic_acid_delivery:
                 if nucleic_acid_delivery == 'lentiviral transduction':
@@ -893,11 +924,9 @@ class MultiplexedSample(Sample):
     )
     def summary(self, request, multiplexed_samples=None):
         if multiplexed_samples:
-            if any(sample.startswith('/multiplexed-samples/') for sample in multiplexed_samples):
-                multiplexed_samples = decompose_multiplexed_samples(request, multiplexed_samples)
-            multiplexed_samples = sorted(multiplexed_samples)
-            sample_summaries = [request.embed(
-                sample, '@@object').get('summary') for sample in multiplexed_samples[:2]]
+            multiplexed_samples = decompose_multiplexed_samples(request, multiplexed_samples)
+            sample_summaries = [sample_object.get('summary')
+                                for sample_object in request.embed_many(multiplexed_samples[:2], '@@object')]
             if len(multiplexed_samples) > 2:
                 remainder = f'... and {len(multiplexed_samples) - 2} more sample{"s" if len(multiplexed_samples) - 2 != 1 else ""}'
                 sample_summaries += [remainder]